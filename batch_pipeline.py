@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+batch_pipeline.py
+
+播放列表 / 链接列表的批量处理：下载 → 翻译 → 合并三个阶段流水线并行。
+每个阶段有自己的工作线程池，阶段之间用有界队列连接：
+- 下载：受网络带宽限制
+- 翻译：受 API 限流限制，各视频共享同一个 Translator 的连接池和限流器
+- 合并：受 CPU 限制（ffmpeg 烧录）
+第 N+1 个视频下载的同时第 N 个视频在翻译、第 N-1 个视频在编码，
+总用时接近最慢阶段的累计用时，而不是三个阶段之和。
+队列有界，下载不会远远跑在翻译前面占满磁盘。
+
+输入可以是播放列表（或频道）链接，也可以是每行一个链接的文本文件（# 开头的行为注释）。
+带 v= 的观看链接即使附带 list= 也只处理该视频，除非指定 --batch；
+YouTube 自动生成的合辑（列表 ID 以 RD 开头）没有固定内容，从不展开。
+每个视频的文件放在输出文件夹下以视频 ID 命名的子文件夹中，重新运行时已完成的视频直接跳过。
+
+用法:
+  jobs = make_jobs(expand_sources('urls.txt'), 'output')
+  stats = StagePipeline([Stage('下载', download, 2), Stage('翻译', translate, 2), Stage('合并', mux, 1)]).run(jobs)
+  print(stats.summary())
+"""
+import os
+import queue
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_DOWNLOAD_WORKERS = 2
+DEFAULT_TRANSLATE_WORKERS = 2
+DEFAULT_MUX_WORKERS = 1
+
+_LIST_ID_RE = re.compile(r'[?&]list=([\w-]+)')
+_CHANNEL_RE = re.compile(r'/channel/|/c/|/user/|/@')
+# 自动生成的合辑：按观看记录无限延伸，展开没有意义
+_MIX_LIST_PREFIX = 'RD'
+_VIDEO_ID_RE = re.compile(r'(?:[?&]v=|youtu\.be/|/shorts/|/embed/|/live/)([\w-]{11})')
+
+
+class VideoJob:
+    """批量模式中的一个视频，以及各阶段产生的文件和用时"""
+
+    def __init__(self, index: int, url: str, folder: str):
+        self.index = index
+        self.url = url
+        self.folder = folder
+        self.title: Optional[str] = None
+        self.video_file: Optional[str] = None
+        self.subtitle_file: Optional[str] = None
+        self.bilingual_file: Optional[str] = None
+        self.merged_file: Optional[str] = None
+        self.failed_stage: Optional[str] = None
+        self.timings: Dict[str, float] = {}
+
+    @property
+    def label(self) -> str:
+        return f"#{self.index} {self.title or self.url}"
+
+
+class Stage:
+    """流水线的一个阶段：fn(job) 返回 True 时交给下一阶段，返回 False 或抛出异常时该视频失败"""
+
+    def __init__(self, name: str, fn: Callable[[VideoJob], bool], workers: int = 1):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.busy = 0.0
+        self.done = 0
+
+
+class BatchStats:
+    """批量处理的完成数、失败数、各阶段累计用时和整体吞吐"""
+
+    def __init__(self, stages: Sequence[Stage], jobs: Sequence[VideoJob], wall_time: float):
+        self.stages = stages
+        self.jobs = jobs
+        self.wall_time = wall_time
+
+    @property
+    def completed(self) -> int:
+        return sum(1 for job in self.jobs if job.failed_stage is None)
+
+    @property
+    def failed(self) -> List[VideoJob]:
+        return [job for job in self.jobs if job.failed_stage is not None]
+
+    @property
+    def videos_per_hour(self) -> float:
+        return self.completed / self.wall_time * 3600 if self.wall_time else 0.0
+
+    @property
+    def sequential_time(self) -> float:
+        """各阶段用时之和，即同样的工作逐个视频串行处理所需的时间"""
+        return sum(stage.busy for stage in self.stages)
+
+    def summary(self) -> str:
+        lines = [f"批量处理: 完成 {self.completed}/{len(self.jobs)} 个视频，失败 {len(self.failed)}，"
+                 f"用时 {self.wall_time:.1f}s，吞吐 {self.videos_per_hour:.1f} 个视频/小时"]
+        for stage in self.stages:
+            average = stage.busy / stage.done if stage.done else 0.0
+            lines.append(f"  {stage.name}: {stage.workers} 个工作线程，处理 {stage.done} 个，"
+                         f"累计 {stage.busy:.1f}s，平均 {average:.1f}s/个")
+        if self.wall_time and self.sequential_time:
+            lines.append(f"  串行处理约需 {self.sequential_time:.1f}s，流水线加速 {self.sequential_time / self.wall_time:.2f} 倍")
+        for job in self.failed:
+            lines.append(f"  ✗ {job.label}: {job.failed_stage}失败")
+        return '\n'.join(lines)
+
+
+class StagePipeline:
+    """多阶段流水线：每个阶段一组工作线程，按阶段顺序传递 VideoJob"""
+
+    def __init__(self, stages: Sequence[Stage]):
+        self.stages = list(stages)
+        self._lock = threading.Lock()
+
+    def _work(self, index: int, inbox: queue.Queue, outbox: Optional[queue.Queue]) -> None:
+        stage = self.stages[index]
+        while True:
+            job = inbox.get()
+            if job is None:
+                return
+            started = time.monotonic()
+            try:
+                ok = stage.fn(job)
+            except Exception as e:
+                print(f"✗ {job.label}: {stage.name}出错: {e}")
+                ok = False
+            seconds = time.monotonic() - started
+            job.timings[stage.name] = seconds
+            with self._lock:
+                stage.busy += seconds
+                stage.done += 1
+            if not ok:
+                job.failed_stage = stage.name
+            elif outbox is not None:
+                outbox.put(job)
+
+    def run(self, jobs: Sequence[VideoJob]) -> BatchStats:
+        """处理全部视频并返回统计；单个视频失败不影响其他视频"""
+        started = time.monotonic()
+        # 下一阶段的输入队列最多积压与其工作线程数相同的视频，上游因此被限速
+        queues = [queue.Queue()] + [queue.Queue(maxsize=stage.workers) for stage in self.stages[1:]]
+        pools: List[List[threading.Thread]] = []
+        for i, stage in enumerate(self.stages):
+            outbox = queues[i + 1] if i + 1 < len(queues) else None
+            threads = [threading.Thread(target=self._work, args=(i, queues[i], outbox),
+                                        name=f'batch-{stage.name}-{n}', daemon=True)
+                       for n in range(stage.workers)]
+            for thread in threads:
+                thread.start()
+            pools.append(threads)
+
+        for job in jobs:
+            queues[0].put(job)
+        # 一个阶段的工作线程全部退出后，才通知下一阶段结束
+        for i, threads in enumerate(pools):
+            for _ in threads:
+                queues[i].put(None)
+            for thread in threads:
+                thread.join()
+        return BatchStats(self.stages, list(jobs), time.monotonic() - started)
+
+
+def video_id_from_url(url: str) -> Optional[str]:
+    match = _VIDEO_ID_RE.search(url)
+    return match.group(1) if match else None
+
+
+def playlist_id_from_url(url: str) -> Optional[str]:
+    """返回 list= 参数中的播放列表 ID；自动生成的合辑返回 None"""
+    match = _LIST_ID_RE.search(url)
+    if not match or match.group(1).startswith(_MIX_LIST_PREFIX):
+        return None
+    return match.group(1)
+
+
+def is_playlist_url(url: str, batch: bool = False) -> bool:
+    """
+    url 是否需要按播放列表展开：
+    带视频 ID 的链接只在 batch 为 True 且带有（非合辑的）list= 时展开，
+    没有视频 ID 的 list= 链接或频道链接总是展开
+    """
+    if video_id_from_url(url):
+        return batch and playlist_id_from_url(url) is not None
+    return playlist_id_from_url(url) is not None or bool(_CHANNEL_RE.search(url))
+
+
+def is_batch_source(source: str, batch: bool = False) -> bool:
+    """source 是链接列表文件或播放列表链接时返回 True"""
+    return os.path.isfile(source) or is_playlist_url(source, batch)
+
+
+def expand_playlist(url: str) -> List[Tuple[str, Optional[str]]]:
+    """用 yt-dlp 平铺解析播放列表（不解析每个视频），返回 [(视频链接, 视频 ID)]"""
+    import yt_dlp
+
+    list_id = playlist_id_from_url(url)
+    if list_id and video_id_from_url(url):
+        # 观看链接中的 list=：直接解析播放列表本身
+        url = f"https://www.youtube.com/playlist?list={list_id}"
+    with yt_dlp.YoutubeDL({'extract_flat': 'in_playlist', 'quiet': True, 'skip_download': True}) as ydl:
+        info = ydl.extract_info(url, download=False)
+    if info.get('_type') not in ('playlist', 'multi_video'):
+        return [(url, info.get('id'))]
+    videos = []
+    for entry in info.get('entries') or []:
+        if not entry:
+            continue
+        video_id = entry.get('id')
+        link = entry.get('url') or entry.get('webpage_url')
+        if not link and video_id:
+            link = f"https://www.youtube.com/watch?v={video_id}"
+        if link:
+            videos.append((link, video_id or video_id_from_url(link)))
+    return videos
+
+
+def expand_sources(source: str, batch: bool = False) -> List[Tuple[str, Optional[str]]]:
+    """
+    把播放列表链接或链接列表文件展开为 [(视频链接, 视频 ID)]，去掉重复的视频
+    列表文件中的播放列表链接同样会被展开，是否展开的规则见 is_playlist_url
+    """
+    if os.path.isfile(source):
+        with open(source, 'r', encoding='utf-8') as f:
+            urls = [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+    else:
+        urls = [source]
+    videos: List[Tuple[str, Optional[str]]] = []
+    for url in urls:
+        if is_playlist_url(url, batch):
+            videos.extend(expand_playlist(url))
+        else:
+            videos.append((url, video_id_from_url(url)))
+    seen = set()
+    unique = []
+    for url, video_id in videos:
+        key = video_id or url
+        if key not in seen:
+            seen.add(key)
+            unique.append((url, video_id))
+    return unique
+
+
+def make_jobs(videos: Sequence[Tuple[str, Optional[str]]], output_folder: str) -> List[VideoJob]:
+    """每个视频使用 output_folder 下以视频 ID（未知时用序号）命名的子文件夹"""
+    return [VideoJob(i, url, os.path.join(output_folder, video_id or f'video_{i:03d}'))
+            for i, (url, video_id) in enumerate(videos, 1)]
+
+
+def add_batch_arguments(parser) -> None:
+    """为命令行添加批量模式开关和各阶段工作线程数参数"""
+    parser.add_argument('--batch', action='store_true',
+                        help='观看链接带有 list= 时展开整个播放列表批量处理（默认只处理链接中的视频）')
+    parser.add_argument('--download-workers', type=int, default=DEFAULT_DOWNLOAD_WORKERS,
+                        help=f'批量模式同时下载的视频数 (默认: {DEFAULT_DOWNLOAD_WORKERS})')
+    parser.add_argument('--translate-workers', type=int, default=DEFAULT_TRANSLATE_WORKERS,
+                        help=f'批量模式同时翻译的视频数，共享 --concurrency 个连接 (默认: {DEFAULT_TRANSLATE_WORKERS})')
+    parser.add_argument('--mux-workers', type=int, default=DEFAULT_MUX_WORKERS,
+                        help=f'批量模式同时合并的视频数，烧录时每个视频已按核数使用多个编码线程 '
+                             f'(默认: {DEFAULT_MUX_WORKERS})')
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+批量模式流水线吞吐基准
+
+用 sleep 模拟每个视频三个阶段的用时（下载、翻译、合并，默认 60s / 45s / 30s，上下浮动 30%），
+按 --time-scale 缩短后分别运行：
+- sequential: 逐个视频依次下载 → 翻译 → 合并（原来的单视频流程循环执行）
+- pipeline:   batch_pipeline.StagePipeline，各阶段使用独立的工作线程池
+
+报告换算回真实时间尺度后的总用时和吞吐（个视频/小时）。
+sleep 不占用 CPU，这里测量的是阶段重叠带来的收益；真实运行中合并阶段受 CPU 核数限制。
+
+用法:
+  python benchmarks/batch_pipeline_bench.py
+  python benchmarks/batch_pipeline_bench.py --videos 100 --stage-seconds 90,40,20 --workers 3,2,1 --output batch.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_pipeline import Stage, StagePipeline, VideoJob  # noqa: E402
+
+STAGE_NAMES = ('下载', '翻译', '合并')
+
+
+def make_costs(videos: int, stage_seconds: List[float], jitter: float, seed: int) -> List[List[float]]:
+    rng = random.Random(seed)
+    return [[s * rng.uniform(1 - jitter, 1 + jitter) for s in stage_seconds] for _ in range(videos)]
+
+
+def make_stage(index: int, costs: List[List[float]], scale: float):
+    def run(job: VideoJob) -> bool:
+        time.sleep(costs[job.index][index] * scale)
+        return True
+    return run
+
+
+def run_sequential(costs: List[List[float]], scale: float) -> float:
+    started = time.monotonic()
+    for job_costs in costs:
+        for seconds in job_costs:
+            time.sleep(seconds * scale)
+    return time.monotonic() - started
+
+
+def run_pipeline(costs: List[List[float]], scale: float, workers: List[int]) -> float:
+    stages = [Stage(name, make_stage(i, costs, scale), n) for i, (name, n) in enumerate(zip(STAGE_NAMES, workers))]
+    jobs = [VideoJob(i, f'video-{i}', '') for i in range(len(costs))]
+    stats = StagePipeline(stages).run(jobs)
+    return stats.wall_time
+
+
+def row(mode: str, wall: float, scale: float, videos: int) -> Dict:
+    real = wall / scale
+    return {'mode': mode, 'videos': videos, 'seconds': round(real, 1),
+            'videos_per_hour': round(videos / real * 3600, 1) if real else None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量模式流水线吞吐基准')
+    parser.add_argument('--videos', type=int, default=50, help='视频数 (默认: 50)')
+    parser.add_argument('--stage-seconds', default='60,45,30', help='每个视频下载、翻译、合并的平均秒数 (默认: 60,45,30)')
+    parser.add_argument('--workers', default='2,2,1', help='流水线各阶段的工作线程数 (默认: 2,2,1)')
+    parser.add_argument('--jitter', type=float, default=0.3, help='各阶段用时的随机浮动比例 (默认: 0.3)')
+    parser.add_argument('--time-scale', type=float, default=0.002, help='实际 sleep 时间相对真实时间的比例 (默认: 0.002)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='把结果以 JSON 写入该文件')
+    args = parser.parse_args()
+
+    stage_seconds = [float(s) for s in args.stage_seconds.split(',')]
+    workers = [int(w) for w in args.workers.split(',')]
+    if len(stage_seconds) != 3 or len(workers) != 3:
+        parser.error('--stage-seconds 和 --workers 都需要 3 个值')
+    costs = make_costs(args.videos, stage_seconds, args.jitter, args.seed)
+
+    rows = [row('sequential', run_sequential(costs, args.time_scale), args.time_scale, args.videos),
+            row('pipeline', run_pipeline(costs, args.time_scale, workers), args.time_scale, args.videos)]
+    for r in rows:
+        print(f"  {r['mode']:<11} {r['videos']} 个视频: {r['seconds']:.0f}s，{r['videos_per_hour']} 个视频/小时")
+    print(f"  流水线加速 {rows[0]['seconds'] / rows[1]['seconds']:.2f} 倍")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'config': vars(args), 'results': rows}, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+分段并行烧录基准测试
+
+用 lavfi testsrc 生成一段合成视频和对应的双语字幕，
+分别用单进程烧录和分段并行烧录处理，比较耗时并检查输出时长一致。
+
+用法:
+  python benchmarks/burn_parallel_bench.py --duration 120 --size 1920x1080 --workers 4
+
+依赖:
+  ffmpeg（需要 libx264 和 libass）
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from srt_io import Cue, build_srt  # noqa: E402
+from video_mux import default_burn_workers, merge_subtitle_to_video, probe_duration  # noqa: E402
+
+
+def make_source(path: str, duration: int, size: str, rate: int) -> None:
+    """生成 H.264 + AAC 的测试视频，关键帧间隔 2 秒（与常见网络视频相近）"""
+    cmd = [
+        'ffmpeg', '-hide_banner', '-loglevel', 'error',
+        '-f', 'lavfi', '-i', f'testsrc=size={size}:rate={rate}:duration={duration}',
+        '-f', 'lavfi', '-i', f'sine=frequency=440:duration={duration}',
+        '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p', '-g', str(rate * 2),
+        '-c:a', 'aac', '-shortest', path, '-y'
+    ]
+    subprocess.run(cmd, check=True)
+
+
+def make_subtitles(path: str, duration: int) -> None:
+    cues = [
+        Cue.from_span('', ms, ms + 1800, f"This is synthetic subtitle line {i}", f"这是第 {i} 条合成字幕")
+        for i, ms in enumerate(range(0, duration * 1000 - 2000, 2000))
+    ]
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(build_srt(cues))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='分段并行烧录基准测试')
+    parser.add_argument('--duration', type=int, default=120, help='测试视频时长，单位秒 (默认: 120)')
+    parser.add_argument('--size', default='1920x1080', help='分辨率 (默认: 1920x1080)')
+    parser.add_argument('--rate', type=int, default=25, help='帧率 (默认: 25)')
+    parser.add_argument('--workers', type=int, default=max(2, default_burn_workers()),
+                        help='并行分段数 (默认: 按 CPU 核数，至少 2)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='burn_bench_') as workdir:
+        source = os.path.join(workdir, 'testsrc.mp4')
+        subtitle = os.path.join(workdir, 'testsrc_bilingual.srt')
+        print(f"生成测试视频: {args.duration}s {args.size}@{args.rate}")
+        make_source(source, args.duration, args.size, args.rate)
+        make_subtitles(subtitle, args.duration)
+
+        results = {}
+        for label, workers in (('single', 1), ('parallel', args.workers)):
+            out_dir = os.path.join(workdir, label)
+            os.makedirs(out_dir)
+            start = time.perf_counter()
+            output = merge_subtitle_to_video(source, subtitle, out_dir, mode='burn', burn_workers=workers)
+            elapsed = time.perf_counter() - start
+            if not output:
+                print(f"{label}: 烧录失败")
+                sys.exit(1)
+            results[label] = (elapsed, probe_duration(output))
+
+        single, parallel = results['single'][0], results['parallel'][0]
+        print()
+        print(f"CPU 核数: {os.cpu_count()}，并行分段数: {args.workers}")
+        for label, (elapsed, out_duration) in results.items():
+            print(f"{label:>8}: {elapsed:7.2f}s，实时倍率 {args.duration / elapsed:5.2f}x，输出时长 {out_duration:.2f}s")
+        print(f"加速比: {single / parallel:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
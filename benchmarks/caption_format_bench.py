@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+原生字幕格式解析基准
+
+合成 YouTube 自动字幕风格的 WebVTT（逐词时间标签、重复上一行、10ms 过渡字幕）和对应的 json3，
+按视频时长测量每个视频的字幕处理用时：
+- ffmpeg: 原先的方式，启动 ffmpeg 子进程把 VTT 转换为 SRT，再用 parse_srt 读入
+- vtt:    caption_formats.parse_vtt 在本进程内直接解析
+- json3:  caption_formats.parse_json3 在本进程内直接解析，并统计按逐词时间识别出的停顿断句数
+
+用法:
+  python benchmarks/caption_format_bench.py                        # 10 / 60 分钟视频
+  python benchmarks/caption_format_bench.py --minutes 5,30,180 --repeat 10 --output captions.json
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from caption_formats import WORD_MS, parse_json3, parse_vtt  # noqa: E402
+from caption_merge import DEFAULT_MAX_GAP_MS  # noqa: E402
+from srt_io import parse_srt  # noqa: E402
+
+_WORDS = ('the protein binds to a small pocket on the surface of the cell and this changes how the '
+          'signal moves through the membrane when we add the inhibitor we see a clear drop').split()
+
+
+def _vtt_time(ms: int) -> str:
+    return '%02d:%02d:%02d.%03d' % (ms // 3600000, ms // 60000 % 60, ms // 1000 % 60, ms % 1000)
+
+
+def make_lines(minutes: int, seed: int) -> List[List[Tuple[int, str]]]:
+    """按时长生成逐词计时的字幕行，每行 4~8 个词，偶尔插入 2~4 秒的停顿"""
+    rng = random.Random(seed)
+    lines = []
+    t = 0
+    while t < minutes * 60000:
+        words = []
+        for _ in range(rng.randint(4, 8)):
+            words.append((t, rng.choice(_WORDS)))
+            t += rng.randint(180, 420)
+        lines.append(words)
+        if rng.random() < 0.1:
+            t += rng.randint(2000, 4000)
+    return lines
+
+
+def build_vtt(lines: List[List[Tuple[int, str]]]) -> str:
+    out = ['WEBVTT\nKind: captions\nLanguage: en\n']
+    previous = ' '
+    for i, words in enumerate(lines):
+        start = words[0][0]
+        end = lines[i + 1][0][0] if i + 1 < len(lines) else words[-1][0] + WORD_MS
+        timed = words[0][1] + ''.join(f"<{_vtt_time(ms)}><c> {w}</c>" for ms, w in words[1:])
+        out.append(f"{_vtt_time(start)} --> {_vtt_time(end)} align:start position:0%\n{previous}\n{timed}\n")
+        plain = ' '.join(w for _, w in words)
+        out.append(f"{_vtt_time(end)} --> {_vtt_time(end + 10)} align:start position:0%\n{plain}\n \n")
+        previous = plain
+    return '\n'.join(out)
+
+
+def build_json3(lines: List[List[Tuple[int, str]]]) -> str:
+    events = [{'tStartMs': 0, 'dDurationMs': lines[-1][-1][0] + 5000, 'id': 1, 'wpWinPosId': 1}]
+    for i, words in enumerate(lines):
+        start = words[0][0]
+        # 滚动显示：本行一直显示到下一行也说完
+        end = lines[i + 2][0][0] if i + 2 < len(lines) else words[-1][0] + 2000
+        segs = [{'utf8': words[0][1], 'acAsrConf': 0}]
+        segs += [{'utf8': ' ' + w, 'tOffsetMs': ms - start, 'acAsrConf': 0} for ms, w in words[1:]]
+        events.append({'tStartMs': start, 'dDurationMs': end - start, 'wWinId': 1, 'segs': segs})
+        if i + 1 < len(lines):
+            events.append({'tStartMs': lines[i + 1][0][0], 'dDurationMs': 10, 'wWinId': 1, 'aAppend': 1,
+                           'segs': [{'utf8': '\n'}]})
+    return json.dumps({'wireMagic': 'pb3', 'events': events})
+
+
+def time_runs(fn, repeat: int) -> Tuple[float, object]:
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+
+def run_case(minutes: int, repeat: int, seed: int, workdir: str) -> List[Dict]:
+    lines = make_lines(minutes, seed)
+    vtt = build_vtt(lines)
+    payload = build_json3(lines)
+    vtt_path = os.path.join(workdir, f'{minutes}.vtt')
+    srt_path = os.path.join(workdir, f'{minutes}.srt')
+    with open(vtt_path, 'w', encoding='utf-8') as f:
+        f.write(vtt)
+
+    rows = []
+    if shutil.which('ffmpeg'):
+        def via_ffmpeg():
+            subprocess.run(['ffmpeg', '-hide_banner', '-loglevel', 'error', '-i', vtt_path, srt_path, '-y'],
+                           check=True)
+            with open(srt_path, 'r', encoding='utf-8') as f:
+                return parse_srt(f)
+        ms, cues = time_runs(via_ffmpeg, repeat)
+        rows.append({'method': 'ffmpeg', 'cues': len(cues), 'ms': ms})
+    ms, cues = time_runs(lambda: parse_vtt(vtt), repeat)
+    rows.append({'method': 'vtt', 'cues': len(cues), 'ms': ms})
+    ms, cues = time_runs(lambda: parse_json3(payload), repeat)
+    breaks = sum(1 for a, b in zip(cues, cues[1:]) if b.start_ms - a.end_ms > DEFAULT_MAX_GAP_MS)
+    rows.append({'method': 'json3', 'cues': len(cues), 'ms': ms, 'pause_breaks': breaks})
+    for row in rows:
+        row.update({'minutes': minutes, 'lines': len(lines), 'ms': round(row['ms'], 2)})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='原生字幕格式解析与 ffmpeg 转换的用时对比')
+    parser.add_argument('--minutes', default='10,60', help='逗号分隔的视频时长，单位分钟 (默认: 10,60)')
+    parser.add_argument('--repeat', type=int, default=5, help='每种方式重复次数，取中位数 (默认: 5)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='把结果以 JSON 写入该文件')
+    args = parser.parse_args()
+
+    if not shutil.which('ffmpeg'):
+        print("提示: 未找到 ffmpeg，跳过 ffmpeg 转换的对照")
+    rows = []
+    with tempfile.TemporaryDirectory(prefix='caption_bench_') as workdir:
+        for minutes in [int(m) for m in args.minutes.split(',') if m.strip()]:
+            for row in run_case(minutes, args.repeat, args.seed, workdir):
+                rows.append(row)
+                extra = f"，停顿断句 {row['pause_breaks']} 处" if 'pause_breaks' in row else ''
+                print(f"  {minutes} 分钟 {row['method']:<7} {row['ms']:>9.2f} ms，{row['cues']} 条字幕{extra}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'config': vars(args), 'results': rows}, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
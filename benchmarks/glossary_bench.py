@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+术语表匹配基准
+
+合成指定条数的术语表（1~4 个词的术语）和一组字幕，测量：
+- 构建自动机的耗时和内存（tracemalloc）
+- Aho-Corasick 扫描全部字幕的吞吐（cues/s），以及直接解析和附带提示的字幕数
+- 作为对照，逐条术语做子串查找的朴素实现在少量字幕上的吞吐
+
+术语表条数增加时 Aho-Corasick 的扫描速度应基本不变，朴素实现则线性变慢。
+
+用法:
+  python benchmarks/glossary_bench.py                          # 1 万和 10 万条术语
+  python benchmarks/glossary_bench.py --sizes 100000,500000 --cues 200000 --output glossary.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from glossary import Glossary  # noqa: E402
+
+_SYLLABLES = ('ab', 'bcl', 'cyto', 'dro', 'ex', 'fib', 'gen', 'hy', 'in', 'kin', 'lym', 'mito', 'neo', 'onc', 'pro',
+              'ras', 'sig', 'tox', 'uro', 'vir', 'zy', 'ase', 'ine', 'ol', 'ide', 'in', 'ma', 'sis')
+_FILLER = ('the cell', 'we see that', 'this is why', 'in our model', 'after treatment', 'and then', 'so the',
+           'which means', 'compared with', 'at high dose')
+
+
+def make_vocab(rng: random.Random, size: int) -> List[str]:
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def make_terms(rng: random.Random, vocab: List[str], count: int) -> List[Tuple[str, str]]:
+    terms: Dict[str, str] = {}
+    while len(terms) < count:
+        term = ' '.join(rng.choice(vocab) for _ in range(rng.choice((1, 1, 2, 2, 2, 3, 4))))
+        terms.setdefault(term, f"术语{len(terms)}")
+    return list(terms.items())
+
+
+def make_cues(rng: random.Random, terms: List[Tuple[str, str]], vocab: List[str], count: int) -> List[str]:
+    """约 10% 只有一个术语，其余是术语、普通词和常见短语混合的句子"""
+    cues = []
+    for _ in range(count):
+        if rng.random() < 0.1:
+            cues.append(rng.choice(terms)[0].capitalize() + '.')
+            continue
+        parts = [rng.choice(_FILLER)]
+        for _ in range(rng.randint(1, 3)):
+            parts.append(rng.choice(terms)[0] if rng.random() < 0.5 else rng.choice(vocab))
+            parts.append(rng.choice(_FILLER))
+        cues.append(' '.join(parts))
+    return cues
+
+
+def naive_find(terms: List[Tuple[str, str]], text: str) -> int:
+    lowered = f" {text.lower()} "
+    return sum(1 for term, _ in terms if f" {term} " in lowered)
+
+
+def run_case(size: int, cue_count: int, naive_cues: int, seed: int) -> Dict:
+    rng = random.Random(seed)
+    vocab = make_vocab(rng, max(2000, size // 2))
+    terms = make_terms(rng, vocab, size)
+    cues = make_cues(rng, terms, vocab, cue_count)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    glossary = Glossary(terms)
+    glossary.build()
+    build_seconds = time.perf_counter() - started
+    memory_mb = tracemalloc.get_traced_memory()[0] / (1 << 20)
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    matched = resolved = 0
+    for text in cues:
+        if glossary.resolve(text) is not None:
+            resolved += 1
+        elif glossary.find(text)[0]:
+            matched += 1
+    scan_seconds = time.perf_counter() - started
+
+    sample = cues[:naive_cues]
+    started = time.perf_counter()
+    for text in sample:
+        naive_find(terms, text)
+    naive_seconds = time.perf_counter() - started
+
+    return {
+        'terms': size,
+        'cues': cue_count,
+        'build_seconds': round(build_seconds, 3),
+        'automaton_mb': round(memory_mb, 1),
+        'cues_per_sec': round(cue_count / scan_seconds) if scan_seconds else None,
+        'resolved': resolved,
+        'hinted': matched,
+        'naive_cues_per_sec': round(len(sample) / naive_seconds) if naive_seconds else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='术语表 Aho-Corasick 匹配基准')
+    parser.add_argument('--sizes', default='10000,100000', help='逗号分隔的术语条数 (默认: 10000,100000)')
+    parser.add_argument('--cues', type=int, default=100000, help='扫描的字幕条数 (默认: 100000)')
+    parser.add_argument('--naive-cues', type=int, default=200, help='朴素实现对照扫描的字幕条数 (默认: 200)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='把结果以 JSON 写入该文件')
+    args = parser.parse_args()
+
+    rows = []
+    for size in [int(s) for s in args.sizes.split(',') if s.strip()]:
+        row = run_case(size, args.cues, args.naive_cues, args.seed)
+        rows.append(row)
+        print(f"  {size} 条术语: 构建 {row['build_seconds']}s / {row['automaton_mb']}MB，"
+              f"扫描 {row['cues_per_sec']} cues/s（朴素实现 {row['naive_cues_per_sec']} cues/s），"
+              f"直接解析 {row['resolved']} 条，附带提示 {row['hinted']} 条")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'config': vars(args), 'results': rows}, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+命令行启动导入耗时预算
+
+用 python -X importtime 运行以下场景，统计本项目命令触发的模块导入总耗时（不含解释器自身和 site），
+检查是否超出预算，以及是否加载了该场景不需要的重量级依赖：
+  help            python -m subtitle_tochinese --help
+  translate-help  python -m subtitle_tochinese translate --help
+  download-help   python -m subtitle_tochinese download --help
+  translate-file  python -m subtitle_tochinese translate 翻译一个小 SRT 文件（请求发给本地模拟服务）
+
+translate-file 必然会加载 openai / httpx，因此预算单独设置；yt_dlp、requests、numpy 在任何场景都不应出现。
+超出预算或加载了禁止的模块时退出码为 1，可以放在 CI 中防止启动开销回退。
+
+用法:
+  python benchmarks/import_budget.py
+  python benchmarks/import_budget.py --repeat 5 --scale 1.5   # 较慢的机器上放宽预算
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_deepseek_server import MockConfig, MockServer  # noqa: E402
+
+# 场景 -> (命令参数, 预算毫秒, 不允许加载的模块)
+HELP_FORBIDDEN = ('openai', 'httpx', 'yt_dlp', 'requests', 'numpy', 'asyncio', 'sqlite3')
+SCENARIOS = {
+    'help': (['--help'], 15, HELP_FORBIDDEN + ('argparse',)),
+    'translate-help': (['translate', '--help'], 50, HELP_FORBIDDEN),
+    'download-help': (['download', '--help'], 60, HELP_FORBIDDEN),
+    'translate-file': (['translate', '{input}', '{output}', '--deepseek-url', '{base_url}', '--deepseek-key', 'mock',
+                        '--no-cache'], 1500, ('yt_dlp', 'requests', 'numpy')),
+}
+
+# importtime 输出行: self 微秒 | 累计微秒 | 缩进 + 模块名
+_IMPORT_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+SAMPLE_SRT = """1
+00:00:01,000 --> 00:00:03,000
+Hello and welcome to the lecture.
+
+2
+00:00:03,500 --> 00:00:06,000
+Today we look at how p53 responds to DNA damage.
+"""
+
+
+def parse_importtime(stderr: str) -> Tuple[float, List[Tuple[str, float]], set]:
+    """返回 (除 site 外顶层导入的累计毫秒数, 耗时最多的顶层模块, 所有导入的模块名)"""
+    total = 0.0
+    top: List[Tuple[str, float]] = []
+    modules = set()
+    in_site = False
+    for line in stderr.splitlines():
+        match = _IMPORT_RE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        modules.add(name.split('.')[0])
+        # importtime 先输出子模块后输出父模块；site 及其之前的导入属于解释器启动，不计入
+        if indent == 1:
+            if name == 'site':
+                in_site = True
+                continue
+            if not in_site:
+                continue
+            total += cumulative / 1000
+            top.append((name, cumulative / 1000))
+    top.sort(key=lambda item: -item[1])
+    return total, top[:5], modules
+
+
+def site_modules() -> set:
+    """解释器空启动时已经导入的模块（site、.pth 等环境因素），不算作违规"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'pass'], capture_output=True, text=True)
+    return parse_importtime(result.stderr)[2]
+
+
+def run_scenario(args: List[str], repeat: int) -> Dict:
+    best = None
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-m', 'subtitle_tochinese'] + args,
+                                cwd=ROOT, capture_output=True, text=True)
+        total, top, modules = parse_importtime(result.stderr)
+        if best is None or total < best['import_ms']:
+            best = {'import_ms': round(total, 1), 'top': [(n, round(ms, 1)) for n, ms in top],
+                    'modules': modules, 'returncode': result.returncode}
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='命令行启动导入耗时预算检查')
+    parser.add_argument('--repeat', type=int, default=3, help='每个场景运行次数，取最小值 (默认: 3)')
+    parser.add_argument('--scale', type=float, default=1.0, help='预算倍数，在较慢的机器上放宽 (默认: 1.0)')
+    parser.add_argument('--output', help='把结果以 JSON 写入该文件')
+    args = parser.parse_args()
+
+    baseline = site_modules()
+    failed = False
+    report = []
+    with tempfile.TemporaryDirectory(prefix='import_budget_') as workdir, MockServer(MockConfig(latency_ms=1)) as server:
+        input_path = os.path.join(workdir, 'input.srt')
+        with open(input_path, 'w', encoding='utf-8') as f:
+            f.write(SAMPLE_SRT)
+        values = {'input': input_path, 'output': os.path.join(workdir, 'output.srt'), 'base_url': server.base_url}
+
+        for name, (cmd, budget, forbidden) in SCENARIOS.items():
+            result = run_scenario([part.format(**values) for part in cmd], args.repeat)
+            budget *= args.scale
+            loaded = sorted(m for m in forbidden if m in result['modules'] and m not in baseline)
+            ok = result['returncode'] == 0 and result['import_ms'] <= budget and not loaded
+            failed |= not ok
+            top = '，'.join(f"{n} {ms}ms" for n, ms in result['top'][:3])
+            print(f"{'通过' if ok else '超出'} {name:<15} 导入 {result['import_ms']:7.1f}ms / 预算 {budget:.0f}ms  {top}")
+            if loaded:
+                print(f"     不应加载的模块: {', '.join(loaded)}")
+            if result['returncode'] != 0:
+                print(f"     命令退出码 {result['returncode']}")
+            report.append({'scenario': name, 'import_ms': result['import_ms'], 'budget_ms': budget,
+                           'forbidden_loaded': loaded, 'top': result['top'], 'ok': ok})
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+离线模拟的 DeepSeek / OpenAI 兼容 chat-completions 服务
+
+用于在不消耗真实 API 额度的情况下调整批次大小、并发数和重试策略。
+能识别项目中的三种请求格式并返回格式正确的“译文”：
+- JSON 批量协议（bilingual_srt_fixed.py）：[{"id", "text"}] → [{"id", "zh"}]
+- 编号列表（minimal_project）：1. xxx\\n2. yyy → 1. 译文\\n2. 译文
+- 逐行翻译（translation_engine.py）：请翻译：xxx → 译文
+
+可配置：
+- 延迟分布：对数正态分布的首 token 延迟（中位数与离散度）+ 按 tokens/s 计算的生成时间
+- 错误注入：随机 500、随机 429（带 Retry-After）、超过并发上限时返回 429
+- 批量协议中随机丢弃条目，用于测试缺失 ID 的拆分重试
+- stream: true 时以 SSE 分块返回，生成时间均匀分摊到各块，用于测量渐进输出的首条字幕耗时
+
+用法:
+  python benchmarks/mock_deepseek_server.py --port 8000 --latency-ms 300 --tokens-per-second 80 --throttle-rate 0.02
+  python bilingual_srt_fixed.py input.srt output.srt --deepseek-url http://127.0.0.1:8000 --deepseek-key test
+
+  GET /stats 返回请求数、状态码计数和延迟分位数
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+_NUMBERED_RE = re.compile(r'^\s*(\d+)\.\s*(.*)$')
+# 流式响应每个 SSE 块包含的字符数
+STREAM_CHUNK_CHARS = 16
+
+
+def fake_translate(text: str) -> str:
+    """确定性的“译文”：保留原文内容并加上中文标记，长度与真实译文同一量级"""
+    return '译：' + ' '.join(text.split())
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p / 100
+    lo, hi = math.floor(k), math.ceil(k)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+class MockConfig:
+    def __init__(self, latency_ms: float = 50.0, latency_sigma: float = 0.5, tokens_per_second: float = 0.0,
+                 error_rate: float = 0.0, throttle_rate: float = 0.0, max_inflight: int = 0,
+                 retry_after: float = 1.0, drop_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.max_inflight = max_inflight
+        self.retry_after = retry_after
+        self.drop_rate = drop_rate
+        self.random = random.Random(seed)
+
+
+class MockStats:
+    """服务端统计：状态码计数、成功请求的延迟和处理的条目数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with getattr(self, '_lock', threading.Lock()):
+            self.status = {}
+            self.latencies: List[float] = []
+            self.items = 0
+            self.completion_tokens = 0
+            self.inflight = 0
+            self.peak_inflight = 0
+
+    def enter(self) -> int:
+        with self._lock:
+            self.inflight += 1
+            self.peak_inflight = max(self.peak_inflight, self.inflight)
+            return self.inflight
+
+    def leave(self, status: int, latency: float, items: int = 0, tokens: int = 0) -> None:
+        with self._lock:
+            self.inflight -= 1
+            self.status[status] = self.status.get(status, 0) + 1
+            if status == 200:
+                self.latencies.append(latency)
+                self.items += items
+                self.completion_tokens += tokens
+
+    @property
+    def requests(self) -> int:
+        return sum(self.status.values())
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            latencies = list(self.latencies)
+            result = {
+                'requests': sum(self.status.values()),
+                'status': {str(k): v for k, v in sorted(self.status.items())},
+                'items': self.items,
+                'completion_tokens': self.completion_tokens,
+                'peak_inflight': self.peak_inflight,
+            }
+        for p in (50, 95, 99):
+            value = percentile(latencies, p)
+            result[f'p{p}_ms'] = None if value is None else round(value * 1000, 1)
+        return result
+
+
+def build_reply(content: str, config: MockConfig):
+    """根据请求内容生成回复文本，返回 (回复, 条目数)"""
+    text = content.strip()
+    # JSON 批量协议
+    if text.startswith('['):
+        try:
+            items = json.loads(text)
+        except ValueError:
+            items = None
+        if isinstance(items, list):
+            out = [{'id': it.get('id'), 'zh': fake_translate(str(it.get('text', '')))}
+                   for it in items if isinstance(it, dict)]
+            if config.drop_rate and len(out) > 1:
+                out = [o for o in out if config.random.random() >= config.drop_rate] or out[:1]
+            return json.dumps(out, ensure_ascii=False), len(items)
+    # 编号列表
+    numbered = [_NUMBERED_RE.match(line) for line in text.splitlines()[1:]]
+    numbered = [m for m in numbered if m]
+    if numbered:
+        return '\n'.join(f"{m.group(1)}. {fake_translate(m.group(2))}" for m in numbered), len(numbered)
+    # 逐行翻译
+    if '：' in text:
+        text = text.split('：', 1)[1]
+    return fake_translate(text), 1
+
+
+def make_handler(config: MockConfig, stats: MockStats):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, payload: dict, headers: Optional[dict] = None) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _stream(self, model: str, reply: str, generation: float) -> None:
+            """以 SSE 分块发送 reply（HTTP/1.1 chunked），每块约 STREAM_CHUNK_CHARS 个字符"""
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            pieces = [reply[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(reply), STREAM_CHUNK_CHARS)] or ['']
+            pause = generation / len(pieces)
+            for n, piece in enumerate(pieces):
+                if n and pause:
+                    time.sleep(pause)
+                event = {'id': 'chatcmpl-mock', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                         'model': model, 'choices': [{'index': 0, 'delta': {'content': piece},
+                                                      'finish_reason': 'stop' if n == len(pieces) - 1 else None}]}
+                self._write_chunk(f"data: {json.dumps(event, ensure_ascii=False)}\n\n")
+            self._write_chunk('data: [DONE]\n\n')
+            self.wfile.write(b'0\r\n\r\n')
+
+        def _write_chunk(self, text: str) -> None:
+            data = text.encode('utf-8')
+            self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b'\r\n')
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path.rstrip('/') == '/stats':
+                self._send(200, stats.snapshot())
+            else:
+                self._send(404, {'error': {'message': 'not found'}})
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            raw = self.rfile.read(length)
+            if not self.path.rstrip('/').endswith('/chat/completions'):
+                self._send(404, {'error': {'message': 'not found'}})
+                return
+
+            started = time.monotonic()
+            inflight = stats.enter()
+            rng = config.random
+            try:
+                if (config.max_inflight and inflight > config.max_inflight) or rng.random() < config.throttle_rate:
+                    self._send(429, {'error': {'message': 'Rate limit reached', 'type': 'rate_limit_error'}},
+                               {'Retry-After': f'{config.retry_after:g}'})
+                    stats.leave(429, time.monotonic() - started)
+                    return
+                if rng.random() < config.error_rate:
+                    time.sleep(config.latency_ms / 1000)
+                    self._send(500, {'error': {'message': 'Internal server error', 'type': 'server_error'}})
+                    stats.leave(500, time.monotonic() - started)
+                    return
+
+                body = json.loads(raw)
+                reply, items = build_reply(body['messages'][-1]['content'], config)
+                completion_tokens = max(1, len(reply) // 2)
+                first_token = rng.lognormvariate(math.log(max(config.latency_ms, 0.001) / 1000), config.latency_sigma)
+                generation = completion_tokens / config.tokens_per_second if config.tokens_per_second else 0.0
+                if body.get('stream'):
+                    time.sleep(first_token)
+                    self._stream(body.get('model', 'deepseek-chat'), reply, generation)
+                    stats.leave(200, time.monotonic() - started, items, completion_tokens)
+                    return
+                time.sleep(first_token + generation)
+                self._send(200, {
+                    'id': 'chatcmpl-mock',
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': body.get('model', 'deepseek-chat'),
+                    'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': reply},
+                                 'finish_reason': 'stop'}],
+                    'usage': {'prompt_tokens': length // 4, 'completion_tokens': completion_tokens,
+                              'total_tokens': length // 4 + completion_tokens},
+                })
+                stats.leave(200, time.monotonic() - started, items, completion_tokens)
+            except Exception as e:
+                self._send(400, {'error': {'message': str(e), 'type': 'invalid_request_error'}})
+                stats.leave(400, time.monotonic() - started)
+
+    return Handler
+
+
+class MockServer:
+    """在后台线程中运行的模拟服务，base_url 可直接传给各翻译函数"""
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = '127.0.0.1', port: int = 0):
+        self.config = config or MockConfig()
+        self.stats = MockStats()
+        self.httpd = ThreadingHTTPServer((host, port), make_handler(self.config, self.stats))
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'MockServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='mock-deepseek', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def add_mock_arguments(parser) -> None:
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='首 token 延迟中位数，单位毫秒 (默认: 50)')
+    parser.add_argument('--latency-sigma', type=float, default=0.5, help='延迟对数正态分布的离散度 (默认: 0.5)')
+    parser.add_argument('--tokens-per-second', type=float, default=0.0, help='生成速度，0 表示不计生成时间 (默认: 0)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='随机返回 500 的比例 (默认: 0)')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='随机返回 429 的比例 (默认: 0)')
+    parser.add_argument('--max-inflight', type=int, default=0, help='同时在途请求上限，超过时返回 429，0 为不限制')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='429 响应中的 Retry-After 秒数 (默认: 1)')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='JSON 批量协议中随机丢弃条目的比例 (默认: 0)')
+    parser.add_argument('--seed', type=int, help='随机数种子')
+
+
+def config_from_args(args) -> MockConfig:
+    return MockConfig(args.latency_ms, args.latency_sigma, args.tokens_per_second, args.error_rate,
+                      args.throttle_rate, args.max_inflight, args.retry_after, args.drop_rate, args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='离线模拟的 DeepSeek chat-completions 服务')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址 (默认: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000, help='监听端口 (默认: 8000)')
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockServer(config_from_args(args), args.host, args.port)
+    print(f"模拟服务已启动: {server.base_url}  (统计: {server.base_url}/stats)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
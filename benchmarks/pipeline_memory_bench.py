@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+整文件处理与分窗口流水线的峰值内存对比
+
+生成一个合成 SRT 文件（默认 50 万条字幕），分别在独立子进程中运行：
+- whole:  parse_srt 读入全部字幕 → translate_merged 一次翻译 → build_srt 生成整个输出字符串 → 写出
+- window: srt_pipeline.translate_srt_stream 按 --window 条一个窗口边读边译边写
+
+报告每种方式的峰值 RSS（ru_maxrss）、导入完成后的基线 RSS、两者之差和耗时。
+默认用本地假翻译函数（与模拟服务返回相同的“译文”），只测量流水线本身；
+加 --via-mock 时通过 bilingual_srt_fixed.py 命令行和本地模拟服务完整运行（较慢）。
+两种方式的输出文件内容相同，脚本会校验这一点。
+
+用法:
+  python benchmarks/pipeline_memory_bench.py                       # 50 万条，窗口 2000
+  python benchmarks/pipeline_memory_bench.py --sizes 50000,500000 --window 1000 --output mem.json
+  python benchmarks/pipeline_memory_bench.py --sizes 20000 --via-mock
+"""
+import argparse
+import filecmp
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+MODES = ('whole', 'window')
+
+_WORDS = ('the protein binds to a small pocket on the surface of the cell and this changes how the '
+          'signal moves through the membrane when we add the inhibitor we see a clear drop').split()
+
+
+def write_corpus(path: str, count: int) -> None:
+    """逐条写出 count 条互不相同的字幕，生成过程本身不占用与条数成正比的内存"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            start = i * 2000
+            end = start + 1800
+            length = 6 + i * 7 % 15
+            words = ' '.join(_WORDS[(i * 3 + j * 5) % len(_WORDS)] for j in range(length))
+            f.write(f"{i + 1}\n{start // 3600000:02d}:{start // 60000 % 60:02d}:{start // 1000 % 60:02d},"
+                    f"{start % 1000:03d} --> {end // 3600000:02d}:{end // 60000 % 60:02d}:"
+                    f"{end // 1000 % 60:02d},{end % 1000:03d}\n{words.capitalize()} ({i}).\n\n")
+
+
+def max_rss_mb() -> float:
+    """本进程的峰值 RSS（Linux 上 ru_maxrss 单位为 KB，macOS 上为字节）"""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1 << 20) if sys.platform == 'darwin' else rss / 1024
+
+
+def fake_translate_fn():
+    from mock_deepseek_server import fake_translate
+    return lambda texts: [fake_translate(t) for t in texts]
+
+
+def run_whole(input_path: str, output_path: str) -> None:
+    from caption_merge import translate_merged
+    from srt_io import build_srt, parse_srt, write_file
+    from cue_filter import select_translatable
+
+    with open(input_path, 'r', encoding='utf-8', errors='replace') as f:
+        blocks = parse_srt(f)
+    texts, map_idx = select_translatable(blocks)
+    zh_list = translate_merged(texts, [(blocks[i].start_ms, blocks[i].end_ms) for i in map_idx],
+                               fake_translate_fn(), positions=map_idx, mode='auto', verbose=False)
+    for i, zh in zip(map_idx, zh_list):
+        blocks[i].zh = zh
+    write_file(output_path, build_srt(blocks))
+
+
+def run_window(input_path: str, output_path: str, window: int) -> None:
+    from srt_io import iter_srt
+    from srt_pipeline import translate_srt_stream
+
+    with open(input_path, 'r', encoding='utf-8', errors='replace') as f:
+        translate_srt_stream(iter_srt(f), output_path, fake_translate_fn(), window, 'auto')
+
+
+def run_cli(input_path: str, output_path: str, window: int, base_url: str) -> None:
+    import runpy
+    sys.argv = ['bilingual_srt_fixed.py', input_path, output_path, '--deepseek-url', base_url,
+                '--deepseek-key', 'mock', '--no-cache', '--no-progressive']
+    if window:
+        sys.argv += ['--window', str(window)]
+    runpy.run_path(os.path.join(ROOT, 'bilingual_srt_fixed.py'), run_name='__main__')
+
+
+def child(args) -> None:
+    """子进程：导入完成后记录基线 RSS，运行一种方式，把结果以 JSON 写到 stdout 最后一行"""
+    # 这些导入不直接使用：在记录基线之前加载模块，使基线包含模块本身的内存，
+    # 峰值与基线之差只反映处理字幕的工作内存
+    import caption_merge  # noqa: F401
+    import srt_io  # noqa: F401
+    import srt_pipeline  # noqa: F401
+    if args.base_url:
+        import bilingual_srt_fixed  # noqa: F401  --via-mock 时命令行脚本的导入同样计入基线
+    baseline = max_rss_mb()
+    started = time.perf_counter()
+    devnull = open(os.devnull, 'w')
+    stdout, sys.stdout = sys.stdout, devnull
+    try:
+        if args.base_url:
+            run_cli(args.input, args.out, args.window if args.child == 'window' else 0, args.base_url)
+        elif args.child == 'whole':
+            run_whole(args.input, args.out)
+        else:
+            run_window(args.input, args.out, args.window)
+    finally:
+        sys.stdout = stdout
+        devnull.close()
+    seconds = time.perf_counter() - started
+    print(json.dumps({'baseline_mb': round(baseline, 1), 'peak_mb': round(max_rss_mb(), 1),
+                      'seconds': round(seconds, 2)}))
+
+
+def measure(mode: str, input_path: str, output_path: str, window: int, base_url: str) -> Dict:
+    cmd = [sys.executable, os.path.abspath(__file__), '--child', mode, '--input', input_path, '--out', output_path,
+           '--window', str(window)]
+    if base_url:
+        cmd += ['--base-url', base_url]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{mode} 运行失败:\n{result.stderr}")
+    row = json.loads(result.stdout.strip().splitlines()[-1])
+    row['work_mb'] = round(row['peak_mb'] - row['baseline_mb'], 1)
+    return row
+
+
+def print_table(rows: List[Dict]) -> None:
+    print(f"{'方式':<8}{'cues':>9}{'窗口':>7}{'基线MB':>9}{'峰值MB':>9}{'增量MB':>9}{'用时(s)':>9}")
+    for r in rows:
+        print(f"{r['mode']:<8}{r['cues']:>9}{r['window'] or '-':>7}{r['baseline_mb']:>9.1f}{r['peak_mb']:>9.1f}"
+              f"{r['work_mb']:>9.1f}{r['seconds']:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='整文件处理与分窗口流水线的峰值内存对比')
+    parser.add_argument('--sizes', default='500000', help='逗号分隔的字幕条数 (默认: 500000)')
+    parser.add_argument('--window', type=int, default=2000, help='分窗口方式每个窗口的字幕条数 (默认: 2000)')
+    parser.add_argument('--modes', default=','.join(MODES), help=f'要测试的方式 (默认: {",".join(MODES)})')
+    parser.add_argument('--via-mock', action='store_true', help='通过 bilingual_srt_fixed.py 和本地模拟服务完整运行')
+    parser.add_argument('--output', help='把结果以 JSON 写入该文件')
+    # 子进程内部使用
+    parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--input', help=argparse.SUPPRESS)
+    parser.add_argument('--out', help=argparse.SUPPRESS)
+    parser.add_argument('--base-url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    modes = [m.strip() for m in args.modes.split(',') if m.strip()]
+    unknown = [m for m in modes if m not in MODES]
+    if unknown:
+        parser.error(f"未知方式: {', '.join(unknown)}")
+
+    server = None
+    if args.via_mock:
+        from mock_deepseek_server import MockConfig, MockServer
+        server = MockServer(MockConfig(latency_ms=1)).start()
+    rows = []
+    try:
+        with tempfile.TemporaryDirectory(prefix='pipeline_mem_') as workdir:
+            for size in sizes:
+                input_path = os.path.join(workdir, f'input_{size}.srt')
+                write_corpus(input_path, size)
+                outputs = []
+                for mode in modes:
+                    output_path = os.path.join(workdir, f'{mode}_{size}.srt')
+                    row = measure(mode, input_path, output_path, args.window, server.base_url if server else '')
+                    row.update({'mode': mode, 'cues': size, 'window': args.window if mode == 'window' else 0})
+                    rows.append(row)
+                    outputs.append(output_path)
+                    print(f"  {mode} x {size}: 峰值 {row['peak_mb']}MB（增量 {row['work_mb']}MB），{row['seconds']}s")
+                if len(outputs) == 2 and not filecmp.cmp(outputs[0], outputs[1], shallow=False):
+                    print(f"警告: {size} 条时两种方式的输出不一致")
+    finally:
+        if server:
+            server.stop()
+
+    print()
+    print_table(rows)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'config': {'sizes': sizes, 'window': args.window, 'via_mock': args.via_mock},
+                       'results': rows}, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+SRT 解析 / 生成微基准测试
+
+生成多种合成 SRT 语料，对每个实现分别测量：
+- parse: 文本 → Cue 列表
+- build: Cue 列表 → 文本
+- roundtrip: parse + build 的完整往返，并检查生成的文本再次解析、生成后保持不变
+时间取多次运行的最小值；内存峰值用 tracemalloc 单独测量一次（不影响计时）。
+
+语料:
+  clean          标准格式，LF 换行
+  crlf           CRLF 换行，带 BOM
+  missing_index  没有序号行
+  multiline      每条 2~3 行文本
+  huge_cue       少量超长字幕（每条数万字符、上千行）
+  large          100 万条标准字幕（需要 --large）
+
+实现:
+  srt_io         主项目共用的流式解析器（youtube_bilingual_srt / bilingual_srt_fixed / bilingual_srt_improved）
+  srt_io_stream  iter_srt 逐条消费、不保留列表
+  minimal        minimal_project 的 parse_srt / build_srt
+  rev:<提交>     用 --rev 从其他 git 提交加载的 srt_io.py，用于比较不同版本
+
+结果以 JSON Lines 追加写入 --output，每次运行一行，包含提交号和 Python 版本，便于跨版本比较。
+
+用法:
+  python benchmarks/srt_parse_bench.py --cues 100000 --output benchmarks/srt_parse_results.jsonl
+  python benchmarks/srt_parse_bench.py --large --rev HEAD~3
+"""
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import types
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# minimal_project 自带的模块（srt_core 等）放在最后，不遮住主项目的同名模块
+sys.path.append(os.path.join(ROOT, 'minimal_project'))
+
+import srt_io  # noqa: E402
+from srt_io import format_times  # noqa: E402
+
+LARGE_CUES = 1_000_000
+
+_WORDS = ('so the next thing we need to look at is how the protein folds when it binds '
+          'to the inhibitor and why that matters for the cell').split()
+
+Implementation = Tuple[Callable, Callable]
+
+
+def _line(i: int, words: int) -> str:
+    return ' '.join(_WORDS[(i + j * 7) % len(_WORDS)] for j in range(words))
+
+
+def make_corpus(kind: str, cues: int) -> str:
+    """生成指定类型的合成 SRT 文本"""
+    newline = '\r\n' if kind == 'crlf' else '\n'
+    blocks = []
+    for i in range(cues):
+        start = i * 2000
+        times = format_times(start, start + 1800)
+        if kind == 'multiline':
+            text = newline.join(_line(i + k, 5 + k) for k in range(2 + i % 2))
+        elif kind == 'huge_cue':
+            text = newline.join(_line(i + k, 12) for k in range(1000))
+        else:
+            text = _line(i, 4 + i % 9)
+        if kind == 'missing_index':
+            blocks.append(f"{times}{newline}{text}")
+        else:
+            blocks.append(f"{i + 1}{newline}{times}{newline}{text}")
+    content = (newline * 2).join(blocks) + newline
+    return '\ufeff' + content if kind == 'crlf' else content
+
+
+CORPORA = ('clean', 'crlf', 'missing_index', 'multiline', 'huge_cue', 'large')
+
+
+def corpora(names: List[str], cues: int) -> Dict[str, str]:
+    result = {}
+    for name in names:
+        if name == 'huge_cue':
+            result[name] = make_corpus(name, max(1, min(50, cues // 1000)))
+        elif name == 'large':
+            result[name] = make_corpus('clean', LARGE_CUES)
+        else:
+            result[name] = make_corpus(name, cues)
+    return result
+
+
+def _load_module(name: str, path: str) -> types.ModuleType:
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _load_revision(rev: str) -> types.ModuleType:
+    """从 git 提交中读取 srt_io.py 并作为独立模块加载"""
+    source = subprocess.run(['git', 'show', f'{rev}:srt_io.py'], cwd=ROOT, capture_output=True, text=True, check=True)
+    module = types.ModuleType(f'srt_io_{rev}')
+    exec(compile(source.stdout, f'{rev}:srt_io.py', 'exec'), module.__dict__)
+    return module
+
+
+def _stream_parse(content: str) -> range:
+    # 只计数、不保留 Cue，衡量流式消费的开销；返回 range 以便统计条数
+    count = 0
+    for _ in srt_io.iter_srt(content):
+        count += 1
+    return range(count)
+
+
+def implementations(revs: List[str]) -> Dict[str, Implementation]:
+    minimal = _load_module('minimal_youtube_bilingual_srt', os.path.join(ROOT, 'minimal_project', 'youtube_bilingual_srt.py'))
+    impls = {
+        'srt_io': (srt_io.parse_srt, srt_io.build_srt),
+        'srt_io_stream': (_stream_parse, None),
+        'minimal': (minimal.parse_srt, minimal.build_srt),
+    }
+    for rev in revs:
+        module = _load_revision(rev)
+        impls[f'rev:{rev}'] = (module.parse_srt, module.build_srt)
+    return impls
+
+
+def best_time(fn: Callable[[], object], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory(fn: Callable[[], object]) -> int:
+    """fn 执行期间新分配内存的峰值（字节），不含输入本身"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak
+
+
+def bench_case(parse: Callable, build: Optional[Callable], content: str, repeat: int) -> Dict:
+    row = {'input_bytes': len(content.encode('utf-8'))}
+    cues = parse(content)
+    row['cues'] = len(cues)
+    row['parse_s'] = round(best_time(lambda: parse(content), repeat), 4)
+    row['parse_peak_mb'] = round(peak_memory(lambda: parse(content)) / 2 ** 20, 2)
+    if build is None:
+        return row
+    row['build_s'] = round(best_time(lambda: build(cues), repeat), 4)
+    row['build_peak_mb'] = round(peak_memory(lambda: build(cues)) / 2 ** 20, 2)
+    row['roundtrip_s'] = round(best_time(lambda: build(parse(content)), repeat), 4)
+    # 往返稳定性：生成的文本再次解析应得到相同的字幕
+    rebuilt = build(cues)
+    row['roundtrip_ok'] = build(parse(rebuilt)) == rebuilt
+    row['cues_per_sec'] = round(len(cues) / row['parse_s']) if row['parse_s'] else None
+    return row
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SRT 解析 / 生成微基准测试')
+    parser.add_argument('--cues', type=int, default=100000, help='标准语料的字幕条数 (默认: 100000)')
+    parser.add_argument('--large', action='store_true', help=f'额外测试 {LARGE_CUES} 条字幕的语料')
+    parser.add_argument('--repeat', type=int, default=3, help='计时重复次数，取最小值 (默认: 3)')
+    parser.add_argument('--impl', help='只测试这些实现，逗号分隔 (默认: 全部)')
+    parser.add_argument('--corpus', help=f'只测试这些语料，逗号分隔，可选 {",".join(CORPORA)} (默认: 除 large 外全部)')
+    parser.add_argument('--rev', action='append', default=[],
+                        help='同时测试该 git 提交中的 srt_io.py，可重复指定')
+    parser.add_argument('--output', default=os.path.join(ROOT, 'benchmarks', 'srt_parse_results.jsonl'),
+                        help='结果追加写入的 JSONL 文件 (默认: benchmarks/srt_parse_results.jsonl)')
+    args = parser.parse_args()
+
+    impls = implementations(args.rev)
+    if args.impl:
+        impls = {name: impls[name] for name in args.impl.split(',')}
+    names = args.corpus.split(',') if args.corpus else [c for c in CORPORA if c != 'large' or args.large]
+    unknown = [name for name in names if name not in CORPORA]
+    if unknown:
+        parser.error(f"未知语料: {', '.join(unknown)}")
+    print(f"生成语料: {', '.join(names)}")
+    texts = corpora(names, args.cues)
+
+    results = []
+    print(f"{'语料':<15}{'实现':<16}{'条数':>9}{'MB':>8}{'parse(s)':>10}{'build(s)':>10}{'往返(s)':>10}"
+          f"{'parse峰值MB':>13}{'build峰值MB':>13}{'往返一致':>9}")
+    for corpus, content in texts.items():
+        for name, (parse, build) in impls.items():
+            row = dict(bench_case(parse, build, content, args.repeat), corpus=corpus, impl=name)
+            results.append(row)
+            print(f"{corpus:<15}{name:<16}{row['cues']:>9}{row['input_bytes'] / 2 ** 20:>8.1f}{row['parse_s']:>10.3f}"
+                  f"{row.get('build_s', float('nan')):>10.3f}{row.get('roundtrip_s', float('nan')):>10.3f}"
+                  f"{row['parse_peak_mb']:>13.1f}{row.get('build_peak_mb', float('nan')):>13.1f}"
+                  f"{str(row.get('roundtrip_ok', '-')):>9}")
+
+    record = {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cues': args.cues,
+        'repeat': args.repeat,
+        'results': results,
+    }
+    with open(args.output, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    print(f"结果已追加到: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+翻译吞吐基准测试
+
+在本地启动 mock_deepseek_server，分别用三条翻译路径翻译合成字幕文本：
+- improved: youtube_bilingual_srt.batch_translate_improved（异步并发逐行翻译）
+- fixed:    bilingual_srt_fixed.batch_translate_deepseek（token 预算分批 + JSON ID 协议）
+- minimal:  minimal_project 中基于 requests 的串行编号列表批量翻译
+
+报告每条路径的 cues/s、请求数、429 / 5xx 次数和服务端请求延迟分位数（p50/p95/p99），
+可在不消耗 API 额度的情况下比较批次大小、并发数和重试策略的影响。
+
+用法:
+  python benchmarks/translation_throughput_bench.py --sizes 100,1000,10000 --latency-ms 300 --tokens-per-second 80
+  python benchmarks/translation_throughput_bench.py --paths fixed --sizes 100000 --throttle-rate 0.05 --output results.json
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import sys
+import time
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# minimal_project 自带的模块（srt_core 等）放在最后，不遮住主项目的同名模块
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'minimal_project'))
+
+from mock_deepseek_server import MockServer, add_mock_arguments, config_from_args  # noqa: E402
+from rate_limiter import RateLimiter  # noqa: E402
+from translation_engine import DEFAULT_CONCURRENCY, Translator  # noqa: E402
+
+PATHS = ('improved', 'fixed', 'minimal')
+
+_WORDS = ('the protein binds to a small pocket on the surface of the cell and this changes how the '
+          'signal moves through the membrane when we add the inhibitor we see a clear drop').split()
+
+
+def synthetic_texts(count: int) -> List[str]:
+    """生成 count 条互不相同、长度 6~20 个词的英文字幕文本（避免被去重合并）"""
+    texts = []
+    for i in range(count):
+        length = 6 + i * 7 % 15
+        words = [_WORDS[(i * 3 + j * 5) % len(_WORDS)] for j in range(length)]
+        texts.append(f"{' '.join(words).capitalize()} ({i}).")
+    return texts
+
+
+def load_minimal_module():
+    """按文件路径加载 minimal_project 的模块，避免与主项目的同名模块冲突"""
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        'minimal_project', 'youtube_bilingual_srt.py')
+    spec = importlib.util.spec_from_file_location('minimal_youtube_bilingual_srt', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_runner(path: str, base_url: str, concurrency: int) -> Callable[[List[str]], tuple]:
+    """返回 runner(texts) -> (译文列表, 限流器)"""
+    if path == 'minimal':
+        minimal = load_minimal_module()
+
+        def run_minimal(texts):
+            limiter = RateLimiter(max_concurrency=1)
+            return minimal.batch_translate_improved(texts, 'mock', limiter=limiter, base_url=base_url), limiter
+        return run_minimal
+
+    if path == 'improved':
+        from youtube_bilingual_srt import batch_translate_improved as translate
+    else:
+        from bilingual_srt_fixed import batch_translate_deepseek as translate
+
+    def run(texts):
+        limiter = RateLimiter(max_concurrency=concurrency)
+        with Translator('mock', base_url, pool_size=concurrency, rate_limiter=limiter) as translator:
+            return translate(texts, 'mock', translator=translator, concurrency=concurrency), limiter
+    return run
+
+
+def run_case(server: MockServer, path: str, size: int, concurrency: int, verbose: bool) -> Dict:
+    texts = synthetic_texts(size)
+    runner = make_runner(path, server.base_url, concurrency)
+    server.stats.reset()
+    output = io.StringIO()
+    with contextlib.redirect_stdout(sys.stdout if verbose else output):
+        start = time.perf_counter()
+        results, limiter = runner(texts)
+        elapsed = time.perf_counter() - start
+    stats = server.stats.snapshot()
+    translated = sum(1 for r in results if r)
+    return {
+        'path': path,
+        'cues': size,
+        'translated': translated,
+        'seconds': round(elapsed, 3),
+        'cues_per_sec': round(size / elapsed, 1) if elapsed > 0 else None,
+        'requests': stats['requests'],
+        'throttled': stats['status'].get('429', 0),
+        'server_errors': sum(v for k, v in stats['status'].items() if k.startswith('5')),
+        'retries': limiter.retries,
+        'peak_inflight': stats['peak_inflight'],
+        'p50_ms': stats['p50_ms'],
+        'p95_ms': stats['p95_ms'],
+        'p99_ms': stats['p99_ms'],
+    }
+
+
+def print_table(rows: List[Dict]) -> None:
+    header = (f"{'路径':<10}{'cues':>8}{'成功':>8}{'用时(s)':>10}{'cues/s':>10}{'请求数':>8}"
+              f"{'429':>6}{'5xx':>6}{'重试':>6}{'p50ms':>9}{'p95ms':>9}{'p99ms':>9}")
+    print(header)
+    for r in rows:
+        print(f"{r['path']:<10}{r['cues']:>8}{r['translated']:>8}{r['seconds']:>10.2f}{r['cues_per_sec'] or 0:>10.1f}"
+              f"{r['requests']:>8}{r['throttled']:>6}{r['server_errors']:>6}{r['retries']:>6}"
+              f"{r['p50_ms'] or 0:>9.1f}{r['p95_ms'] or 0:>9.1f}{r['p99_ms'] or 0:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='翻译吞吐基准测试（使用本地模拟服务，不消耗 API 额度）')
+    parser.add_argument('--sizes', default='100,1000',
+                        help='逗号分隔的字幕条数，可到 100000 (默认: 100,1000)')
+    parser.add_argument('--paths', default=','.join(PATHS), help=f'要测试的翻译路径 (默认: {",".join(PATHS)})')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f'improved / fixed 路径的并发数 (默认: {DEFAULT_CONCURRENCY})')
+    parser.add_argument('--output', help='把结果以 JSON 写入该文件')
+    parser.add_argument('--verbose', action='store_true', help='显示翻译函数自身的输出')
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    paths = [p.strip() for p in args.paths.split(',') if p.strip()]
+    unknown = [p for p in paths if p not in PATHS]
+    if unknown:
+        parser.error(f"未知路径: {', '.join(unknown)}")
+
+    config = config_from_args(args)
+    rows = []
+    with MockServer(config) as server:
+        print(f"模拟服务: {server.base_url}，延迟中位数 {config.latency_ms}ms，"
+              f"生成速度 {config.tokens_per_second or '不限'} tokens/s，"
+              f"429 比例 {config.throttle_rate}，500 比例 {config.error_rate}")
+        for size in sizes:
+            for path in paths:
+                row = run_case(server, path, size, args.concurrency, args.verbose)
+                rows.append(row)
+                print(f"  {path} x {size}: {row['seconds']:.2f}s，{row['cues_per_sec']} cues/s")
+
+    print()
+    print_table(rows)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'config': {k: v for k, v in vars(args).items() if k not in ('output', 'verbose')},
+                       'results': rows}, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
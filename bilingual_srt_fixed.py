@@ -4,6 +4,7 @@ bilingual_srt_fixed.py
 
 将英文 SRT 翻译为中英双语 SRT（时间轴与序号保持不变，正文为：英文原文\n中文翻译）。
 使用 Deepseek API（兼容 OpenAI SDK）。
+按 token 预算动态分批，字幕以带 ID 的 JSON 往返，按 ID 对齐译文。
 
 用法:
   export DEEPSEEK_API_KEY=your_api_key
@@ -12,145 +13,68 @@ bilingual_srt_fixed.py
 可选参数 --provider 指定翻译提供者（默认 deepseek）。
 """
 import argparse
-import re
 import sys
 import os
-from typing import List
-
-CHINESE_RE = re.compile(r'[\u4e00-\u9fff]')
-
-
-def read_file(path: str) -> str:
-    with open(path, 'r', encoding='utf-8', errors='replace') as f:
-        return f.read()
-
-
-def write_file(path: str, content: str) -> None:
-    with open(path, 'w', encoding='utf-8') as f:
-        f.write(content)
-
-
-def parse_srt(content: str):
-    # 按空行分块，兼容 CRLF/LF
-    raw_blocks = re.split(r"\r?\n\s*\r?\n", content.strip())
-    blocks = []
-    for blk in raw_blocks:
-        lines = blk.splitlines()
-        if not lines:
-            continue
-        # 寻找时间行（通常包含 -->）
-        if len(lines) >= 2 and '-->' in lines[1]:
-            index = lines[0].strip()
-            times = lines[1].strip()
-            text = "\n".join(l.rstrip() for l in lines[2:]).strip()
-        else:
-            # 如果没有序号行，尝试容错解析
-            index = ''
-            times = lines[0].strip() if '-->' in lines[0] else ''
-            text = "\n".join(lines[1:]).strip()
-        blocks.append({'index': index, 'times': times, 'text': text})
-    return blocks
-
-
-def build_srt(blocks) -> str:
-    out_blocks = []
-    for i, b in enumerate(blocks, start=1):
-        idx = b.get('index') or str(i)
-        times = b.get('times', '')
-        zh = b.get('zh', '').strip()
-        en = b.get('text', '').strip()
-        if zh:
-            combined = en + '\n' + zh
-        else:
-            combined = en
-        out_blocks.append(f"{idx}\n{times}\n{combined}")
-    return "\n\n".join(out_blocks) + "\n"
-
-
-def batch_translate_deepseek(texts: List[str], api_key: str, base_url: str = "https://api.deepseek.com", model: str = "deepseek-chat") -> List[str]:
+from functools import partial
+from typing import Callable, List, Optional
+
+from caption_merge import add_merge_arguments
+from srt_pipeline import add_pipeline_arguments
+from timeline import add_timeline_arguments
+from token_batching import (BATCH_PROMPT, DEFAULT_CONTEXT_TOKENS, DEFAULT_MAX_OUTPUT_TOKENS,
+                            plan_batches, translate_json_batch)
+from translation_cache import TranslationCache, add_cache_arguments, translate_cached
+from translation_engine import DEFAULT_CONCURRENCY, Translator, map_in_order
+from translation_journal import FAILED, TranslationJournal, add_journal_arguments, translate_journaled
+from translation_runner import run_translation
+from glossary import add_glossary_arguments, cache_prompt, translate_with_glossary
+from rate_limiter import add_rate_limit_arguments
+from progressive_srt import add_progressive_arguments
+
+
+def batch_translate_deepseek(texts: List[str], api_key: str, base_url: str = "https://api.deepseek.com", model: str = "deepseek-chat", cache: Optional[TranslationCache] = None, translator: Optional[Translator] = None, concurrency: int = DEFAULT_CONCURRENCY, context_tokens: int = DEFAULT_CONTEXT_TOKENS, max_output_tokens: int = DEFAULT_MAX_OUTPUT_TOKENS, journal: Optional[TranslationJournal] = None, on_result: Optional[Callable[[str, str], None]] = None) -> List[str]:
     """
     使用 Deepseek API（兼容 OpenAI SDK）批量翻译文本
+    按 token 预算动态分批，每条字幕带 ID 以 JSON 往返，结果按 ID 对齐
+    提供 cache 时只把未命中缓存的文本发送给 API
+    提供 translator 时复用其连接池
+    提供 journal 时跳过日志中已有的译文，每个批次完成后立即写入日志
+    提供 on_result 时以流式请求，批次中的每条译文一解析出来就调用 on_result(原文, 译文)
+    translator 带有术语表时，完全由术语组成的文本直接解析，其余批次的提示词附带出现的术语
     """
-    try:
-        from openai import OpenAI
-    except ImportError:
-        raise ImportError("请先安装 OpenAI SDK: pip install openai")
-
-    client = OpenAI(
-        api_key=api_key,
-        base_url=base_url
-    )
-
-    # 构建翻译提示 - 更严格的格式要求
-    system_prompt = """你是一个专业的字幕翻译助手。请将提供的英文文本逐行翻译成简体中文。
-重要：请严格按照以下格式返回：
-1. 第一行翻译
-2. 第二行翻译
-3. 第三行翻译
-...
-
-不要添加任何额外的解释、序号外的文字或标记。确保翻译准确、流畅，保持专业术语的一致性。"""
-
-    translated = []
-    
-    # 分批处理，避免请求过大 - 减少批量大小以提高准确性
-    batch_size = 5
-    for i in range(0, len(texts), batch_size):
-        batch_texts = texts[i:i+batch_size]
-        
-        # 构建用户消息 - 更清晰的格式
-        user_content = "请逐行翻译以下英文文本：\n"
-        for j, text in enumerate(batch_texts):
-            user_content += f"行 {j+1}: {text}\n"
-        
-        try:
-            response = client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_content}
-                ],
-                temperature=0.3,
-                max_tokens=2000
-            )
-            
-            result = response.choices[0].message.content
-            
-            # 解析返回结果 - 更严格的解析逻辑
-            lines = []
-            for line in result.split('\n'):
-                line = line.strip()
-                if not line:
-                    continue
-                # 移除序号和点（支持多种格式）
-                if re.match(r'^\d+\.\s*', line):
-                    line = re.sub(r'^\d+\.\s*', '', line)
-                elif re.match(r'^\d+\s*', line):
-                    line = re.sub(r'^\d+\s*', '', line)
-                elif '行 ' in line:
-                    line = re.sub(r'^行\s*\d+\s*:\s*', '', line)
-                lines.append(line)
-            
-            # 使用解析后的行
-            batch_translations = lines
-            
-            # 确保返回数量匹配 - 更严格的检查
-            if len(batch_translations) >= len(batch_texts):
-                translated.extend(batch_translations[:len(batch_texts)])
-            else:
-                # 如果数量不足，填充空字符串
-                translated.extend(batch_translations)
-                translated.extend([''] * (len(batch_texts) - len(batch_translations)))
-                
-        except Exception as e:
-            print(f"翻译批次 {i//batch_size + 1} 失败: {e}")
-            # 失败时返回空字符串
-            translated.extend([''] * len(batch_texts))
-    
-    return translated
-
-
-def batch_translate(texts: List[str], provider: str = "deepseek", api_key: str = None, base_url: str = None) -> List[str]:
+    if translator is None:
+        with Translator(api_key, base_url, model, pool_size=concurrency) as own:
+            return batch_translate_deepseek(texts, api_key, cache=cache, translator=own, concurrency=concurrency,
+                                            context_tokens=context_tokens, max_output_tokens=max_output_tokens, journal=journal,
+                                            on_result=on_result)
+
+    def translate_batches(pending: List[str]) -> List[str]:
+        batches = plan_batches(pending, context_tokens, max_output_tokens)
+        print(f"待请求段落: {len(pending)}，按 token 预算分为 {len(batches)} 个批次")
+
+        async def worker(batch: List[int]):
+            items = [(i, pending[i]) for i in batch]
+            on_item = None if on_result is None else (lambda i, zh: on_result(pending[i], zh))
+            result = await translate_json_batch(translator.async_client, translator.model, items, 0.3, max_output_tokens,
+                                                translator.limiter, on_item, translator.glossary)
+            if journal is not None:
+                for i in batch:
+                    journal.record(pending[i], result.get(i, FAILED))
+            return result
+
+        merged = {}
+        for result in translator.run(map_in_order(batches, worker, concurrency, label='翻译批次')):
+            merged.update(result)
+        return [merged.get(i, FAILED) for i in range(len(pending))]
+
+    glossary = translator.glossary
+    return translate_with_glossary(texts, lambda rest: translate_cached(
+        rest, lambda pending: translate_journaled(pending, translate_batches, journal, on_result),
+        cache, translator.base_url, translator.model, cache_prompt(BATCH_PROMPT, glossary), 0.3, on_result
+    ), glossary, on_result)
+
+
+def batch_translate(texts: List[str], provider: str = "deepseek", api_key: str = None, base_url: str = None, model: str = "deepseek-chat", cache: Optional[TranslationCache] = None, translator: Optional[Translator] = None, **options) -> List[str]:
     """
     批量翻译文本
     """
@@ -163,7 +87,7 @@ def batch_translate(texts: List[str], provider: str = "deepseek", api_key: str =
         if not base_url:
             base_url = "https://api.deepseek.com"
             
-        return batch_translate_deepseek(texts, api_key, base_url)
+        return batch_translate_deepseek(texts, api_key, base_url, model, cache, translator, **options)
     
     else:
         raise ValueError(f"不支持的翻译提供者: {provider}")
@@ -171,47 +95,44 @@ def batch_translate(texts: List[str], provider: str = "deepseek", api_key: str =
 
 def main():
     parser = argparse.ArgumentParser(description='Translate English SRT to bilingual (EN+ZH) SRT')
-    parser.add_argument('input', help='input .srt file')
+    parser.add_argument('input', help='input .srt / .vtt / .json3 file')
     parser.add_argument('output', help='output .srt file')
     parser.add_argument('--provider', choices=['deepseek'], default='deepseek', help='translation provider (default: deepseek)')
     parser.add_argument('--deepseek-key', help='Deepseek API key (optional, uses DEEPSEEK_API_KEY env var by default)')
     parser.add_argument('--deepseek-url', default='https://api.deepseek.com', help='Deepseek API base URL (default: https://api.deepseek.com)')
     parser.add_argument('--deepseek-model', default='deepseek-chat', help='Deepseek model name (default: deepseek-chat)')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help=f'并发批次请求数 (默认: {DEFAULT_CONCURRENCY})')
+    parser.add_argument('--context-tokens', type=int, default=DEFAULT_CONTEXT_TOKENS, help=f'模型上下文窗口 token 数，用于计算批次大小 (默认: {DEFAULT_CONTEXT_TOKENS})')
+    parser.add_argument('--max-output-tokens', type=int, default=DEFAULT_MAX_OUTPUT_TOKENS, help=f'单次请求输出 token 上限 (默认: {DEFAULT_MAX_OUTPUT_TOKENS})')
+    add_merge_arguments(parser)
+    add_cache_arguments(parser)
+    add_journal_arguments(parser)
+    add_rate_limit_arguments(parser)
+    add_timeline_arguments(parser)
+    add_progressive_arguments(parser)
+    add_glossary_arguments(parser)
+    add_pipeline_arguments(parser)
     
     args = parser.parse_args()
-
-    content = read_file(args.input)
-    blocks = parse_srt(content)
-
-    texts_to_translate = []
-    map_idx = []
-    for idx, b in enumerate(blocks):
-        text = b.get('text', '')
-        if not text or CHINESE_RE.search(text):
-            b['zh'] = ''
-            continue
-        texts_to_translate.append(text)
-        map_idx.append(idx)
-
-    if texts_to_translate:
-        print(f"待翻译段落: {len(texts_to_translate)}，使用 {args.provider} 翻译...")
-        try:
-            zh_list = batch_translate(
-                texts_to_translate, 
-                provider=args.provider,
-                api_key=args.deepseek_key,
-                base_url=args.deepseek_url
-            )
-            for i, zh in zip(map_idx, zh_list):
-                blocks[i]['zh'] = zh
-        except Exception as e:
-            print(f"翻译失败: {e}")
+    if not args.deepseek_key:
+        args.deepseek_key = os.environ.get('DEEPSEEK_API_KEY')
+        if not args.deepseek_key:
+            print("错误: 请设置 DEEPSEEK_API_KEY 环境变量或提供 --deepseek-key 参数")
             sys.exit(1)
-    else:
-        print('没有需要翻译的段落。')
 
-    out = build_srt(blocks)
-    write_file(args.output, out)
+    translate_batch = partial(
+        batch_translate,
+        provider=args.provider,
+        api_key=args.deepseek_key,
+        base_url=args.deepseek_url,
+        model=args.deepseek_model,
+        concurrency=args.concurrency,
+        context_tokens=args.context_tokens,
+        max_output_tokens=args.max_output_tokens
+    )
+    if not run_translation(args, args.input, args.output, translate_batch,
+                           description=f"，使用 {args.provider} 翻译..."):
+        sys.exit(1)
     print(f'已写出: {args.output}')
 
 
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+caption_formats.py
+
+直接解析 YouTube 原生字幕格式，得到与 parse_srt 相同的 Cue 列表，
+不再需要 yt-dlp 调用 ffmpeg 把 VTT 转换为 SRT。
+- json3: YouTube timedtext 的 JSON 格式。自动字幕带逐词时间（tOffsetMs），
+         用来识别说话停顿：本行最后一个词之后静默较长时提前结束本行，
+         句子合并（caption_merge）会在停顿处断句，不会把前后两句拼在一起。
+- vtt:   WebVTT。去掉样式标签和逐词时间标签；自动字幕每条会重复上一条的最后一行，
+         解析时去掉重复行，并跳过只剩重复内容的 10ms 过渡字幕。
+- srt:   交给 srt_io.parse_srt。
+
+用法:
+  cues = parse_captions(payload, 'json3')
+  for cue in iter_caption_file('video.en.vtt'):
+      print(cue.start_ms, cue.end_ms, cue.text)
+"""
+import html
+import json
+import os
+import re
+import sys
+from typing import Iterator, List, Optional, Tuple
+
+from caption_merge import DEFAULT_MAX_GAP_MS
+from srt_io import Cue, SrtSource, iter_srt
+
+# 优先选择的顺序：json3 带逐词时间，vtt 次之，srt 最后
+CAPTION_FORMATS = ('json3', 'vtt', 'srt')
+# 估计的单个词时长：最后一个词开始后再过这么久视为说完
+WORD_MS = 400
+
+_VTT_TIME_RE = re.compile(r'(?:(\d+):)?(\d{1,2}):(\d{2})[.,](\d{1,3})')
+_VTT_TAG_RE = re.compile(r'<[^>]*>')
+_VTT_INLINE_TIME_RE = re.compile(r'<\d{1,2}:\d{2}')
+_VTT_SKIP_BLOCKS = ('WEBVTT', 'NOTE', 'STYLE', 'REGION')
+
+
+def _read(source: SrtSource) -> str:
+    if isinstance(source, str):
+        return source
+    read = getattr(source, 'read', None)
+    return read() if read is not None else ''.join(source)
+
+
+def _intern(text: str) -> str:
+    # 与 srt_io 一致：重复出现的短文本共享同一个字符串对象
+    return sys.intern(text) if len(text) < 32 else text
+
+
+def _vtt_ms(timestamp: str) -> Optional[int]:
+    m = _VTT_TIME_RE.search(timestamp)
+    if not m:
+        return None
+    h, mi, s, ms = m.groups()
+    return ((int(h or 0) * 60 + int(mi)) * 60 + int(s)) * 1000 + int(ms.ljust(3, '0'))
+
+
+def _vtt_span(line: str) -> Tuple[Optional[int], Optional[int]]:
+    start, end = line.split('-->', 1)
+    # 结束时间之后可能跟着 align:start position:0% 等设置
+    end = end.strip().split(None, 1)
+    return _vtt_ms(start), _vtt_ms(end[0]) if end else None
+
+
+def iter_vtt(source: SrtSource) -> Iterator[Cue]:
+    """逐条产出 WebVTT 字幕；时间无法解析的块跳过"""
+    content = _read(source).lstrip('\ufeff').replace('\r\n', '\n').replace('\r', '\n')
+    rolling = bool(_VTT_INLINE_TIME_RE.search(content))
+    previous: List[str] = []
+    # 只有真正的空行分隔字幕块：YouTube 自动字幕的块内会有只含一个空格的行
+    for block in re.split(r'\n{2,}', content):
+        lines = [line for line in block.split('\n') if line.strip()]
+        if not lines or lines[0].startswith(_VTT_SKIP_BLOCKS):
+            continue
+        # 时间行前可以有一行标识符
+        timing = 0 if '-->' in lines[0] else 1
+        if timing >= len(lines) or '-->' not in lines[timing]:
+            continue
+        start, end = _vtt_span(lines[timing])
+        if start is None or end is None:
+            continue
+        text_lines = [html.unescape(_VTT_TAG_RE.sub('', line)).strip() for line in lines[timing + 1:]]
+        text_lines = [line for line in text_lines if line]
+        if rolling:
+            # 自动字幕：第一行是上一条的最后一行
+            if text_lines and previous and text_lines[0] == previous[-1]:
+                text_lines = text_lines[1:]
+            if not text_lines:
+                continue
+            previous = text_lines
+        if text_lines:
+            yield Cue.from_span('', start, end, _intern('\n'.join(text_lines)))
+
+
+def parse_vtt(source: SrtSource) -> List[Cue]:
+    return list(iter_vtt(source))
+
+
+def parse_json3(source: SrtSource) -> List[Cue]:
+    """
+    解析 json3：每个带文字的事件一条字幕，换行事件（aAppend）和空事件跳过
+    有逐词时间时，本行最后一个词到下一行开始的静默超过句子合并的停顿阈值，
+    就把本行结束时间提前到最后一个词说完
+    """
+    data = json.loads(_read(source))
+    items = []
+    for event in data.get('events') or ():
+        segs = event.get('segs')
+        if not segs:
+            continue
+        lines = [line.strip() for line in ''.join(seg.get('utf8', '') for seg in segs).splitlines()]
+        text = '\n'.join(line for line in lines if line)
+        if not text:
+            continue
+        start = int(event.get('tStartMs', 0))
+        end = start + int(event.get('dDurationMs', 0))
+        offsets = [seg['tOffsetMs'] for seg in segs if 'tOffsetMs' in seg and seg.get('utf8', '').strip()]
+        last_word = start + max(offsets) if offsets else None
+        items.append([start, end, text, last_word])
+
+    for item, following in zip(items, items[1:]):
+        last_word = item[3]
+        if last_word is not None and following[0] - (last_word + WORD_MS) > DEFAULT_MAX_GAP_MS:
+            item[1] = min(item[1], last_word + WORD_MS)
+    return [Cue.from_span('', start, end, _intern(text)) for start, end, text, _ in items]
+
+
+def parse_captions(source: SrtSource, fmt: str = 'srt') -> List[Cue]:
+    """按格式（json3 / vtt / srt）解析字幕内容"""
+    fmt = fmt.lower().lstrip('.')
+    if fmt == 'json3':
+        return parse_json3(source)
+    if fmt == 'vtt':
+        return parse_vtt(source)
+    return list(iter_srt(source))
+
+
+def caption_format(path: str) -> str:
+    """按扩展名判断字幕格式，未知扩展名按 SRT 处理"""
+    ext = os.path.splitext(path)[1].lower().lstrip('.')
+    return ext if ext in CAPTION_FORMATS else 'srt'
+
+
+def iter_caption_file(path: str) -> Iterator[Cue]:
+    """逐条读取字幕文件：SRT 流式解析，json3 / vtt 整体解析后逐条产出"""
+    fmt = caption_format(path)
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        if fmt == 'srt':
+            yield from iter_srt(f)
+        else:
+            yield from parse_captions(f, fmt)
+
+
+def read_captions(path: str) -> List[Cue]:
+    return list(iter_caption_file(path))
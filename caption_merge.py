@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+caption_merge.py
+
+YouTube 自动字幕是相互重叠的滚动片段，每条只有半句话。
+本模块在翻译前把连续片段重新拼成完整句子，每个句子只翻译一次，
+再按各片段英文长度的比例把中文译文分配回原来的时间轴。
+"""
+import re
+from typing import Callable, List, Optional, Sequence, Tuple
+
+DEFAULT_MAX_SENTENCE_CHARS = 200
+DEFAULT_MAX_GAP_MS = 1500
+
+_SENTENCE_END_RE = re.compile(r'[.?!。？！…]["\')\]]*$')
+# 中文切分时优先落在这些标点之后
+_ZH_BREAK_CHARS = '，。、；：！？,.;:!? '
+_WORD_CHAR_RE = re.compile(r'[A-Za-z0-9]')
+
+
+def looks_like_rolling(spans: Sequence[Tuple[Optional[int], Optional[int]]], threshold: float = 0.3) -> bool:
+    """超过 threshold 比例的字幕与上一条时间重叠时，认为是滚动式自动字幕"""
+    overlaps = pairs = 0
+    for (_, prev_end), (start, _) in zip(spans, spans[1:]):
+        if prev_end is None or start is None:
+            continue
+        pairs += 1
+        if start < prev_end:
+            overlaps += 1
+    return pairs > 0 and overlaps / pairs >= threshold
+
+
+def strip_repeated_line(prev: str, text: str) -> str:
+    """滚动字幕常把上一条的最后一行重复为本条第一行，去掉重复部分"""
+    prev_lines = prev.splitlines()
+    lines = text.splitlines()
+    if len(lines) > 1 and prev_lines and lines[0].strip() == prev_lines[-1].strip():
+        return "\n".join(lines[1:])
+    return text
+
+
+def group_fragments(texts: Sequence[str], spans: Sequence[Tuple[Optional[int], Optional[int]]],
+                    positions: Optional[Sequence[int]] = None,
+                    max_chars: int = DEFAULT_MAX_SENTENCE_CHARS,
+                    max_gap_ms: int = DEFAULT_MAX_GAP_MS) -> List[List[int]]:
+    """
+    把片段下标分组为句子
+    遇到句末标点、片段之间有明显停顿、原字幕中不相邻或句子过长时断句
+    """
+    groups: List[List[int]] = []
+    current: List[int] = []
+    length = 0
+
+    for i, text in enumerate(texts):
+        if current:
+            prev = current[-1]
+            prev_end = spans[prev][1]
+            start = spans[i][0]
+            gap = start is not None and prev_end is not None and start - prev_end > max_gap_ms
+            adjacent = positions is None or positions[i] == positions[prev] + 1
+            if (_SENTENCE_END_RE.search(texts[prev].rstrip()) or gap or not adjacent
+                    or length + len(text) > max_chars):
+                groups.append(current)
+                current, length = [], 0
+        current.append(i)
+        length += len(text) + 1
+
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _snap_cut(zh: str, target: int, lo: int, hi: int) -> int:
+    """在 target 附近寻找切分点：优先标点之后，其次避免切断英文单词或数字"""
+    window = max(2, (hi - lo) // 4)
+    best = None
+    for offset in range(window + 1):
+        for pos in (target + offset, target - offset):
+            if lo < pos < hi and zh[pos - 1] in _ZH_BREAK_CHARS:
+                best = pos
+                break
+        if best is not None:
+            return best
+    pos = max(lo + 1, min(target, hi - 1))
+    while lo < pos < hi and _WORD_CHAR_RE.match(zh[pos - 1]) and _WORD_CHAR_RE.match(zh[pos]):
+        pos += 1
+    return pos if pos < hi else max(lo + 1, min(target, hi - 1))
+
+
+def redistribute(zh: str, parts: Sequence[str]) -> List[str]:
+    """按各片段英文长度的比例，把整句中文切分回各片段"""
+    if len(parts) == 1:
+        return [zh]
+    zh = zh.strip()
+    weights = [max(1, len(p.strip())) for p in parts]
+    total = sum(weights)
+    if len(zh) < len(parts):
+        # 译文太短无法分配时，整句放在第一个片段上
+        return [zh] + [''] * (len(parts) - 1)
+
+    cuts = []
+    acc = 0
+    prev = 0
+    for k, w in enumerate(weights[:-1]):
+        acc += w
+        target = round(len(zh) * acc / total)
+        # 每段至少留一个字给后面的片段
+        hi = len(zh) - (len(parts) - k - 1) + 1
+        cut = _snap_cut(zh, target, prev, hi)
+        cuts.append(cut)
+        prev = cut
+
+    pieces = []
+    start = 0
+    for cut in cuts + [len(zh)]:
+        pieces.append(zh[start:cut].strip())
+        start = cut
+    return pieces
+
+
+def ends_sentence(text: str) -> bool:
+    """文本是否以句末标点结尾"""
+    return bool(_SENTENCE_END_RE.search(text.rstrip()))
+
+
+def plan_merge(texts: List[str], spans: Sequence[Tuple[Optional[int], Optional[int]]],
+               positions: Optional[Sequence[int]] = None, mode: str = 'auto',
+               max_chars: int = DEFAULT_MAX_SENTENCE_CHARS) -> Optional[Tuple[List[str], List[List[int]], List[str]]]:
+    """
+    决定是否合并并给出合并方案：(去除重复行后的片段, 每个句子包含的片段下标, 句子文本)
+    不需要合并时返回 None
+    """
+    if not texts or mode == 'off' or (mode == 'auto' and not looks_like_rolling(spans)):
+        return None
+    cleaned = [texts[0]] + [strip_repeated_line(p, t) for p, t in zip(texts, texts[1:])]
+    groups = group_fragments(cleaned, spans, positions, max_chars)
+    sentences = [' '.join(' '.join(cleaned[i].split()) for i in g) for g in groups]
+    return cleaned, groups, sentences
+
+
+def translate_merged(texts: List[str], spans: Sequence[Tuple[Optional[int], Optional[int]]],
+                     translate_fn: Callable[[List[str]], List[str]],
+                     positions: Optional[Sequence[int]] = None, mode: str = 'auto',
+                     max_chars: int = DEFAULT_MAX_SENTENCE_CHARS, verbose: bool = True) -> List[str]:
+    """
+    合并片段后翻译，返回与 texts 一一对应的译文
+    spans 为每段文本的 (开始毫秒, 结束毫秒)
+    mode: 'on' 总是合并，'off' 不合并，'auto' 仅在检测到滚动字幕时合并
+    verbose 为 False 时不打印合并统计（分窗口翻译时由调用方汇总）
+    """
+    if not texts:
+        return []
+    plan = plan_merge(texts, spans, positions, mode, max_chars)
+    if plan is None:
+        return translate_fn(texts)
+
+    cleaned, groups, sentences = plan
+    saved = len(texts) - len(sentences)
+    if verbose:
+        print(f"句子合并: {len(texts)} 段字幕片段 → {len(sentences)} 个句子，"
+              f"翻译请求减少 {saved} 个（{saved / len(texts) * 100:.1f}%）")
+
+    zh_sentences = translate_fn(sentences)
+    result = [''] * len(texts)
+    for group, zh in zip(groups, zh_sentences):
+        if not zh:
+            continue
+        for i, piece in zip(group, redistribute(zh, [cleaned[i] for i in group])):
+            result[i] = piece
+    return result
+
+
+def add_merge_arguments(parser) -> None:
+    """为命令行添加句子合并参数"""
+    parser.add_argument('--merge-sentences', choices=['auto', 'on', 'off'], default='auto',
+                        help='翻译前把滚动字幕片段合并为完整句子 (默认: auto，检测到重叠片段时启用)')
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+cue_filter.py
+
+翻译前的字幕分类：不含需要翻译的语言内容的字幕直接原样保留，不发送给 API。
+规则预先编译为一个正则，每条字幕只做一次 CJK 检查和一次整体匹配：
+- chinese:   已包含中文
+- sound:     只有方括号/圆括号标注，如 [Music]、(Applause)、[音乐]
+- url:       只有网址或邮箱
+- timestamp: 只有时间，如 12:30、1:02:03.5
+- number:    只有数字、百分比、金额等
+- speaker:   只有说话人标记，如 >>、- JOHN:、SPEAKER 2:、DR. SMITH:
+             没有 >> / - 前缀时名字至少两个词：单个全大写词加冒号（JOHN:、DNA:、HIV:、Q:）
+             也可能是被断开的正文，仍会翻译
+- symbols:   没有任何字母，如 emoji、♪♪、...、--
+
+用法:
+  stats = FilterStats()
+  texts, map_idx = select_translatable(blocks, stats)
+  print(stats.summary())
+
+规则示例写在 classify 的文档中，修改规则后运行 python -m doctest cue_filter.py 检查
+"""
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from srt_io import Cue
+
+_CJK_RE = re.compile(r'[\u4e00-\u9fff]')
+
+# 按顺序匹配，整条字幕（去掉首尾空白后）完全匹配其中一条规则时不翻译
+_RULES = (
+    ('sound', r'(?:[\[(（【][^\[\]()（）【】]*[\])）】][\s.,!?]*)+'),
+    ('url', r'(?:(?:https?://|www\.)\S+|[\w.+-]+@[\w-]+\.[\w.-]+)'),
+    ('timestamp', r'\d{1,2}:\d{2}(?::\d{2})?(?:[.,]\d+)?'),
+    ('number', r'[-+±~≈#№]?[$€£¥]?\d[\d\s.,:/×x%‰-]*%?'),
+    ('speaker', r'(?:>>+|-)\s*(?:[A-Z][A-Z0-9 .\'-]{0,30}:)?|[A-Z][A-Z\'-]*[A-Z]\.?(?: [A-Z0-9][A-Z0-9.\'-]*){1,3}:'),
+    ('symbols', r'[\W\d_]*'),
+)
+_RULE_RE = re.compile('|'.join(f'(?P<{name}>{pattern})' for name, pattern in _RULES))
+
+CATEGORY_LABELS = {
+    'chinese': '已含中文',
+    'sound': '音效标注',
+    'url': '网址',
+    'timestamp': '时间',
+    'number': '数字',
+    'speaker': '说话人标记',
+    'symbols': '符号/emoji',
+    'empty': '空白',
+}
+
+
+def classify(text: str) -> Optional[str]:
+    """
+    返回不需要翻译的类别；需要翻译时返回 None
+
+    >>> classify('[Music]'), classify('12:30'), classify('$1,299'), classify('♪♪')
+    ('sound', 'timestamp', 'number', 'symbols')
+    >>> classify('>>'), classify('>> JOHN:'), classify('- MARY:'), classify('SPEAKER 2:'), classify('DR. SMITH:')
+    ('speaker', 'speaker', 'speaker', 'speaker', 'speaker')
+    >>> classify('JOHN:'), classify('DNA:'), classify('HIV:'), classify('WHO:'), classify('Q:'), classify('Hello there')
+    (None, None, None, None, None, None)
+    """
+    text = text.strip()
+    if not text:
+        return 'empty'
+    if _CJK_RE.search(text):
+        return 'chinese'
+    match = _RULE_RE.fullmatch(text)
+    if not match:
+        return None
+    return match.lastgroup
+
+
+class FilterStats:
+    """各类跳过的字幕数，以及因此不再需要的翻译请求数（相同文本只计一次）"""
+
+    def __init__(self):
+        self.total = 0
+        self.skipped = 0
+        self.categories: Dict[str, int] = {}
+        self._skipped_texts = set()
+
+    @property
+    def requests_avoided(self) -> int:
+        return len(self._skipped_texts)
+
+    def add(self, text: str, category: Optional[str]) -> None:
+        self.total += 1
+        if category is None:
+            return
+        self.skipped += 1
+        self.categories[category] = self.categories.get(category, 0) + 1
+        if category != 'empty':
+            self._skipped_texts.add(' '.join(text.split()))
+
+    def summary(self) -> str:
+        if not self.skipped:
+            return f"字幕过滤: {self.total} 条字幕均需翻译"
+        detail = '，'.join(f"{CATEGORY_LABELS.get(name, name)} {count}"
+                          for name, count in sorted(self.categories.items(), key=lambda item: -item[1]))
+        return (f"字幕过滤: {self.skipped}/{self.total} 条无需翻译（{detail}），"
+                f"避免 {self.requests_avoided} 次翻译请求")
+
+
+def needs_translation(text: str, stats: Optional[FilterStats] = None) -> bool:
+    """text 是否需要翻译；提供 stats 时记录分类结果"""
+    category = classify(text)
+    if stats is not None:
+        stats.add(text, category)
+    return category is None
+
+
+def select_translatable(cues: Sequence[Cue], stats: Optional[FilterStats] = None) -> Tuple[List[str], List[int]]:
+    """
+    一次遍历全部字幕：返回 (需要翻译的文本, 对应的字幕下标)
+    不需要翻译的字幕 zh 置空，输出时原样保留
+    """
+    texts: List[str] = []
+    positions: List[int] = []
+    for i, cue in enumerate(cues):
+        if needs_translation(cue.text, stats):
+            texts.append(cue.text)
+            positions.append(i)
+        else:
+            cue.zh = ''
+    return texts, positions
@@ -6,177 +6,51 @@ YouTube双语字幕生成器演示版本
 包含完整的错误处理和示例
 """
 import argparse
-import re
 import sys
 import os
-import time
-import tempfile
-from typing import List, Optional
-
-CHINESE_RE = re.compile(r'[\u4e00-\u9fff]')
-
-
-def download_youtube_subtitles(url: str, language: str = 'en') -> Optional[str]:
+from functools import partial
+from typing import Callable, List, Optional
+
+from cue_filter import FilterStats
+from caption_merge import add_merge_arguments
+from srt_io import Cue
+from timeline import add_timeline_arguments
+from translation_cache import TranslationCache, add_cache_arguments
+from translation_engine import DEFAULT_CONCURRENCY, Translator, batch_translate_concurrent
+from translation_journal import TranslationJournal, add_journal_arguments
+from translation_runner import run_translation
+from rate_limiter import add_rate_limit_arguments
+from progressive_srt import add_progressive_arguments
+from glossary import add_glossary_arguments
+
+
+def download_youtube_subtitles(url: str, language: str = 'en') -> Optional[List[Cue]]:
     """
-    使用 yt-dlp 下载 YouTube 字幕
+    使用 yt-dlp 下载 YouTube 字幕（单次解析，原生 json3 / vtt 字幕直接读入内存并解析）
+    返回字幕列表或 None
     """
-    try:
-        import yt_dlp
-    except ImportError:
-        print("错误: 请先安装 yt-dlp: pip install yt-dlp")
-        return None
-    
-    with tempfile.TemporaryDirectory() as temp_dir:
-        ydl_opts = {
-            'writesubtitles': True,
-            'writeautomaticsub': True,
-            'subtitleslangs': [language],
-            'subtitlesformat': 'srt',
-            'skip_download': True,
-            'outtmpl': os.path.join(temp_dir, '%(title)s.%(ext)s'),
-            'quiet': True,
-        }
-        
-        try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=True)
-                print(f"视频标题: {info.get('title', '未知')}")
-                
-            # 查找下载的字幕文件
-            for file in os.listdir(temp_dir):
-                if file.endswith('.srt'):
-                    srt_path = os.path.join(temp_dir, file)
-                    with open(srt_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        print(f"字幕下载成功，共 {len(content.splitlines())} 行")
-                        return content
-                        
-            print("未找到手动字幕，尝试自动生成字幕...")
-            
-            # 尝试自动生成的字幕
-            ydl_opts_auto = {
-                'writeautomaticsub': True,
-                'subtitlesformat': 'srt',
-                'skip_download': True,
-                'outtmpl': os.path.join(temp_dir, 'auto_%(title)s.%(ext)s'),
-                'quiet': True,
-            }
-            
-            with yt_dlp.YoutubeDL(ydl_opts_auto) as ydl:
-                ydl.download([url])
-                
-            for file in os.listdir(temp_dir):
-                if file.endswith('.srt'):
-                    srt_path = os.path.join(temp_dir, file)
-                    with open(srt_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        print(f"自动字幕下载成功，共 {len(content.splitlines())} 行")
-                        return content
-                        
-        except Exception as e:
-            print(f"下载字幕失败: {e}")
-            return None
+    from youtube_bilingual_srt import fetch_youtube_captions
     
-    return None
-
-
-def write_file(path: str, content: str) -> None:
-    with open(path, 'w', encoding='utf-8') as f:
-        f.write(content)
-
-
-def parse_srt(content: str):
-    raw_blocks = re.split(r"\r?\n\s*\r?\n", content.strip())
-    blocks = []
-    for blk in raw_blocks:
-        lines = blk.splitlines()
-        if not lines:
-            continue
-        if len(lines) >= 2 and '-->' in lines[1]:
-            index = lines[0].strip()
-            times = lines[1].strip()
-            text = "\n".join(l.rstrip() for l in lines[2:]).strip()
-        else:
-            index = ''
-            times = lines[0].strip() if '-->' in lines[0] else ''
-            text = "\n".join(lines[1:]).strip()
-        blocks.append({'index': index, 'times': times, 'text': text})
-    return blocks
-
-
-def build_srt(blocks) -> str:
-    out_blocks = []
-    for i, b in enumerate(blocks, start=1):
-        idx = b.get('index') or str(i)
-        times = b.get('times', '')
-        zh = b.get('zh', '').strip()
-        en = b.get('text', '').strip()
-        if zh:
-            combined = en + '\n' + zh
-        else:
-            combined = en
-        out_blocks.append(f"{idx}\n{times}\n{combined}")
-    return "\n\n".join(out_blocks) + "\n"
+    fetched = fetch_youtube_captions(url, language)
+    if not fetched:
+        return None
+    cues, info = fetched
+    print(f"视频标题: {info.get('title', '未知')}")
+    return cues
 
 
-def translate_single_line(text: str, api_key: str, base_url: str = "https://api.deepseek.com", model: str = "deepseek-chat") -> str:
+def translate_single_line(text: str, api_key: str, base_url: str = "https://api.deepseek.com", model: str = "deepseek-chat", cache: Optional[TranslationCache] = None, translator: Optional[Translator] = None) -> str:
     """
     逐行翻译单个文本
     """
-    try:
-        from openai import OpenAI
-    except ImportError:
-        raise ImportError("请先安装 OpenAI SDK: pip install openai")
-
-    client = OpenAI(api_key=api_key, base_url=base_url)
-
-    system_prompt = """你是一个专业的字幕翻译助手。请将英文文本准确翻译成简体中文。
-只返回翻译后的中文文本，不要添加任何序号、解释或额外文字。"""
-
-    try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"请翻译：{text}"}
-            ],
-            temperature=0.1,
-            max_tokens=100
-        )
-        
-        result = response.choices[0].message.content.strip()
-        
-        # 清理结果
-        result = re.sub(r'^\d+[\.\s]*', '', result)
-        result = re.sub(r'^[\"\']|[\"\']$', '', result)
-        result = result.strip()
-        
-        if not result or result == text:
-            return ""
-            
-        return result
-        
-    except Exception as e:
-        print(f"翻译失败: {text[:50]}... - {e}")
-        return ""
+    return batch_translate_concurrent([text], api_key, base_url, model, 1, cache, translator)[0]
 
 
-def batch_translate_improved(texts: List[str], api_key: str, base_url: str = "https://api.deepseek.com", model: str = "deepseek-chat") -> List[str]:
+def batch_translate_improved(texts: List[str], api_key: str, base_url: str = "https://api.deepseek.com", model: str = "deepseek-chat", concurrency: int = DEFAULT_CONCURRENCY, cache: Optional[TranslationCache] = None, translator: Optional[Translator] = None, journal: Optional[TranslationJournal] = None, on_result: Optional[Callable[[str, str], None]] = None) -> List[str]:
     """
-    改进的批量翻译：逐行翻译
+    改进的批量翻译：并发逐行翻译，结果顺序与输入一致
     """
-    translated = []
-    
-    for i, text in enumerate(texts):
-        print(f"翻译进度: {i+1}/{len(texts)}", end='\r')
-        
-        translation = translate_single_line(text, api_key, base_url, model)
-        translated.append(translation)
-        
-        time.sleep(0.5)
-    
-    print()
-    return translated
+    return batch_translate_concurrent(texts, api_key, base_url, model, concurrency, cache, translator, journal, on_result)
 
 
 def main():
@@ -187,6 +61,14 @@ def main():
     parser.add_argument('--deepseek-key', help='Deepseek API key')
     parser.add_argument('--deepseek-url', default='https://api.deepseek.com', help='Deepseek API base URL')
     parser.add_argument('--deepseek-model', default='deepseek-chat', help='Deepseek model name')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help=f'并发翻译请求数 (默认: {DEFAULT_CONCURRENCY})')
+    add_merge_arguments(parser)
+    add_cache_arguments(parser)
+    add_journal_arguments(parser)
+    add_rate_limit_arguments(parser)
+    add_timeline_arguments(parser)
+    add_progressive_arguments(parser)
+    add_glossary_arguments(parser)
     
     args = parser.parse_args()
 
@@ -203,9 +85,9 @@ def main():
     # 步骤1: 下载YouTube字幕
     print(f"\n步骤1: 下载 YouTube 字幕")
     print(f"链接: {args.youtube_url}")
-    subtitle_content = download_youtube_subtitles(args.youtube_url, args.language)
+    blocks = download_youtube_subtitles(args.youtube_url, args.language)
     
-    if not subtitle_content:
+    if not blocks:
         print("错误: 无法下载字幕")
         print("可能的原因:")
         print("- 视频可能没有字幕")
@@ -215,55 +97,36 @@ def main():
     
     # 步骤2: 解析字幕
     print("\n步骤2: 解析字幕")
-    blocks = parse_srt(subtitle_content)
     print(f"解析成功，共 {len(blocks)} 个字幕块")
     
     # 步骤3: 翻译字幕
-    texts_to_translate = []
-    map_idx = []
-    for idx, b in enumerate(blocks):
-        text = b.get('text', '')
-        if not text or CHINESE_RE.search(text):
-            b['zh'] = ''
-            continue
-        texts_to_translate.append(text)
-        map_idx.append(idx)
-
-    if texts_to_translate:
-        print(f"\n步骤3: 翻译字幕")
-        print(f"待翻译段落: {len(texts_to_translate)}")
-        try:
-            zh_list = batch_translate_improved(
-                texts_to_translate, 
-                api_key=args.deepseek_key,
-                base_url=args.deepseek_url,
-                model=args.deepseek_model
-            )
-            for i, zh in zip(map_idx, zh_list):
-                blocks[i]['zh'] = zh
-        except Exception as e:
-            print(f"翻译失败: {e}")
-            sys.exit(1)
-    else:
-        print('没有需要翻译的段落。')
+    print(f"\n步骤3: 翻译字幕")
+    filtered = FilterStats()
+    translate_batch = partial(
+        batch_translate_improved,
+        api_key=args.deepseek_key,
+        base_url=args.deepseek_url,
+        model=args.deepseek_model,
+        concurrency=args.concurrency
+    )
+    if not run_translation(args, blocks, args.output, translate_batch, filtered=filtered):
+        sys.exit(1)
 
     # 步骤4: 生成双语字幕
     print("\n步骤4: 生成双语字幕")
-    out = build_srt(blocks)
-    write_file(args.output, out)
     print(f"✓ 双语字幕已生成: {args.output}")
     print(f"✓ 总字幕块数: {len(blocks)}")
-    print(f"✓ 翻译段落数: {len(texts_to_translate)}")
+    print(f"✓ 翻译段落数: {filtered.total - filtered.skipped}")
     
     # 显示前几个字幕块作为示例
     print("\n示例（前3个字幕块）:")
     print("-" * 40)
     for i in range(min(3, len(blocks))):
         b = blocks[i]
-        print(f"{b.get('index')}")
-        print(f"{b.get('times')}")
-        print(f"EN: {b.get('text', '')}")
-        print(f"ZH: {b.get('zh', '')}")
+        print(f"{b.index or i + 1}")
+        print(f"{b.times}")
+        print(f"EN: {b.text}")
+        print(f"ZH: {b.zh}")
         print()
 
 
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+ffmpeg_progress.py
+
+运行 ffmpeg 并实时解析 -progress pipe:1 输出。
+每个进度块（以 progress=continue/end 结尾）解析为一个 FfmpegProgress 事件，
+包含已编码帧数、编码 fps、速度倍率、已输出时长和预计剩余时间，通过回调交给调用方；
+stderr 只保留最后若干行用于报错，不再整体缓存在内存中。
+运行结束后返回 FfmpegRun，包含总用时和实时倍率。
+
+用法:
+  run = run_ffmpeg(cmd, duration=3600, on_progress=print_progress)
+  if run.returncode != 0:
+      print(run.stderr_tail)
+  print(run.summary())
+"""
+import collections
+import json
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, TextIO
+
+STDERR_TAIL_LINES = 50
+
+
+class FfmpegProgress:
+    """一次进度事件"""
+
+    def __init__(self, duration: Optional[float] = None, label: str = 'ffmpeg'):
+        self.label = label
+        self.duration = duration
+        self.frame = 0
+        self.fps = 0.0
+        self.speed = 0.0
+        self.out_time = 0.0
+        self.elapsed = 0.0
+        self.done = False
+
+    @property
+    def percent(self) -> Optional[float]:
+        if not self.duration:
+            return None
+        return min(100.0, self.out_time / self.duration * 100)
+
+    @property
+    def eta(self) -> Optional[float]:
+        """按当前速度倍率估算的剩余秒数"""
+        if not self.duration or self.speed <= 0:
+            return None
+        return max(0.0, (self.duration - self.out_time) / self.speed)
+
+    def update(self, fields: Dict[str, str]) -> None:
+        """用一个进度块中的 key=value 字段更新状态；N/A 等无法解析的值保留上一次的结果"""
+        def number(key, cast=float):
+            try:
+                return cast(fields[key].rstrip('x'))
+            except (KeyError, ValueError):
+                return None
+
+        frame = number('frame', int)
+        fps = number('fps')
+        speed = number('speed')
+        # out_time_ms 实际上也是微秒，优先使用 out_time_us
+        out_us = number('out_time_us', int)
+        if out_us is None:
+            out_us = number('out_time_ms', int)
+        if frame is not None:
+            self.frame = frame
+        if fps is not None:
+            self.fps = fps
+        if speed is not None:
+            self.speed = speed
+        if out_us is not None and out_us >= 0:
+            self.out_time = out_us / 1_000_000
+        self.done = fields.get('progress') == 'end'
+
+    def to_dict(self) -> dict:
+        return {
+            'label': self.label,
+            'frame': self.frame,
+            'fps': self.fps,
+            'speed': self.speed,
+            'out_time': round(self.out_time, 3),
+            'duration': self.duration,
+            'percent': None if self.percent is None else round(self.percent, 2),
+            'eta': None if self.eta is None else round(self.eta, 1),
+            'elapsed': round(self.elapsed, 3),
+            'done': self.done,
+        }
+
+
+class FfmpegRun:
+    """一次 ffmpeg 运行的结果"""
+
+    def __init__(self, label: str, returncode: int, stderr_tail: str, wall_time: float, progress: FfmpegProgress):
+        self.label = label
+        self.returncode = returncode
+        self.stderr_tail = stderr_tail
+        self.wall_time = wall_time
+        self.progress = progress
+
+    @property
+    def realtime_factor(self) -> float:
+        """处理的媒体时长 / 实际用时"""
+        media = self.progress.duration or self.progress.out_time
+        return media / self.wall_time if self.wall_time > 0 else 0.0
+
+    def summary(self) -> str:
+        media = self.progress.duration or self.progress.out_time
+        avg_fps = self.progress.frame / self.wall_time if self.wall_time > 0 else 0.0
+        return (f"{self.label}: 用时 {self.wall_time:.1f}s，处理 {media:.1f}s 视频，"
+                f"实时倍率 {self.realtime_factor:.2f}x，平均 {avg_fps:.1f} fps")
+
+
+def _format_seconds(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return '--:--:--'
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def print_progress(progress: FfmpegProgress) -> None:
+    """默认回调：在同一行刷新进度"""
+    percent = f"{progress.percent:5.1f}%" if progress.percent is not None else f"{progress.out_time:.0f}s"
+    print(f"{progress.label}: {percent} fps={progress.fps:.1f} speed={progress.speed:.2f}x "
+          f"剩余 {_format_seconds(progress.eta)}", end='\n' if progress.done else '\r', flush=True)
+
+
+class JsonlProgressLog:
+    """把进度事件和运行统计逐行写入 JSONL 文件，便于汇总各机器的编码吞吐"""
+
+    def __init__(self, path: str, echo: Optional[Callable[[FfmpegProgress], None]] = print_progress):
+        self._file: TextIO = open(path, 'a', encoding='utf-8')
+        self._echo = echo
+        self._lock = threading.Lock()
+
+    def _write(self, record: dict) -> None:
+        with self._lock:
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self._file.flush()
+
+    def __call__(self, progress: FfmpegProgress) -> None:
+        self._write(dict(progress.to_dict(), event='progress', time=time.time()))
+        if self._echo is not None:
+            self._echo(progress)
+
+    def record_run(self, run: FfmpegRun) -> None:
+        self._write({
+            'event': 'summary', 'time': time.time(), 'label': run.label, 'returncode': run.returncode,
+            'wall_time': round(run.wall_time, 3), 'media_time': run.progress.duration or run.progress.out_time,
+            'realtime_factor': round(run.realtime_factor, 3), 'frames': run.progress.frame,
+        })
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ProgressAggregator:
+    """
+    合并多个并行 ffmpeg 进程（如分段烧录）的进度：
+    已输出时长和帧数求和，fps 和速度倍率为各进程之和
+    """
+
+    def __init__(self, duration: Optional[float], on_progress: Optional[Callable[[FfmpegProgress], None]],
+                 label: str = '编码进度'):
+        self.total = FfmpegProgress(duration, label)
+        self.on_progress = on_progress
+        self.parts: Dict[int, FfmpegProgress] = {}
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def callback(self, key: int) -> Callable[[FfmpegProgress], None]:
+        def update(progress: FfmpegProgress) -> None:
+            with self._lock:
+                self.parts[key] = progress
+                parts = self.parts.values()
+                self.total.frame = sum(p.frame for p in parts)
+                self.total.out_time = sum(p.out_time for p in parts)
+                self.total.fps = sum(p.fps for p in parts if not p.done)
+                self.total.speed = sum(p.speed for p in parts if not p.done)
+                self.total.elapsed = time.monotonic() - self.started
+                if self.on_progress is not None:
+                    self.on_progress(self.total)
+        return update
+
+    def finish(self) -> None:
+        """所有分段完成后发出最终事件"""
+        with self._lock:
+            self.total.done = True
+            self.total.elapsed = time.monotonic() - self.started
+            if self.total.duration:
+                self.total.out_time = self.total.duration
+            if self.on_progress is not None:
+                self.on_progress(self.total)
+
+
+def run_ffmpeg(cmd: List[str], duration: Optional[float] = None,
+               on_progress: Optional[Callable[[FfmpegProgress], None]] = None,
+               label: str = 'ffmpeg') -> FfmpegRun:
+    """
+    运行 ffmpeg，增量解析 -progress 输出并调用 on_progress
+    duration 为输入媒体时长（秒），用于计算百分比和剩余时间
+    """
+    cmd = [cmd[0], '-progress', 'pipe:1', '-nostats'] + list(cmd[1:])
+    progress = FfmpegProgress(duration, label)
+    tail: collections.deque = collections.deque(maxlen=STDERR_TAIL_LINES)
+    started = time.monotonic()
+
+    proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            text=True, encoding='utf-8', errors='replace')
+
+    # stderr 在后台线程中持续读取，避免管道写满阻塞 ffmpeg
+    def drain_stderr():
+        for line in proc.stderr:
+            tail.append(line)
+
+    reader = threading.Thread(target=drain_stderr, daemon=True)
+    reader.start()
+
+    fields: Dict[str, str] = {}
+    for line in proc.stdout:
+        key, sep, value = line.strip().partition('=')
+        if not sep:
+            continue
+        fields[key] = value
+        if key == 'progress':
+            progress.update(fields)
+            progress.elapsed = time.monotonic() - started
+            if on_progress is not None:
+                on_progress(progress)
+            fields = {}
+
+    returncode = proc.wait()
+    reader.join()
+    return FfmpegRun(label, returncode, ''.join(tail), time.monotonic() - started, progress)
+
+
+def add_progress_arguments(parser) -> None:
+    """为命令行添加 ffmpeg 进度日志参数"""
+    parser.add_argument('--ffmpeg-progress-log',
+                        help='把 ffmpeg 进度事件和每次运行的统计（用时、实时倍率）以 JSONL 追加写入该文件')
+
+
+def progress_callback(args) -> Optional[Callable[[FfmpegProgress], None]]:
+    """根据命令行参数返回进度回调：指定日志文件时写 JSONL 并同时在终端显示，否则只在终端显示"""
+    path = getattr(args, 'ffmpeg_progress_log', None)
+    if path:
+        return JsonlProgressLog(path)
+    return print_progress if sys.stdout.isatty() else None
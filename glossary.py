@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+glossary.py
+
+领域术语表（EN → ZH）。
+术语按单词序列装入 Aho-Corasick 自动机，扫描一条字幕只需要对其单词线性走一遍，
+与术语表大小无关；十万条以上的术语表查找速度不变。
+匹配不区分大小写，按单词边界进行（"BCL-2"、"bcl 2" 都是单词 bcl、2），
+重叠时取最左最长的术语。
+
+翻译时：
+- 完全由术语（及标点）组成的字幕直接用术语表拼出译文，不请求 API；
+- 其余字幕只把其中出现的术语作为提示加入提示词，保证译法一致。
+
+术语表文件:
+  TSV / CSV：每行 "英文<TAB>中文" 或 "英文,中文"，# 开头的行为注释
+  JSON：{"英文": "中文", ...} 或 [["英文", "中文"], ...]
+
+用法:
+  glossary = load_glossary('glossaries/biomed.tsv')
+  with Translator(api_key, glossary=glossary) as translator:
+      zh_list = batch_translate_concurrent(texts, translator=translator)
+  print(glossary.summary())
+"""
+import csv
+import hashlib
+import json
+import re
+import sys
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 一条字幕最多由几个术语拼成时直接采用术语表译文，更多时交给模型，避免逐词硬译整句
+DEFAULT_MAX_RESOLVE_TERMS = 3
+# 单次请求最多注入的术语数
+DEFAULT_MAX_HINTS = 50
+
+_WORD_RE = re.compile(r'\w+')
+_ASCII_ALNUM_RE = re.compile(r'[A-Za-z0-9]')
+_PUNCT_ZH = str.maketrans({',': '，', '.': '。', ';': '；', ':': '：', '?': '？', '!': '！'})
+_HEADERS = {('en', 'zh'), ('english', 'chinese'), ('term', 'translation'), ('source', 'target')}
+# 没有子节点的状态共用的空转移表（只读）
+_NO_CHILDREN: Dict[str, int] = {}
+
+
+class Glossary:
+    """
+    术语表及其 Aho-Corasick 自动机
+    状态按单词转移；每个状态记录失败指针、在此结束的术语和输出链接（失败链上最近的术语状态）
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, str]] = (), max_resolve_terms: int = DEFAULT_MAX_RESOLVE_TERMS):
+        self.max_resolve_terms = max_resolve_terms
+        self.terms: List[str] = []
+        self.targets: List[str] = []
+        self.resolved = 0
+        self.hinted = 0
+        self._goto: List[Dict[str, int]] = [{}]
+        self._term: List[int] = [-1]
+        self._depth: List[int] = [0]
+        self._fail: List[int] = [0]
+        self._link: List[int] = [0]
+        self._built = False
+        self._fingerprint: Optional[str] = None
+        for term, zh in entries:
+            self.add(term, zh)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def add(self, term: str, zh: str) -> None:
+        """添加一条术语；同一术语（忽略大小写和单词间的标点）后加入的译法覆盖先前的"""
+        words = _WORD_RE.findall(term.lower())
+        zh = zh.strip()
+        if not words or not zh:
+            return
+        node = 0
+        for word in words:
+            nxt = self._goto[node].get(word)
+            if nxt is None:
+                nxt = len(self._goto)
+                if self._goto[node] is _NO_CHILDREN:
+                    self._goto[node] = {}
+                self._goto[node][sys.intern(word)] = nxt
+                self._goto.append(_NO_CHILDREN)
+                self._term.append(-1)
+                self._depth.append(self._depth[node] + 1)
+            node = nxt
+        if self._term[node] >= 0:
+            self.targets[self._term[node]] = zh
+        else:
+            self._term[node] = len(self.terms)
+            self.terms.append(term.strip())
+            self.targets.append(zh)
+        self._built = False
+        self._fingerprint = None
+
+    def build(self) -> None:
+        """按广度优先计算失败指针和输出链接"""
+        n = len(self._goto)
+        fail = [0] * n
+        link = [0] * n
+        goto, term = self._goto, self._term
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for word, child in goto[node].items():
+                f = fail[node]
+                while f and word not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(word, 0) if node else 0
+                fail[child] = target
+                link[child] = target if term[target] >= 0 else link[target]
+                queue.append(child)
+        self._fail, self._link = fail, link
+        self._built = True
+
+    def find(self, text: str) -> Tuple[List[Tuple[int, int, int]], int]:
+        """
+        返回 (匹配列表, 单词数)；匹配为 (起始字符, 结束字符, 术语编号)，按位置排列、互不重叠、最左最长
+        """
+        if not self._built:
+            self.build()
+        tokens = [(m.start(), m.end()) for m in _WORD_RE.finditer(text)]
+        if not tokens or not self.terms:
+            return [], len(tokens)
+        goto, fail, term, link, depth = self._goto, self._fail, self._term, self._link, self._depth
+
+        # 起始单词 -> (结束单词, 术语编号)，同一起点只保留最长的
+        best: Dict[int, Tuple[int, int]] = {}
+        node = 0
+        for k, (s, e) in enumerate(tokens):
+            word = text[s:e].lower()
+            while node and word not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(word, 0)
+            out = node if term[node] >= 0 else link[node]
+            while out:
+                start = k - depth[out] + 1
+                if start not in best or best[start][0] < k:
+                    best[start] = (k, term[out])
+                out = link[out]
+
+        matches = []
+        covered_to = -1
+        for start in sorted(best):
+            if start <= covered_to:
+                continue
+            end, tid = best[start]
+            matches.append((tokens[start][0], tokens[end][1], tid))
+            covered_to = end
+        return matches, len(tokens)
+
+    def resolve(self, text: str) -> Optional[str]:
+        """
+        字幕完全由术语和标点组成时返回拼出的译文，否则返回 None
+        译文与原文相同（如 "p53"）时返回空字符串，输出中不重复显示
+        """
+        matches, words = self.find(text)
+        if not matches or len(matches) > self.max_resolve_terms:
+            return None
+        if sum(len(_WORD_RE.findall(text[s:e])) for s, e, _ in matches) != words:
+            return None
+        pieces: List[str] = []
+        pos = 0
+        for s, e, tid in matches + [(len(text), len(text), -1)]:
+            gap = text[pos:s].strip().translate(_PUNCT_ZH)
+            if gap:
+                pieces.append(gap)
+            if tid >= 0:
+                zh = self.targets[tid]
+                # 相邻两段都是拉丁字母或数字时保留空格
+                if pieces and _ASCII_ALNUM_RE.match(pieces[-1][-1]) and _ASCII_ALNUM_RE.match(zh[0]):
+                    pieces.append(' ')
+                pieces.append(zh)
+            pos = e
+        zh = ''.join(pieces)
+        return '' if zh == text.strip() else zh
+
+    def hints(self, texts: Sequence[str], limit: int = DEFAULT_MAX_HINTS) -> List[Tuple[str, str]]:
+        """texts 中出现的术语 (英文, 中文)，按首次出现的顺序去重，最多 limit 条"""
+        seen: Dict[int, None] = {}
+        for text in texts:
+            for _, _, tid in self.find(text)[0]:
+                seen.setdefault(tid, None)
+                if len(seen) >= limit:
+                    break
+            if len(seen) >= limit:
+                break
+        return [(self.terms[tid], self.targets[tid]) for tid in seen]
+
+    def prompt_section(self, texts: Sequence[str], limit: int = DEFAULT_MAX_HINTS) -> str:
+        """附加到系统提示词后的术语说明；没有匹配的术语时返回空字符串"""
+        hints = self.hints(texts, limit)
+        if not hints:
+            return ''
+        self.hinted += 1
+        lines = '\n'.join(f"{en} → {zh}" for en, zh in hints)
+        return f"\n\n以下术语请使用指定译法：\n{lines}"
+
+    def fingerprint(self) -> str:
+        """术语表内容的哈希，加入缓存键，术语表变化后旧缓存不再命中"""
+        if self._fingerprint is None:
+            digest = hashlib.sha256()
+            for term, zh in sorted(zip(self.terms, self.targets)):
+                digest.update(f"{term}\x1f{zh}\x1e".encode('utf-8'))
+            self._fingerprint = digest.hexdigest()[:16]
+        return self._fingerprint
+
+    def summary(self) -> str:
+        return f"术语表: {len(self)} 条术语，直接解析 {self.resolved} 段字幕，{self.hinted} 次请求附带术语提示"
+
+
+def prompt_with_glossary(prompt: str, glossary: Optional[Glossary], texts: Sequence[str]) -> str:
+    """在系统提示词后附加 texts 中出现的术语"""
+    return prompt + glossary.prompt_section(texts) if glossary is not None else prompt
+
+
+def cache_prompt(prompt: str, glossary: Optional[Glossary]) -> str:
+    """计算缓存键用的提示词：使用术语表时加入其指纹"""
+    return f"{prompt}\x1fglossary:{glossary.fingerprint()}" if glossary is not None else prompt
+
+
+def translate_with_glossary(texts: List[str], translate_fn: Callable[[List[str]], List[str]],
+                            glossary: Optional[Glossary],
+                            on_result: Optional[Callable[[str, str], None]] = None) -> List[str]:
+    """
+    先用术语表直接解析完全由术语组成的文本，只把剩下的交给 translate_fn
+    提供 on_result 时，解析出的译文立即逐条交给 on_result(原文, 译文)
+    """
+    if glossary is None or not texts:
+        return translate_fn(texts)
+
+    results = [''] * len(texts)
+    missing = []
+    for i, text in enumerate(texts):
+        zh = glossary.resolve(text)
+        if zh is None:
+            missing.append(i)
+            continue
+        results[i] = zh
+        glossary.resolved += 1
+        if on_result is not None:
+            on_result(text, zh)
+    if missing:
+        for i, zh in zip(missing, translate_fn([texts[i] for i in missing])):
+            results[i] = zh
+    return results
+
+
+def _read_rows(path: str) -> Iterable[Sequence[str]]:
+    if path.lower().endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data.items() if isinstance(data, dict) else data
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        lines = [line for line in f if line.strip() and not line.lstrip().startswith('#')]
+    delimiter = '\t' if lines and '\t' in lines[0] else ','
+    return list(csv.reader(lines, delimiter=delimiter))
+
+
+def load_glossary(path: str, max_resolve_terms: int = DEFAULT_MAX_RESOLVE_TERMS) -> Glossary:
+    """读取 TSV / CSV / JSON 术语表并构建自动机"""
+    glossary = Glossary(max_resolve_terms=max_resolve_terms)
+    for n, row in enumerate(_read_rows(path)):
+        if isinstance(row, dict):
+            row = (row.get('en', ''), row.get('zh', ''))
+        if len(row) < 2:
+            continue
+        en, zh = str(row[0]).strip(), str(row[1]).strip()
+        if n == 0 and (en.lower(), zh.lower()) in _HEADERS:
+            continue
+        glossary.add(en, zh)
+    glossary.build()
+    return glossary
+
+
+def add_glossary_arguments(parser) -> None:
+    """为命令行添加术语表参数"""
+    parser.add_argument('--glossary', help='术语表文件（TSV/CSV: 英文<TAB>中文，或 JSON），'
+                                           '完全由术语组成的字幕不再请求 API，其余字幕的提示词附带其中出现的术语')
+    parser.add_argument('--glossary-max-terms', type=int, default=DEFAULT_MAX_RESOLVE_TERMS,
+                        help=f'字幕最多由几个术语拼成时直接使用术语表译文 (默认: {DEFAULT_MAX_RESOLVE_TERMS})')
+
+
+def open_glossary(args) -> Optional[Glossary]:
+    """根据命令行参数加载术语表，加载失败时给出警告并继续不使用术语表"""
+    path = getattr(args, 'glossary', None)
+    if not path:
+        return None
+    try:
+        glossary = load_glossary(path, args.glossary_max_terms)
+    except (OSError, ValueError, csv.Error) as e:
+        print(f"警告: 无法读取术语表 {path}: {e}")
+        return None
+    print(f"术语表: 已加载 {len(glossary)} 条术语")
+    return glossary
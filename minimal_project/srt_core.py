@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+SRT解析与翻译请求的基础工具
+简洁版本自带的精简副本，不依赖主项目：
+- Cue / iter_srt: 单遍流式 SRT 解析，逐条产出字幕，兼容 BOM、CRLF 和缺少序号行的块
+- RateLimiter:    令牌桶限制每分钟请求数和 token 数；429 / 5xx / 网络错误时指数退避重试，
+                  优先遵守服务端的 Retry-After。请求是串行发出的，不需要主项目的 AIMD 并发控制
+- estimate_tokens: 粗略估算 token 数
+"""
+import email.utils
+import math
+import random
+import re
+import time
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+SrtSource = Union[str, Iterable[str]]
+
+_TIMESTAMP_RE = re.compile(r'(\d+):(\d{1,2}):(\d{1,2})[,.](\d{1,3})')
+_CJK_RE = re.compile(r'[\u3000-\u30ff\u4e00-\u9fff\uff00-\uffef]')
+
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF_BASE = 1.0
+DEFAULT_BACKOFF_CAP = 60.0
+_RETRYABLE_STATUS = {408, 409, 500, 502, 503, 504}
+# 令牌桶容量相当于多少秒的配额，决定允许的突发量
+DEFAULT_BURST_SECONDS = 5.0
+
+
+def parse_timestamp(ts: str) -> Optional[int]:
+    """时间戳转毫秒，无法解析时返回 None"""
+    m = _TIMESTAMP_RE.search(ts)
+    if not m:
+        return None
+    h, mi, s, ms = m.groups()
+    return ((int(h) * 60 + int(mi)) * 60 + int(s)) * 1000 + int(ms.ljust(3, '0'))
+
+
+def parse_times(times: str) -> Tuple[Optional[int], Optional[int]]:
+    if '-->' not in times:
+        return None, None
+    start, end = times.split('-->', 1)
+    return parse_timestamp(start), parse_timestamp(end)
+
+
+class Cue:
+    """一条字幕：序号、时间行、原文和译文；时间轴在首次访问时解析为毫秒"""
+    __slots__ = ('index', 'times', 'text', 'zh', '_span')
+
+    def __init__(self, index: str = '', times: str = '', text: str = '', zh: str = ''):
+        self.index = index
+        self.times = times
+        self.text = text
+        self.zh = zh
+        self._span: Optional[Tuple[Optional[int], Optional[int]]] = None
+
+    @property
+    def start_ms(self) -> Optional[int]:
+        if self._span is None:
+            self._span = parse_times(self.times)
+        return self._span[0]
+
+    @property
+    def end_ms(self) -> Optional[int]:
+        if self._span is None:
+            self._span = parse_times(self.times)
+        return self._span[1]
+
+    def __repr__(self) -> str:
+        return f"Cue(index={self.index!r}, times={self.times!r}, text={self.text!r}, zh={self.zh!r})"
+
+
+def _iter_chunks(source: SrtSource, chunk_size: int) -> Iterator[str]:
+    if isinstance(source, str):
+        yield source
+        return
+    read = getattr(source, 'read', None)
+    if read is not None:
+        while True:
+            chunk = read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        yield from source
+
+
+def _make_cue(lines: List[str]) -> Cue:
+    if len(lines) >= 2 and '-->' in lines[1]:
+        return Cue(lines[0].strip(), lines[1].strip(), "\n".join(l.rstrip() for l in lines[2:]).strip())
+    # 没有序号行时容错解析
+    times = lines[0].strip() if '-->' in lines[0] else ''
+    return Cue('', times, "\n".join(lines[1:]).strip())
+
+
+def iter_srt(source: SrtSource, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Cue]:
+    """从字符串、文件对象或字符串迭代器中逐条产出 Cue，空行（含只有空白的行）分隔字幕块"""
+    current: List[str] = []
+    pending = ''
+    first = True
+
+    for chunk in _iter_chunks(source, chunk_size):
+        if first:
+            chunk = chunk.lstrip('\ufeff')
+            first = not chunk
+        text = pending + chunk
+        lines = text.splitlines()
+        # 最后一行可能不完整，末尾的 \r 也可能是被切开的 \r\n，留给下一块
+        if text.endswith('\n'):
+            pending = ''
+        else:
+            pending = (lines.pop() if lines else '') + ('\r' if text.endswith('\r') else '')
+
+        for line in lines:
+            if line and not line.isspace():
+                current.append(line)
+            elif current:
+                yield _make_cue(current)
+                current = []
+
+    for line in pending.splitlines():
+        if line and not line.isspace():
+            current.append(line)
+        elif current:
+            yield _make_cue(current)
+            current = []
+    if current:
+        yield _make_cue(current)
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：英文约 4 字符 1 个 token，中日韩字符约 1 字 1 个 token"""
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def parse_retry_after(headers) -> Optional[float]:
+    """解析 Retry-After（秒数或 HTTP 日期），返回秒数"""
+    value = headers.get('retry-after') if headers else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """按 rate_per_min 匀速补充的令牌桶；单次需求超过容量时允许透支，后续请求等待补足"""
+
+    def __init__(self, rate_per_min: float, burst_seconds: float = DEFAULT_BURST_SECONDS):
+        self.rate = rate_per_min / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float) -> float:
+        """尝试取出 amount 个令牌，成功返回 0，否则返回需要等待的秒数"""
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        need = min(amount, self.capacity)
+        if self.level >= need:
+            self.level -= amount
+            return 0.0
+        return (need - self.level) / self.rate
+
+
+class RateLimiter:
+    """
+    串行请求的令牌桶 + 退避重试：被限流或出现临时错误时等待后重试，重试耗尽后抛出最后的异常
+    rpm / tpm 为 None 时不限制对应维度，只做退避重试
+    """
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None,
+                 max_retries: int = DEFAULT_MAX_RETRIES):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.max_retries = max_retries
+        self.throttled = 0
+        self.retries = 0
+        self.failures = 0
+
+    def acquire(self, tokens: float = 0) -> None:
+        """等待直到令牌桶允许发出请求"""
+        while True:
+            wait = self.requests.reserve(1) if self.requests else 0.0
+            if not wait and self.tokens:
+                wait = self.tokens.reserve(tokens)
+                if wait and self.requests:
+                    # 请求令牌已经取出，token 配额不足时还回去
+                    self.requests.level += 1
+            if not wait:
+                return
+            time.sleep(wait)
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        response = getattr(error, 'response', None)
+        status = getattr(response, 'status_code', None)
+        retry_after = parse_retry_after(getattr(response, 'headers', None))
+        if status == 429:
+            self.throttled += 1
+        if status is not None:
+            retryable = status == 429 or status in _RETRYABLE_STATUS or status >= 500
+        else:
+            # 没有状态码：连接失败、超时等网络错误可以重试
+            name = type(error).__name__
+            retryable = isinstance(error, OSError) or 'Connection' in name or 'Timeout' in name
+        if not retryable or attempt >= self.max_retries:
+            self.failures += 1
+            return None
+        self.retries += 1
+        if retry_after is not None:
+            return retry_after + random.uniform(0, DEFAULT_BACKOFF_BASE)
+        return random.uniform(0, min(DEFAULT_BACKOFF_CAP, DEFAULT_BACKOFF_BASE * (2 ** attempt)))
+
+    def call(self, call: Callable[[], Any], tokens: float = 0) -> Any:
+        """在令牌桶限制下执行请求，tokens 为本次请求估算的 token 数"""
+        attempt = 0
+        while True:
+            self.acquire(tokens)
+            try:
+                return call()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
@@ -3,92 +3,89 @@
 YouTube双语字幕生成模块
 简洁版本 - 专为GitHub发布优化
 """
-import json
-import time
-import requests
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Optional
 
+from srt_core import Cue, RateLimiter, estimate_tokens, iter_srt
 
-def parse_srt(content: str) -> List[Dict[str, Any]]:
-    """解析SRT字幕文件"""
+if TYPE_CHECKING:
+    import requests
+
+# requests 在第一次发起翻译请求时才导入
+_session: Optional['requests.Session'] = None
+_limiter: Optional[RateLimiter] = None
+
+
+def get_session(pool_size: int = 8) -> 'requests.Session':
+    """返回共享的 keep-alive 会话，所有翻译请求复用同一个连接池"""
+    global _session
+    if _session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        _session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        _session.mount('https://', adapter)
+        _session.mount('http://', adapter)
+    return _session
+
+
+def get_rate_limiter(rpm: Optional[float] = None, tpm: Optional[float] = None) -> RateLimiter:
+    """
+    返回共享的限流器：按 rpm / tpm 限速，429 时遵守 Retry-After 并指数退避，取代固定的 sleep
+    rpm / tpm 只在第一次创建时生效
+    """
+    global _limiter
+    if _limiter is None:
+        _limiter = RateLimiter(rpm, tpm)
+    return _limiter
+
+
+def parse_srt(content) -> List[Cue]:
+    """解析SRT字幕文件（字符串或文件对象），多行文本合并为一行"""
     blocks = []
-    lines = content.strip().split('\n')
-    i = 0
-    
-    while i < len(lines):
-        line = lines[i].strip()
-        if not line:
-            i += 1
+    for cue in iter_srt(content):
+        if cue.start_ms is None or cue.end_ms is None:
             continue
-            
-        try:
-            # 序号
-            num = int(line)
-            i += 1
-            
-            # 时间轴
-            if i < len(lines):
-                timeline = lines[i].strip()
-                i += 1
-            else:
-                break
-                
-            # 字幕文本
-            text_lines = []
-            while i < len(lines) and lines[i].strip():
-                text_lines.append(lines[i].strip())
-                i += 1
-                
-            text = ' '.join(text_lines)
-            
-            # 解析时间
-            if ' --> ' in timeline:
-                start_time, end_time = timeline.split(' --> ')
-                blocks.append({
-                    'num': num,
-                    'start': start_time.strip(),
-                    'end': end_time.strip(),
-                    'text': text
-                })
-                
-        except ValueError:
-            i += 1
-            
+        cue.text = ' '.join(line.strip() for line in cue.text.splitlines())
+        blocks.append(cue)
     return blocks
 
 
-def build_srt(blocks: List[Dict[str, Any]]) -> str:
+def build_srt(blocks: List[Cue]) -> str:
     """构建SRT字幕内容"""
     content = []
     for i, block in enumerate(blocks):
         content.append(str(i + 1))
-        content.append(f"{block['start']} --> {block['end']}")
+        content.append(block.times)
         
         # 英文原文
-        if block.get('text'):
-            content.append(block['text'])
+        if block.text:
+            content.append(block.text)
         
         # 中文翻译
-        if block.get('zh'):
-            content.append(block['zh'])
+        if block.zh:
+            content.append(block.zh)
         
         content.append('')
     
     return '\n'.join(content)
 
 
-def batch_translate_improved(texts: List[str], api_key: str) -> List[str]:
-    """批量翻译文本"""
+def batch_translate_improved(texts: List[str], api_key: str, session: Optional['requests.Session'] = None,
+                             limiter: Optional[RateLimiter] = None,
+                             base_url: str = "https://api.deepseek.com") -> List[str]:
+    """批量翻译文本，失败的段落返回空字符串（不写入字幕，下次运行可重试）"""
     if not texts:
         return []
     
     # Deepseek API配置
-    url = "https://api.deepseek.com/chat/completions"
+    url = f"{base_url.rstrip('/')}/chat/completions"
     headers = {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {api_key}"
     }
     
+    session = session or get_session()
+    limiter = limiter or get_rate_limiter()
     zh_list = []
     batch_size = 5  # 小批量处理避免超时
     
@@ -110,9 +107,13 @@ def batch_translate_improved(texts: List[str], api_key: str) -> List[str]:
             "max_tokens": 2000
         }
         
-        try:
-            response = requests.post(url, headers=headers, json=data, timeout=30)
+        def request():
+            response = session.post(url, headers=headers, json=data, timeout=30)
             response.raise_for_status()
+            return response
+        
+        try:
+            response = limiter.call(request, tokens=estimate_tokens(prompt) + data["max_tokens"])
             
             result = response.json()
             translated_text = result['choices'][0]['message']['content']
@@ -138,15 +139,15 @@ def batch_translate_improved(texts: List[str], api_key: str) -> List[str]:
             if len(batch_translations) == len(batch):
                 zh_list.extend(batch_translations)
             else:
-                # 如果解析失败，使用原始文本作为占位符
-                zh_list.extend(["翻译失败"] * len(batch))
+                # 数量对不上时无法对齐，留空而不是写入占位文字
+                print(f"翻译批次 {i//batch_size + 1} 返回 {len(batch_translations)} 行，预期 {len(batch)} 行，已跳过")
+                zh_list.extend([""] * len(batch))
             
             print(f"翻译进度: {min(i + len(batch), len(texts))}/{len(texts)}")
-            time.sleep(1)  # 避免API限制
             
         except Exception as e:
             print(f"翻译批次 {i//batch_size + 1} 失败: {e}")
-            zh_list.extend(["翻译失败"] * len(batch))
+            zh_list.extend([""] * len(batch))
     
     return zh_list
 
@@ -166,7 +167,7 @@ This is a test
     blocks = parse_srt(test_srt)
     print("解析结果:")
     for block in blocks:
-        print(f"{block['start']} --> {block['end']}: {block['text']}")
+        print(f"{block.times}: {block.text}")
     
     # 测试构建
     rebuilt = build_srt(blocks)
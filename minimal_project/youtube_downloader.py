@@ -5,11 +5,15 @@ YouTube视频下载与双语字幕合并工具
 """
 import argparse
 import os
+import re
 import sys
 import subprocess
 import tempfile
 import shutil
 from pathlib import Path
+from typing import Optional
+
+CHINESE_RE = re.compile(r'[\u4e00-\u9fff]')
 
 
 def download_youtube_video(url: str, output_folder: str) -> dict:
@@ -63,30 +67,28 @@ def download_youtube_video(url: str, output_folder: str) -> dict:
         return None
 
 
-def translate_subtitles(subtitle_file: str, api_key: str, output_folder: str) -> str:
-    """翻译字幕文件"""
+def translate_subtitles(subtitle_file: str, api_key: str, output_folder: str,
+                        rpm: Optional[float] = None, tpm: Optional[float] = None) -> str:
+    """翻译字幕文件，rpm / tpm 为每分钟请求数和 token 数上限（None 为不限制）"""
     try:
-        sys.path.append(os.path.dirname(__file__))
-        from youtube_bilingual_srt import parse_srt, build_srt, batch_translate_improved
+        from youtube_bilingual_srt import parse_srt, build_srt, batch_translate_improved, get_rate_limiter
         
         with open(subtitle_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        blocks = parse_srt(content)
+            blocks = parse_srt(f)
         
         texts_to_translate = []
         map_idx = []
         for idx, b in enumerate(blocks):
-            text = b.get('text', '')
-            if text and not any(c in '\u4e00-\u9fff' for c in text):
+            text = b.text
+            if text and not CHINESE_RE.search(text):
                 texts_to_translate.append(text)
                 map_idx.append(idx)
         
         if texts_to_translate:
             print(f"翻译字幕段落: {len(texts_to_translate)}")
-            zh_list = batch_translate_improved(texts_to_translate, api_key)
+            zh_list = batch_translate_improved(texts_to_translate, api_key, limiter=get_rate_limiter(rpm, tpm))
             for i, zh in zip(map_idx, zh_list):
-                blocks[i]['zh'] = zh
+                blocks[i].zh = zh
         
         bilingual_content = build_srt(blocks)
         
@@ -168,6 +170,8 @@ def main():
     parser.add_argument('youtube_url', help='YouTube视频链接')
     parser.add_argument('output_folder', help='输出文件夹路径')
     parser.add_argument('--deepseek-key', help='Deepseek API key')
+    parser.add_argument('--rpm', type=float, help='每分钟最多请求数 (默认: 不限制，遇到 429 时自动退避)')
+    parser.add_argument('--tpm', type=float, help='每分钟最多 token 数 (默认: 不限制)')
     
     args = parser.parse_args()
 
@@ -230,7 +234,9 @@ def main():
         bilingual_subtitle = translate_subtitles(
             download_result['subtitle_file'], 
             args.deepseek_key, 
-            args.output_folder
+            args.output_folder,
+            args.rpm,
+            args.tpm
         )
         
         if bilingual_subtitle:
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+progressive_srt.py
+
+翻译过程中按字幕顺序渐进写出双语 SRT。
+每得到一条译文（逐行请求完成、流式批次中解析出一个条目、缓存或断点日志命中）就填入对应字幕，
+从头开始连续完成的字幕立即追加到输出文件，播放器可以在翻译进行时先加载前面的部分。
+全部完成后把最终内容（含时间轴调整）写入临时文件，再原子替换输出文件。
+同时记录第一条带译文的字幕写出所用的时间（time-to-first-cue）。
+
+用法:
+  writer = open_progressive(args.output, blocks, texts_to_translate, map_idx, args.merge_sentences, args.progressive)
+  zh_list = translate(texts_to_translate, on_result=writer.record)
+  writer.finish(build_srt(blocks))
+  print(writer.summary())
+"""
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from caption_merge import plan_merge, redistribute
+from srt_io import Cue, format_cue
+from translation_engine import normalize_text
+
+
+class ProgressiveSrtWriter:
+    """
+    按字幕顺序渐进写出的 SRT 文件
+    待翻译单元以原文登记，record() 收到译文后填入字幕并写出所有已连续完成的字幕
+    """
+
+    def __init__(self, path: str, cues: List[Cue]):
+        self.path = path
+        self.cues = cues
+        self.started = time.monotonic()
+        self.first_cue_time: Optional[float] = None
+        self.streamed = 0
+        self._ready = [True] * len(cues)
+        # 规范化原文 -> [(字幕位置, 句子合并时各片段的英文)]
+        self._units: Dict[str, List[Tuple[List[int], Optional[List[str]]]]] = {}
+        self._next = 0
+        self._lock = threading.Lock()
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def expect(self, text: str, positions: Sequence[int], parts: Optional[List[str]] = None) -> None:
+        """登记待翻译单元：text 的译文填入 positions；parts 不为空时按片段长度拆分（句子合并）"""
+        for i in positions:
+            self._ready[i] = False
+        self._units.setdefault(normalize_text(text), []).append((list(positions), parts))
+
+    def record(self, text: str, zh: str) -> None:
+        """收到一条译文；可以在翻译线程中调用，同一原文只处理第一次"""
+        with self._lock:
+            units = self._units.pop(normalize_text(text), None)
+            if not units:
+                return
+            for positions, parts in units:
+                pieces = redistribute(zh, parts) if parts and zh else [zh] * len(positions)
+                for i, piece in zip(positions, pieces):
+                    self.cues[i].zh = piece
+                    self._ready[i] = True
+            self._flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._file is None:
+            return
+        blocks = []
+        while self._next < len(self.cues) and self._ready[self._next]:
+            cue = self.cues[self._next]
+            self._next += 1
+            blocks.append(format_cue(cue, self._next) + '\n\n')
+            if cue.zh and self.first_cue_time is None:
+                self.first_cue_time = time.monotonic() - self.started
+        if blocks:
+            self._file.write(''.join(blocks))
+            self._file.flush()
+
+    def close(self) -> None:
+        """停止渐进写出；未完成时输出文件保留已写出的部分"""
+        with self._lock:
+            if self._file is not None:
+                self.streamed = self._next
+                self._file.close()
+                self._file = None
+
+    def finish(self, content: str) -> None:
+        """写入最终内容：先写临时文件并落盘，再原子替换输出文件"""
+        self.close()
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def summary(self) -> str:
+        first = f"{self.first_cue_time:.2f}s" if self.first_cue_time is not None else '无'
+        return (f"渐进输出: 首条译文字幕 (time-to-first-cue) {first}，"
+                f"翻译结束前已写出 {self.streamed}/{len(self.cues)} 条")
+
+
+def add_progressive_arguments(parser) -> None:
+    """为命令行添加渐进输出参数"""
+    parser.add_argument('--no-progressive', dest='progressive', action='store_false',
+                        help='不在翻译过程中渐进写出输出文件，全部翻译完成后一次写出')
+
+
+def open_progressive(path: str, cues: List[Cue], texts: List[str], positions: List[int],
+                     merge_mode: str = 'off', enabled: bool = True) -> Optional[ProgressiveSrtWriter]:
+    """
+    打开渐进输出并登记待翻译单元；texts[k] 对应 cues[positions[k]]
+    merge_mode 与传给 translate_merged 的相同，启用句子合并时按合并后的句子登记
+    未启用、没有待翻译文本或打开失败时返回 None
+    """
+    if not enabled or not texts:
+        return None
+    try:
+        writer = ProgressiveSrtWriter(path, cues)
+    except OSError as e:
+        print(f"警告: 无法渐进写出 {path}: {e}")
+        return None
+
+    spans = [(cues[i].start_ms, cues[i].end_ms) for i in positions]
+    plan = plan_merge(texts, spans, positions, merge_mode)
+    if plan is None:
+        for text, i in zip(texts, positions):
+            writer.expect(text, [i])
+    else:
+        cleaned, groups, sentences = plan
+        for group, sentence in zip(groups, sentences):
+            writer.expect(sentence, [positions[k] for k in group], [cleaned[k] for k in group])
+    # 开头不需要翻译的字幕立即写出
+    writer.flush()
+    return writer
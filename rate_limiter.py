@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+rate_limiter.py
+
+所有翻译路径共用的自适应限流器：
+- 令牌桶：同时限制每分钟请求数（RPM）和每分钟 token 数（TPM）
+- 429 / 5xx / 网络错误时按指数退避重试，带随机抖动，优先遵守服务端的 Retry-After
+- AIMD 并发控制：请求成功时并发数缓慢加一，被限流时减半，
+  不需要手动调参就能稳定运行在服务商的限额附近
+
+用法:
+  limiter = RateLimiter(rpm=500, tpm=200000, max_concurrency=32)
+  result = await limiter.call_async(lambda: client.chat.completions.create(...), tokens=300)
+  result = limiter.call(lambda: session.post(...), tokens=300)   # 同步版本
+  print(limiter.summary())
+
+asyncio 在第一次异步调用时才导入，同步路径和命令行 --help 不需要它。
+"""
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Optional, Tuple
+
+if TYPE_CHECKING:
+    import asyncio
+
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF_BASE = 1.0
+DEFAULT_BACKOFF_CAP = 60.0
+# 令牌桶容量相当于多少秒的配额，决定允许的突发量
+DEFAULT_BURST_SECONDS = 5.0
+
+_RETRYABLE_STATUS = {408, 409, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """按 rate_per_min 匀速补充的令牌桶；单次需求超过容量时允许透支，后续请求等待补足"""
+
+    def __init__(self, rate_per_min: float, burst_seconds: float = DEFAULT_BURST_SECONDS):
+        self.rate = rate_per_min / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float) -> float:
+        """尝试取出 amount 个令牌，成功返回 0，否则返回需要等待的秒数（调用方需持有锁）"""
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        need = min(amount, self.capacity)
+        if self.level >= need:
+            self.level -= amount
+            return 0.0
+        return (need - self.level) / self.rate
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD 并发上限：每完成约 limit 个成功请求加 1，被限流时减半
+    同一轮限流中并发出去的多个请求只触发一次减半
+    """
+
+    def __init__(self, maximum: int, initial: Optional[int] = None, minimum: int = 1):
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.limit = float(min(self.maximum, initial or self.maximum))
+        self.in_flight = 0
+        self.last_decrease = 0.0
+        self._cond = None
+
+    def _condition(self) -> 'asyncio.Condition':
+        # Condition 必须在使用它的事件循环中创建
+        if self._cond is None:
+            import asyncio
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    async def acquire(self) -> float:
+        """等待空闲并发名额，返回开始时间，用于判断限流是否发生在上次减半之前"""
+        cond = self._condition()
+        async with cond:
+            await cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        return time.monotonic()
+
+    async def release(self) -> None:
+        cond = self._condition()
+        async with cond:
+            self.in_flight -= 1
+            cond.notify_all()
+
+    def on_success(self) -> None:
+        self.limit = min(float(self.maximum), self.limit + 1.0 / self.limit)
+
+    def on_throttle(self, started: float) -> None:
+        if started < self.last_decrease:
+            return
+        self.limit = max(float(self.minimum), self.limit / 2)
+        self.last_decrease = time.monotonic()
+
+
+def _error_details(error: Exception) -> Tuple[Optional[int], Any]:
+    """从 openai / httpx / requests 的异常中取出状态码和响应头"""
+    response = getattr(error, 'response', None)
+    status = getattr(error, 'status_code', None) or getattr(response, 'status_code', None)
+    return status, getattr(response, 'headers', None)
+
+
+def parse_retry_after(headers) -> Optional[float]:
+    """解析 retry-after-ms / Retry-After（秒数或 HTTP 日期），返回秒数"""
+    if not headers:
+        return None
+    value = headers.get('retry-after-ms')
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    import email.utils
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_error(error: Exception) -> Tuple[bool, bool, Optional[float]]:
+    """返回 (是否被限流, 是否可以重试, Retry-After 秒数)"""
+    status, headers = _error_details(error)
+    if status == 429:
+        return True, True, parse_retry_after(headers)
+    if status is not None:
+        return False, status in _RETRYABLE_STATUS or status >= 500, parse_retry_after(headers)
+    # 没有状态码：连接失败、超时等网络错误可以重试
+    import asyncio
+    name = type(error).__name__
+    retryable = isinstance(error, (OSError, asyncio.TimeoutError)) or 'Connection' in name or 'Timeout' in name
+    return False, retryable, None
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None,
+                  base: float = DEFAULT_BACKOFF_BASE, cap: float = DEFAULT_BACKOFF_CAP) -> float:
+    """指数退避（full jitter）；服务端给出 Retry-After 时至少等待该时长"""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = retry_after + random.uniform(0, base)
+    return delay
+
+
+class RateLimiter:
+    """
+    令牌桶 + 退避重试 + AIMD 并发控制
+    rpm / tpm 为 None 时不限制对应维度，只做退避和并发调整
+    """
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None,
+                 max_concurrency: int = 8, initial_concurrency: Optional[int] = None,
+                 max_retries: int = DEFAULT_MAX_RETRIES):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.concurrency = AdaptiveConcurrency(max_concurrency, initial_concurrency)
+        self.max_retries = max_retries
+        self.throttled = 0
+        self.retries = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: float) -> float:
+        with self._lock:
+            wait = self.requests.reserve(1) if self.requests else 0.0
+            if wait:
+                return wait
+            if self.tokens:
+                wait = self.tokens.reserve(tokens)
+                if wait and self.requests:
+                    # 请求令牌已经取出，token 配额不足时还回去
+                    self.requests.level += 1
+            return wait
+
+    def acquire(self, tokens: float = 0) -> None:
+        """同步等待直到令牌桶允许发出请求"""
+        while True:
+            wait = self._reserve(tokens)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: float = 0) -> None:
+        import asyncio
+        while True:
+            wait = self._reserve(tokens)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def _should_retry(self, error: Exception, attempt: int, started: Optional[float]) -> Optional[float]:
+        """记录错误并返回重试前的等待秒数，不应重试时返回 None"""
+        throttled, retryable, retry_after = classify_error(error)
+        if throttled:
+            self.throttled += 1
+            if started is not None:
+                self.concurrency.on_throttle(started)
+        if not retryable or attempt >= self.max_retries:
+            self.failures += 1
+            return None
+        self.retries += 1
+        return backoff_delay(attempt, retry_after)
+
+    async def call_async(self, call: Callable[[], Awaitable[Any]], tokens: float = 0) -> Any:
+        """在限流和并发控制下执行异步请求，失败时退避重试，重试耗尽后抛出最后的异常"""
+        import asyncio
+        attempt = 0
+        while True:
+            await self.acquire_async(tokens)
+            started = await self.concurrency.acquire()
+            try:
+                result = await call()
+            except Exception as e:
+                delay = self._should_retry(e, attempt, started)
+                if delay is None:
+                    raise
+            else:
+                self.concurrency.on_success()
+                return result
+            finally:
+                await self.concurrency.release()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def call(self, call: Callable[[], Any], tokens: float = 0) -> Any:
+        """同步版本：令牌桶 + 退避重试（同步路径本身是串行的，不做并发控制）"""
+        attempt = 0
+        while True:
+            self.acquire(tokens)
+            try:
+                return call()
+            except Exception as e:
+                delay = self._should_retry(e, attempt, None)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    def summary(self) -> str:
+        return (f"限流: 429 次数 {self.throttled}，重试 {self.retries} 次，最终失败 {self.failures} 次，"
+                f"当前并发上限 {int(self.concurrency.limit)}")
+
+
+def add_rate_limit_arguments(parser) -> None:
+    """为命令行添加限流参数"""
+    parser.add_argument('--rpm', type=float, help='每分钟最多请求数 (默认: 不限制，遇到 429 时自动退避)')
+    parser.add_argument('--tpm', type=float, help='每分钟最多 token 数 (默认: 不限制)')
+    parser.add_argument('--max-retries', type=int, default=DEFAULT_MAX_RETRIES,
+                        help=f'限流或网络错误时的最大重试次数 (默认: {DEFAULT_MAX_RETRIES})')
+
+
+def make_rate_limiter(args, max_concurrency: int) -> RateLimiter:
+    """根据命令行参数创建限流器"""
+    return RateLimiter(getattr(args, 'rpm', None), getattr(args, 'tpm', None), max_concurrency,
+                       max_retries=getattr(args, 'max_retries', DEFAULT_MAX_RETRIES))
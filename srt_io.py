@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+srt_io.py
+
+单遍流式 SRT 解析与生成。
+iter_srt 从文件对象、字符串或任意字符串迭代器中按块读取，逐条产出 Cue，
+内存占用与文件大小无关；BOM、CRLF、缺少序号行和格式错误的块的处理方式与原先的
+正则分块解析一致。
+
+Cue 使用 __slots__ 代替每条字幕一个字典；时间轴按需解析为整数毫秒。
+
+用法:
+  with open('input.srt', encoding='utf-8', errors='replace') as f:
+      for cue in iter_srt(f):
+          print(cue.start_ms, cue.end_ms, cue.text)
+"""
+import re
+import sys
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+SrtSource = Union[str, Iterable[str]]
+
+
+_TIMESTAMP_RE = re.compile(r'(\d+):(\d{1,2}):(\d{1,2})[,.](\d{1,3})')
+
+
+def parse_timestamp(ts: str) -> Optional[int]:
+    """把 00:00:01,730 转换为毫秒，无法解析时返回 None"""
+    m = _TIMESTAMP_RE.search(ts)
+    if not m:
+        return None
+    h, mi, s, ms = m.groups()
+    return ((int(h) * 60 + int(mi)) * 60 + int(s)) * 1000 + int(ms.ljust(3, '0'))
+
+
+def format_timestamp(ms: int) -> str:
+    """把毫秒格式化为 SRT 时间戳 00:00:01,730"""
+    ms = max(0, ms)
+    return '%02d:%02d:%02d,%03d' % (ms // 3600000, ms // 60000 % 60, ms // 1000 % 60, ms % 1000)
+
+
+def parse_times(times: str) -> Tuple[Optional[int], Optional[int]]:
+    """解析 SRT 时间行，返回 (开始毫秒, 结束毫秒)"""
+    if '-->' not in times:
+        return None, None
+    start, end = times.split('-->', 1)
+    return parse_timestamp(start), parse_timestamp(end)
+
+
+def format_times(start_ms: int, end_ms: int) -> str:
+    return f"{format_timestamp(start_ms)} --> {format_timestamp(end_ms)}"
+
+
+class Cue:
+    """
+    一条字幕
+    时间行在首次访问 start_ms / end_ms 时才解析为整数毫秒；原时间行保留到时间轴被
+    set_span 修改为止，未修改的字幕原样输出（包括带位置信息等非标准格式）。
+    序号与位置一致时不单独保存。
+    """
+    __slots__ = ('index', 'text', 'zh', '_times', '_start', '_end')
+
+    def __init__(self, index: str = '', times: str = '', text: str = '', zh: str = ''):
+        self.index = index
+        self.text = text
+        self.zh = zh
+        self._times: Optional[str] = times
+
+    @classmethod
+    def from_span(cls, index: str, start_ms: int, end_ms: int, text: str = '', zh: str = '') -> 'Cue':
+        cue = cls(index, '', text, zh)
+        cue.set_span(start_ms, end_ms)
+        return cue
+
+    def _parse(self) -> None:
+        times = self._times
+        # 标准格式 "00:00:01,730 --> 00:00:14,490" 按位置切片，其他格式走正则
+        if len(times) == 29 and times[12:17] == ' --> ' and times[8] == times[25] == ',':
+            start = times[0:2] + times[3:5] + times[6:8] + times[9:12]
+            end = times[17:19] + times[20:22] + times[23:25] + times[26:29]
+            if (start + end).isdecimal() and times[2] == times[5] == times[19] == times[22] == ':':
+                # HHMMSSmmm 整数中，末五位恰好是 SS * 1000 + mmm
+                s, e = int(start), int(end)
+                self._start = s // 10000000 * 3600000 + s // 100000 % 100 * 60000 + s % 100000
+                self._end = e // 10000000 * 3600000 + e // 100000 % 100 * 60000 + e % 100000
+                return
+        self._start, self._end = parse_times(times)
+
+    @property
+    def start_ms(self) -> Optional[int]:
+        try:
+            return self._start
+        except AttributeError:
+            self._parse()
+            return self._start
+
+    @property
+    def end_ms(self) -> Optional[int]:
+        try:
+            return self._end
+        except AttributeError:
+            self._parse()
+            return self._end
+
+    @property
+    def times(self) -> str:
+        if self._times is not None:
+            return self._times
+        return format_times(self._start, self._end)
+
+    @times.setter
+    def times(self, value: str) -> None:
+        self._times = value
+        for name in ('_start', '_end'):
+            if hasattr(self, name):
+                delattr(self, name)
+
+    def set_span(self, start_ms: int, end_ms: int) -> None:
+        """修改时间轴，之后按标准格式输出"""
+        self._start, self._end, self._times = start_ms, end_ms, None
+
+    def __repr__(self) -> str:
+        return f"Cue(index={self.index!r}, times={self.times!r}, text={self.text!r}, zh={self.zh!r})"
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Cue):
+            return NotImplemented
+        return (self.index, self.times, self.text, self.zh) == (other.index, other.times, other.text, other.zh)
+
+
+def read_file(path: str) -> str:
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return f.read()
+
+
+def write_file(path: str, content: str) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+
+def _iter_chunks(source: SrtSource, chunk_size: int) -> Iterator[str]:
+    """统一输入：字符串整体作为一块，文件对象按 chunk_size 读取，其他可迭代对象原样产出"""
+    if isinstance(source, str):
+        yield source
+        return
+    read = getattr(source, 'read', None)
+    if read is not None:
+        while True:
+            chunk = read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        yield from source
+
+
+def _make_cue(lines: List[str], position: int) -> Cue:
+    # 寻找时间行（通常包含 -->）
+    if len(lines) >= 2 and '-->' in lines[1]:
+        index = lines[0].strip()
+        times = lines[1].strip()
+        if len(lines) == 3:
+            text = lines[2].strip()
+        else:
+            text = "\n".join(l.rstrip() for l in lines[2:]).strip()
+    else:
+        # 如果没有序号行，尝试容错解析
+        index = ''
+        times = lines[0].strip() if '-->' in lines[0] else ''
+        text = "\n".join(lines[1:]).strip()
+    # 序号与位置一致时由 build_srt 重新生成，不保存字符串
+    if index == str(position):
+        index = ''
+    # 重复出现的文本（如 [Music]）共享同一个字符串对象
+    if len(text) < 32:
+        text = sys.intern(text)
+    return Cue(index, times, text)
+
+
+def iter_srt(source: SrtSource, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Cue]:
+    """
+    逐条产出 Cue
+    空行（含只有空白字符的行）分隔字幕块，兼容 CRLF/LF
+    """
+    current: List[str] = []
+    pending = ''
+    first = True
+    position = 0
+
+    for chunk in _iter_chunks(source, chunk_size):
+        if first:
+            chunk = chunk.lstrip('\ufeff')
+            first = not chunk
+        text = pending + chunk
+        lines = text.splitlines()
+        # 最后一行可能不完整，末尾的 \r 也可能是被切开的 \r\n，留给下一块
+        if text.endswith('\n'):
+            pending = ''
+        else:
+            pending = (lines.pop() if lines else '') + ('\r' if text.endswith('\r') else '')
+
+        for line in lines:
+            if line and not line.isspace():
+                current.append(line)
+            elif current:
+                position += 1
+                yield _make_cue(current, position)
+                current = []
+
+    for line in pending.splitlines():
+        if line and not line.isspace():
+            current.append(line)
+        elif current:
+            position += 1
+            yield _make_cue(current, position)
+            current = []
+    if current:
+        yield _make_cue(current, position + 1)
+
+
+def parse_srt(content: SrtSource) -> List[Cue]:
+    """解析完整的 SRT 内容（字符串或文件对象），返回 Cue 列表"""
+    return list(iter_srt(content))
+
+
+def format_cue(cue: Cue, number: int) -> str:
+    """单条字幕块（不含结尾空行），number 为从 1 开始的序号，cue 没有自己的序号时使用"""
+    zh = cue.zh.strip()
+    en = cue.text.strip()
+    if zh:
+        combined = en + '\n' + zh
+    else:
+        combined = en
+    return f"{cue.index or number}\n{cue.times}\n{combined}"
+
+
+def build_srt(cues: Iterable[Cue]) -> str:
+    out_blocks = [format_cue(cue, i) for i, cue in enumerate(cues, start=1)]
+    return "\n\n".join(out_blocks) + "\n"
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+srt_pipeline.py
+
+分窗口的流式双语字幕流水线：读取 → 解析 → 过滤 → 按窗口翻译 → 调整时间轴 → 写出。
+每一步都是生成器，同一时刻内存中只有一个窗口的字幕（以及时间轴调整保留的一条），
+十几个小时的直播字幕也不需要把全文、全部字幕对象和整个输出字符串同时放在内存里。
+峰值内存由 --window 决定，与文件大小无关。
+
+句子合并在窗口之间保持一致：auto 模式按第一个窗口判断是否为滚动字幕，之后的窗口沿用结果；
+窗口末尾延伸到句末，避免把一句话拆到两个窗口分别翻译。
+
+用法:
+  with open('input.srt', encoding='utf-8', errors='replace') as f:
+      stats = translate_srt_stream(iter_srt(f), 'output.srt', translate_fn, window=2000, merge_mode='auto')
+  print(stats.summary())
+"""
+import os
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from caption_merge import ends_sentence, looks_like_rolling, translate_merged
+from cue_filter import FilterStats, needs_translation
+from srt_io import Cue, format_cue
+from timeline import iter_adjusted
+
+DEFAULT_WINDOW = 2000
+# 等待句末时窗口最多延长的比例
+WINDOW_SLACK = 0.1
+
+
+class PipelineStats:
+    """流水线处理的字幕、窗口和翻译数量"""
+
+    def __init__(self):
+        self.cues = 0
+        self.windows = 0
+        self.translated = 0
+        self.written = 0
+        self.filtered = FilterStats()
+
+    def summary(self) -> str:
+        return (f"分窗口翻译: {self.cues} 条字幕，{self.windows} 个窗口，"
+                f"翻译 {self.translated} 条，写出 {self.written} 条")
+
+
+def iter_windows(cues: Iterable[Cue], size: int = DEFAULT_WINDOW, align_sentences: bool = False) -> Iterator[List[Cue]]:
+    """
+    每 size 条字幕为一个窗口
+    align_sentences 为 True 时窗口末尾延伸到以句末标点结尾的字幕，最多多取 size * WINDOW_SLACK 条
+    """
+    size = max(1, size)
+    limit = size + int(size * WINDOW_SLACK)
+    window: List[Cue] = []
+    for cue in cues:
+        window.append(cue)
+        if len(window) >= limit or (len(window) >= size and (not align_sentences or ends_sentence(cue.text))):
+            yield window
+            window = []
+    if window:
+        yield window
+
+
+def translate_windows(windows: Iterable[List[Cue]], translate_fn: Callable[[List[str]], List[str]],
+                      merge_mode: str = 'auto', stats: Optional[PipelineStats] = None,
+                      filter_fn: Optional[Callable[[str], bool]] = None) -> Iterator[List[Cue]]:
+    """
+    逐个窗口翻译：filter_fn 为 True 的字幕交给 translate_fn，译文写入 cue.zh 后产出该窗口
+    默认按 cue_filter 的规则过滤，并把分类结果记入 stats.filtered
+    """
+    stats = stats if stats is not None else PipelineStats()
+    if filter_fn is None:
+        def filter_fn(text: str) -> bool:
+            return needs_translation(text, stats.filtered)
+    for window in windows:
+        texts: List[str] = []
+        positions: List[int] = []
+        for i, cue in enumerate(window):
+            if filter_fn(cue.text):
+                texts.append(cue.text)
+                positions.append(i)
+            else:
+                cue.zh = ''
+        if texts:
+            spans = [(window[i].start_ms, window[i].end_ms) for i in positions]
+            if merge_mode == 'auto':
+                merge_mode = 'on' if looks_like_rolling(spans) else 'off'
+            zh_list = translate_merged(texts, spans, translate_fn, positions=positions, mode=merge_mode, verbose=False)
+            for i, zh in zip(positions, zh_list):
+                window[i].zh = zh
+        stats.cues += len(window)
+        stats.windows += 1
+        stats.translated += len(texts)
+        print(f"分窗口翻译: 第 {stats.windows} 个窗口，累计 {stats.cues} 条字幕", end='\r')
+        yield window
+
+
+def write_srt_stream(path: str, windows: Iterable[List[Cue]], atomic: bool = True) -> int:
+    """
+    逐个窗口写出 SRT，内容与 build_srt 相同，返回写出的字幕数
+    atomic 为 True 时先写入临时文件，全部完成后原子替换；否则直接写入 path，已完成的窗口立即可见
+    """
+    target = path + '.tmp' if atomic else path
+    count = 0
+    with open(target, 'w', encoding='utf-8') as f:
+        for window in windows:
+            blocks = []
+            for cue in window:
+                count += 1
+                blocks.append(format_cue(cue, count))
+            if blocks:
+                f.write(('\n\n' if count > len(blocks) else '') + '\n\n'.join(blocks))
+                f.flush()
+        f.write('\n')
+        if atomic:
+            os.fsync(f.fileno())
+    if atomic:
+        os.replace(target, path)
+    return count
+
+
+def translate_srt_stream(cues: Iterable[Cue], output_path: str, translate_fn: Callable[[List[str]], List[str]],
+                         window: int = DEFAULT_WINDOW, merge_mode: str = 'auto', timeline_args=None,
+                         atomic: bool = True, filter_fn: Optional[Callable[[str], bool]] = None) -> PipelineStats:
+    """
+    完整流水线：cues 通常是 iter_srt 的生成器，按窗口翻译、调整时间轴后写入 output_path
+    timeline_args 为带时间轴调整参数的命令行参数对象
+    """
+    stats = PipelineStats()
+    windows = iter_windows(cues, window, align_sentences=merge_mode != 'off')
+    windows = translate_windows(windows, translate_fn, merge_mode, stats, filter_fn)
+    if timeline_args is not None:
+        windows = iter_adjusted(windows, timeline_args)
+    stats.written = write_srt_stream(output_path, windows, atomic)
+    if stats.windows:
+        print()
+    return stats
+
+
+def add_pipeline_arguments(parser) -> None:
+    """为命令行添加分窗口流式处理参数"""
+    parser.add_argument('--window', type=int, default=0,
+                        help='分窗口流式处理，每个窗口翻译 N 条字幕，内存占用与文件大小无关 '
+                             f'(默认: 0 整个文件一次处理；超长字幕建议 {DEFAULT_WINDOW})')
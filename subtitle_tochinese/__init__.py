@@ -0,0 +1,66 @@
+"""
+subtitle_tochinese
+
+双语字幕工具的统一导入入口。
+常用函数和类按名称直接从包中取用，对应模块在第一次访问时才导入，
+openai、yt_dlp、requests、numpy 等重量级依赖只在真正使用它们的阶段加载。
+本包不单独安装：导出的名称来自仓库根目录下的顶层模块，
+需要在仓库根目录运行，或把仓库根目录加入 PYTHONPATH。
+
+用法:
+  import subtitle_tochinese as st
+  with open('input.srt', encoding='utf-8') as f:
+      cues = st.parse_srt(f)
+  with st.Translator(api_key) as translator:
+      zh_list = st.batch_translate_deepseek([c.text for c in cues], api_key, translator=translator)
+
+命令行:
+  python -m subtitle_tochinese --help
+"""
+import importlib
+
+# 名称 -> 所在模块
+_EXPORTS = {
+    'Cue': 'srt_io',
+    'iter_srt': 'srt_io',
+    'parse_srt': 'srt_io',
+    'parse_captions': 'caption_formats',
+    'build_srt': 'srt_io',
+    'read_file': 'srt_io',
+    'write_file': 'srt_io',
+    'Translator': 'translation_engine',
+    'batch_translate_concurrent': 'translation_engine',
+    'deduplicated': 'translation_engine',
+    'run_translation': 'translation_runner',
+    'batch_translate_deepseek': 'bilingual_srt_fixed',
+    'translate_merged': 'caption_merge',
+    'TranslationCache': 'translation_cache',
+    'TranslationJournal': 'translation_journal',
+    'Glossary': 'glossary',
+    'load_glossary': 'glossary',
+    'translate_srt_stream': 'srt_pipeline',
+    'RateLimiter': 'rate_limiter',
+    'plan_batches': 'token_batching',
+    'Timeline': 'timeline',
+    'adjust_timeline': 'timeline',
+    'merge_subtitle_to_video': 'video_mux',
+    'run_ffmpeg': 'ffmpeg_progress',
+    'download_youtube_video': 'youtube_downloader',
+    'download_youtube_subtitles': 'youtube_bilingual_srt',
+    'StagePipeline': 'batch_pipeline',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
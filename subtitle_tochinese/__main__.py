@@ -0,0 +1,55 @@
+"""
+python -m subtitle_tochinese <命令> [参数]
+
+只导入所选命令对应的模块，其余阶段的依赖不会被加载。
+需要在仓库根目录运行（或把仓库根目录加入 PYTHONPATH），本包不单独安装。
+
+命令:
+  download         下载视频、生成双语字幕并合并到视频（youtube_downloader.py）
+  youtube          下载 YouTube 字幕并生成双语 SRT（youtube_bilingual_srt.py）
+  translate        翻译本地 SRT，按 token 预算批量请求（bilingual_srt_fixed.py）
+  translate-lines  翻译本地 SRT，逐行并发请求（bilingual_srt_improved.py）
+
+用法:
+  python -m subtitle_tochinese translate input.srt output.srt
+  python -m subtitle_tochinese download "youtube_url" output_folder --mux soft
+"""
+import importlib
+import sys
+
+# 命令 -> (模块, 说明)
+COMMANDS = {
+    'download': ('youtube_downloader', '下载视频、生成双语字幕并合并到视频'),
+    'youtube': ('youtube_bilingual_srt', '下载 YouTube 字幕并生成双语 SRT'),
+    'translate': ('bilingual_srt_fixed', '翻译本地 SRT，按 token 预算批量请求'),
+    'translate-lines': ('bilingual_srt_improved', '翻译本地 SRT，逐行并发请求'),
+}
+
+PROG = 'python -m subtitle_tochinese'
+
+
+def usage() -> str:
+    lines = [f"用法: {PROG} <命令> [参数]", '', '命令:']
+    lines += [f"  {name:<16} {help_text}" for name, (_, help_text) in COMMANDS.items()]
+    lines += ['', f"查看命令的参数: {PROG} <命令> --help"]
+    return '\n'.join(lines)
+
+
+def main(argv=None) -> None:
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] in ('-h', '--help'):
+        print(usage())
+        return
+    command = argv[0]
+    if command not in COMMANDS:
+        print(f"错误: 未知命令 {command}\n\n{usage()}", file=sys.stderr)
+        sys.exit(2)
+
+    module = importlib.import_module(COMMANDS[command][0])
+    # 各命令的 argparse 从 sys.argv 读取参数，并用 sys.argv[0] 作为程序名
+    sys.argv = [f"{PROG} {command}"] + argv[1:]
+    module.main()
+
+
+if __name__ == '__main__':
+    main()
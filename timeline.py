@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+timeline.py
+
+基于 NumPy 的字幕时间轴批量调整。
+一次性把所有时间戳解析为整数毫秒数组，之后的操作都是向量运算：
+修复重叠、保证最短时长和最小间隔、整体平移、帧率换算（如 23.976 → 25）、
+按时间窗口裁剪。几十万条字幕也只需要几毫秒。
+
+用法（位于 parse_srt 和 build_srt 之间）:
+  blocks = parse_srt(f)
+  blocks = (Timeline(blocks)
+            .rescale(23.976, 25)
+            .shift(-1500)
+            .extend_short(1000, min_gap_ms=80)
+            .fix_overlaps(min_gap_ms=80)
+            .apply())
+  write_file(output, build_srt(blocks))
+
+依赖:
+  pip install numpy
+"""
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+from srt_io import Cue
+
+# 标准时间行 "00:00:01,730 --> 00:00:14,490" 中各数字的位置和对应的毫秒权重
+_DIGIT_COLS = [0, 1, 3, 4, 6, 7, 9, 10, 11]
+_DIGIT_WEIGHTS = [36000000, 3600000, 600000, 60000, 10000, 1000, 100, 10, 1]
+_SEPARATORS = {2: ':', 5: ':', 8: ',', 12: ' ', 13: '-', 14: '-', 15: '>', 16: ' ', 19: ':', 22: ':', 25: ','}
+_TIMES_WIDTH = 29
+
+
+def _require_numpy():
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError("请先安装 NumPy: pip install numpy")
+    return np
+
+
+def parse_spans(cues: Sequence[Cue]):
+    """
+    把所有字幕的时间行解析为 (starts, ends, valid) 三个数组
+    标准格式的时间行整体转为字节矩阵后一次性计算，其余格式逐条解析
+    """
+    np = _require_numpy()
+    n = len(cues)
+    starts = np.zeros(n, dtype=np.int64)
+    ends = np.zeros(n, dtype=np.int64)
+    valid = np.zeros(n, dtype=bool)
+    if not n:
+        return starts, ends, valid
+
+    times = [cue.times for cue in cues]
+    fixed = np.fromiter((len(t) == _TIMES_WIDTH for t in times), dtype=bool, count=n)
+    rows = np.flatnonzero(fixed)
+    if len(rows):
+        # 非 ASCII 字符替换为单字节的 '?'，保证每行固定 29 字节
+        buf = ''.join([times[i] for i in rows]).encode('ascii', 'replace')
+        chars = np.frombuffer(buf, dtype=np.uint8).reshape(-1, _TIMES_WIDTH)
+        cols = np.array(_DIGIT_COLS)
+        weights = np.array(_DIGIT_WEIGHTS, dtype=np.int64)
+        start_digits = chars[:, cols].astype(np.int64) - 48
+        end_digits = chars[:, cols + 17].astype(np.int64) - 48
+        ok = ((start_digits >= 0) & (start_digits <= 9)).all(axis=1) & ((end_digits >= 0) & (end_digits <= 9)).all(axis=1)
+        for col, ch in _SEPARATORS.items():
+            ok &= chars[:, col] == ord(ch)
+        good = rows[ok]
+        starts[good] = start_digits[ok] @ weights
+        ends[good] = end_digits[ok] @ weights
+        valid[good] = True
+
+    # 非标准格式（小数点分隔、带位置信息等）交给 Cue 自己解析
+    for i in np.flatnonzero(~valid):
+        cue = cues[i]
+        if cue.start_ms is not None and cue.end_ms is not None:
+            starts[i], ends[i], valid[i] = cue.start_ms, cue.end_ms, True
+    return starts, ends, valid
+
+
+class Timeline:
+    """
+    一组字幕的时间轴
+    所有操作只修改内部数组并返回 self，可以链式调用；apply() 把结果写回字幕。
+    没有有效时间行的字幕不参与计算，原样保留。
+    """
+
+    def __init__(self, cues: Sequence[Cue]):
+        self.np = _require_numpy()
+        self.cues = list(cues)
+        self._orig_starts, self._orig_ends, self.valid = parse_spans(self.cues)
+        self.starts = self._orig_starts.copy()
+        self.ends = self._orig_ends.copy()
+        self.keep = self.np.ones(len(self.cues), dtype=bool)
+
+    def _active(self):
+        return self.valid & self.keep
+
+    def shift(self, offset_ms: int) -> 'Timeline':
+        """整体平移 offset_ms 毫秒，移到 0 之前的字幕被丢弃"""
+        self.starts += int(offset_ms)
+        self.ends += int(offset_ms)
+        return self.trim(0, None)
+
+    def rescale(self, src_fps: float, dst_fps: float) -> 'Timeline':
+        """帧率换算：按 src_fps 制作的字幕用于 dst_fps 播放的视频（如 23.976 → 25）"""
+        if src_fps <= 0 or dst_fps <= 0:
+            raise ValueError("帧率必须为正数")
+        factor = src_fps / dst_fps
+        self.starts = self.np.rint(self.starts * factor).astype(self.np.int64)
+        self.ends = self.np.rint(self.ends * factor).astype(self.np.int64)
+        return self
+
+    def trim(self, start_ms: Optional[int] = None, end_ms: Optional[int] = None, rebase: bool = False) -> 'Timeline':
+        """
+        只保留与 [start_ms, end_ms) 有交集的字幕，并把超出窗口的部分截掉
+        rebase 为 True 时把窗口起点移到 0
+        """
+        np = self.np
+        if start_ms is not None:
+            self.keep &= ~self.valid | (self.ends > start_ms)
+            np.maximum(self.starts, start_ms, out=self.starts)
+        if end_ms is not None:
+            self.keep &= ~self.valid | (self.starts < end_ms)
+            np.minimum(self.ends, end_ms, out=self.ends)
+        if rebase and start_ms:
+            self.starts -= start_ms
+            self.ends -= start_ms
+        return self
+
+    def _next_starts(self, order):
+        """按开始时间排序后，每条字幕之后一条的开始时间（最后一条为无穷大）"""
+        np = self.np
+        nxt = np.empty(len(order), dtype=np.int64)
+        nxt[:-1] = self.starts[order[1:]]
+        nxt[-1:] = np.iinfo(np.int64).max
+        return nxt
+
+    def _sorted_active(self):
+        idx = self.np.flatnonzero(self._active())
+        return idx[self.np.argsort(self.starts[idx], kind='stable')]
+
+    def fix_overlaps(self, min_gap_ms: int = 0) -> 'Timeline':
+        """
+        把每条字幕的结束时间截到下一条开始前 min_gap_ms 毫秒，避免烧录时多条字幕叠在一起
+        与下一条同时开始的字幕至少保留 1 毫秒
+        """
+        order = self._sorted_active()
+        if len(order) < 2:
+            return self
+        np = self.np
+        s = self.starts[order]
+        limit = self._next_starts(order) - min_gap_ms
+        self.ends[order] = np.maximum(np.minimum(self.ends[order], limit), s + 1)
+        return self
+
+    def extend_short(self, min_duration_ms: int, min_gap_ms: int = 0) -> 'Timeline':
+        """把短于 min_duration_ms 的字幕延长，但不越过下一条开始前 min_gap_ms 毫秒"""
+        order = self._sorted_active()
+        if not len(order):
+            return self
+        np = self.np
+        s = self.starts[order]
+        e = self.ends[order]
+        limit = self._next_starts(order) - min_gap_ms
+        self.ends[order] = np.maximum(e, np.minimum(s + min_duration_ms, limit))
+        return self
+
+    def apply(self, limit: Optional[int] = None) -> List[Cue]:
+        """
+        把调整后的时间写回字幕，返回保留下来的字幕（顺序不变）
+        limit 不为 None 时只写回并返回前 limit 条，其余字幕保持原样
+        """
+        np = self.np
+        n = len(self.cues) if limit is None else limit
+        changed = self.valid & self.keep & ((self.starts != self._orig_starts) | (self.ends != self._orig_ends))
+        changed[n:] = False
+        for i in np.flatnonzero(changed):
+            self.cues[i].set_span(int(self.starts[i]), int(self.ends[i]))
+        self._orig_starts[changed] = self.starts[changed]
+        self._orig_ends[changed] = self.ends[changed]
+        return [cue for cue, k in zip(self.cues[:n], self.keep[:n].tolist()) if k]
+
+
+def add_timeline_arguments(parser) -> None:
+    """为命令行添加时间轴调整参数"""
+    group = parser.add_argument_group('时间轴调整 (需要 numpy)')
+    group.add_argument('--shift', type=float, default=0.0, help='整体平移字幕，单位秒，可为负数')
+    group.add_argument('--fps-from', type=float, help='字幕原帧率，与 --fps-to 一起使用，如 23.976')
+    group.add_argument('--fps-to', type=float, help='目标视频帧率，如 25')
+    group.add_argument('--trim-start', type=float, help='只保留该时间（秒）之后的字幕')
+    group.add_argument('--trim-end', type=float, help='只保留该时间（秒）之前的字幕')
+    group.add_argument('--fix-overlaps', action='store_true', help='截短与下一条重叠的字幕，避免烧录时字幕叠在一起')
+    group.add_argument('--min-duration-ms', type=int, default=0, help='延长过短的字幕到该时长（毫秒）')
+    group.add_argument('--min-gap-ms', type=int, default=0, help='相邻字幕之间至少保留的间隔（毫秒）')
+
+
+def timeline_requested(args) -> bool:
+    """命令行参数中是否指定了任何时间轴调整"""
+    rescale = args.fps_from and args.fps_to and args.fps_from != args.fps_to
+    return bool(rescale or args.shift or args.trim_start is not None or args.trim_end is not None
+                or args.fix_overlaps or args.min_duration_ms)
+
+
+def _build_timeline(cues: Sequence[Cue], args) -> Timeline:
+    """按命令行参数对 cues 执行全部调整（尚未写回）"""
+    rescale = args.fps_from and args.fps_to and args.fps_from != args.fps_to
+    timeline = Timeline(cues)
+    if rescale:
+        timeline.rescale(args.fps_from, args.fps_to)
+    if args.shift:
+        timeline.shift(round(args.shift * 1000))
+    if args.trim_start is not None or args.trim_end is not None:
+        timeline.trim(
+            round(args.trim_start * 1000) if args.trim_start is not None else None,
+            round(args.trim_end * 1000) if args.trim_end is not None else None
+        )
+    if args.min_duration_ms:
+        timeline.extend_short(args.min_duration_ms, args.min_gap_ms)
+    if args.fix_overlaps:
+        timeline.fix_overlaps(args.min_gap_ms)
+    return timeline
+
+
+def adjust_timeline(cues: List[Cue], args) -> List[Cue]:
+    """按命令行参数调整时间轴；没有指定任何调整时原样返回，不需要 numpy"""
+    if not timeline_requested(args):
+        return cues
+    result = _build_timeline(cues, args).apply()
+    print(f"时间轴调整: {len(cues)} 条字幕，保留 {len(result)} 条")
+    return result
+
+
+def iter_adjusted(windows: Iterable[List[Cue]], args) -> Iterator[List[Cue]]:
+    """
+    分窗口调整时间轴，内存占用只与窗口大小有关
+    每个窗口的最后一条留到下一个窗口一起计算，修复重叠和延长短字幕时能看到跨窗口的下一条
+    """
+    if not timeline_requested(args):
+        yield from windows
+        return
+    held: List[Cue] = []
+    total = kept = 0
+    for window in windows:
+        cues = held + window
+        if len(cues) < 2:
+            held = cues
+            continue
+        result = _build_timeline(cues, args).apply(limit=len(cues) - 1)
+        held = cues[-1:]
+        total += len(cues) - 1
+        kept += len(result)
+        yield result
+    if held:
+        result = _build_timeline(held, args).apply()
+        total += len(held)
+        kept += len(result)
+        yield result
+    print(f"时间轴调整: {total} 条字幕，保留 {kept} 条")
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+token_batching.py
+
+按 token 预算动态分批，并使用带 ID 的 JSON 协议批量翻译。
+每条字幕以 {"id": n, "text": ...} 发送，模型按 {"id": n, "zh": ...} 返回，
+按 ID 对齐结果，不再依赖序号行的数量恰好一致；缺失的 ID 会拆小批次重试。
+max_tokens 根据批次内容估算，而不是写死。
+提供 on_item 时使用流式返回，数组中每个对象一完整就立即交给调用方，不必等整批结束。
+"""
+import json
+import math
+import re
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from glossary import prompt_with_glossary
+
+# deepseek-chat 的上下文窗口与单次输出上限
+DEFAULT_CONTEXT_TOKENS = 65536
+DEFAULT_MAX_OUTPUT_TOKENS = 8192
+# 单批最多条目数，避免一次失败损失过多
+DEFAULT_MAX_ITEMS = 200
+
+BATCH_PROMPT = """你是一个专业的字幕翻译助手。用户会发送一个 JSON 数组，每个元素形如 {"id": 整数, "text": 英文字幕}。
+请把每条 text 翻译成简体中文，并只返回一个 JSON 数组，每个元素形如 {"id": 原样的整数, "zh": 中文翻译}。
+必须为每个 id 返回且只返回一条结果，不要合并或拆分条目，不要输出 JSON 以外的任何文字。
+确保翻译准确、流畅，保持专业术语的一致性。"""
+
+_CJK_RE = re.compile(r'[\u3000-\u30ff\u4e00-\u9fff\uff00-\uffef]')
+_FENCE_RE = re.compile(r'^```(?:json)?\s*|\s*```$')
+
+# 每个条目的 JSON 包装开销（id、键名、引号、逗号）
+_ITEM_OVERHEAD_TOKENS = 8
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：英文约 4 字符 1 个 token，中日韩字符约 1 字 1 个 token"""
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def estimate_output_tokens(text: str) -> int:
+    """估算一段英文翻译成中文后的 token 数，按偏多的方向取值，避免输出被截断"""
+    return math.ceil(len(text) * 0.6) + 4
+
+
+def single_line_max_tokens(text: str) -> int:
+    """逐行翻译时的 max_tokens：按原文长度估算，并保留余量"""
+    return max(64, estimate_output_tokens(text) * 2)
+
+
+def plan_batches(texts: Sequence[str], context_tokens: int = DEFAULT_CONTEXT_TOKENS,
+                 max_output_tokens: int = DEFAULT_MAX_OUTPUT_TOKENS,
+                 max_items: int = DEFAULT_MAX_ITEMS) -> List[List[int]]:
+    """
+    按输入和输出 token 预算把 texts 的下标分组
+    输入 + 预计输出不超过上下文窗口，预计输出不超过单次输出上限
+    """
+    prompt_tokens = estimate_tokens(BATCH_PROMPT) + 16
+    # 输出给 1.5 倍余量，避免估算偏小导致 JSON 被截断
+    output_budget = int(max_output_tokens / 1.5)
+    batches: List[List[int]] = []
+    current: List[int] = []
+    in_tokens = out_tokens = 0
+
+    for i, text in enumerate(texts):
+        item_in = estimate_tokens(text) + _ITEM_OVERHEAD_TOKENS
+        item_out = estimate_output_tokens(text) + _ITEM_OVERHEAD_TOKENS
+        too_big = (
+            prompt_tokens + in_tokens + item_in + (out_tokens + item_out) * 1.5 > context_tokens
+            or out_tokens + item_out > output_budget
+            or len(current) >= max_items
+        )
+        if current and too_big:
+            batches.append(current)
+            current, in_tokens, out_tokens = [], 0, 0
+        current.append(i)
+        in_tokens += item_in
+        out_tokens += item_out
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+def batch_max_tokens(texts: Sequence[str], max_output_tokens: int = DEFAULT_MAX_OUTPUT_TOKENS) -> int:
+    """根据批次内容计算 max_tokens"""
+    expected = sum(estimate_output_tokens(t) + _ITEM_OVERHEAD_TOKENS for t in texts) + 16
+    return min(max_output_tokens, max(64, int(expected * 1.5)))
+
+
+def build_batch_content(items: Sequence[Tuple[int, str]]) -> str:
+    return json.dumps([{'id': i, 'text': t} for i, t in items], ensure_ascii=False)
+
+
+def parse_batch_response(content: str) -> Dict[int, str]:
+    """解析模型返回的 JSON 数组，返回 {id: zh}；格式错误的条目直接忽略"""
+    content = _FENCE_RE.sub('', (content or '').strip())
+    start, end = content.find('['), content.rfind(']')
+    if start < 0 or end <= start:
+        return {}
+    try:
+        data = json.loads(content[start:end + 1])
+    except ValueError:
+        return {}
+
+    result: Dict[int, str] = {}
+    for entry in data if isinstance(data, list) else []:
+        parsed = _parse_entry(entry)
+        if parsed is not None:
+            result[parsed[0]] = parsed[1]
+    return result
+
+
+def _parse_entry(entry) -> Optional[Tuple[int, str]]:
+    if not isinstance(entry, dict):
+        return None
+    try:
+        key = int(entry.get('id'))
+    except (TypeError, ValueError):
+        return None
+    zh = entry.get('zh')
+    return (key, zh.strip()) if isinstance(zh, str) else None
+
+
+class BatchStreamParser:
+    """
+    增量解析流式返回的 JSON 数组
+    feed() 每次传入新到达的文本，返回其中新完成的 (id, zh)；数组前的代码块标记等内容被跳过
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self._started = False
+        self._decoder = json.JSONDecoder()
+
+    def feed(self, text: str) -> List[Tuple[int, str]]:
+        self._buffer += text
+        if not self._started:
+            start = self._buffer.find('[')
+            if start < 0:
+                return []
+            self._buffer = self._buffer[start + 1:]
+            self._started = True
+
+        entries = []
+        while True:
+            buffer = self._buffer.lstrip(' \t\r\n,')
+            if not buffer.startswith('{'):
+                # 数组结束（]）或下一个对象还没开始
+                self._buffer = buffer
+                return entries
+            try:
+                entry, end = self._decoder.raw_decode(buffer)
+            except ValueError:
+                # 对象还不完整，等待更多文本
+                self._buffer = buffer
+                return entries
+            self._buffer = buffer[end:]
+            parsed = _parse_entry(entry)
+            if parsed is not None:
+                entries.append(parsed)
+
+
+async def translate_json_batch(client, model: str, items: Sequence[Tuple[int, str]],
+                               temperature: float = 0.3,
+                               max_output_tokens: int = DEFAULT_MAX_OUTPUT_TOKENS,
+                               limiter=None,
+                               on_item: Optional[Callable[[int, str], None]] = None,
+                               glossary=None) -> Dict[int, str]:
+    """
+    用 JSON 协议翻译一批 (id, text)，返回 {id: zh}
+    返回内容缺失部分 ID 时，把缺失条目对半拆分后重试，直到单条仍然失败为止
+    请求本身出错时由 limiter（如果提供）负责退避重试，重试耗尽后只返回已经流式交付的条目
+    提供 on_item 时以流式请求，每解析出一个条目就调用 on_item(id, zh)
+    提供 glossary 时在系统提示词中附带本批文本里出现的术语
+    """
+    content = build_batch_content(items)
+    max_tokens = batch_max_tokens([t for _, t in items], max_output_tokens)
+    system_prompt = prompt_with_glossary(BATCH_PROMPT, glossary, [t for _, t in items])
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": content}
+    ]
+    # 已交给 on_item 的条目；放在 request 之外，limiter 重试整个请求时不会重复回调
+    streamed: Dict[int, str] = {}
+
+    async def request():
+        if on_item is None:
+            response = await client.chat.completions.create(
+                model=model, messages=messages, temperature=temperature, max_tokens=max_tokens)
+            return parse_batch_response(response.choices[0].message.content)
+
+        stream = await client.chat.completions.create(
+            model=model, messages=messages, temperature=temperature, max_tokens=max_tokens, stream=True)
+        parser = BatchStreamParser()
+        wanted = {i for i, _ in items}
+        received = []
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            received.append(delta)
+            for key, zh in parser.feed(delta):
+                if key in wanted and key not in streamed:
+                    streamed[key] = zh
+                    on_item(key, zh)
+        # 流式解析只认 [{...}, ...] 形式，其他能被完整解析的格式在结束后补上
+        result = parse_batch_response(''.join(received))
+        for key, zh in result.items():
+            if key in wanted and key not in streamed:
+                on_item(key, zh)
+        result.update(streamed)
+        return result
+
+    try:
+        if limiter is None:
+            result = await request()
+        else:
+            tokens = estimate_tokens(system_prompt + content) + sum(estimate_output_tokens(t) for _, t in items)
+            result = await limiter.call_async(request, tokens)
+    except Exception as e:
+        print(f"翻译批次失败 (id {items[0][0]}-{items[-1][0]}): {e}")
+        # 中途断开前已流式交付的条目仍然有效
+        return dict(streamed)
+
+    missing = [item for item in items if item[0] not in result]
+    if missing and len(items) > 1:
+        half = max(1, len(missing) // 2)
+        for part in (missing[:half], missing[half:]):
+            if part:
+                result.update(await translate_json_batch(client, model, part, temperature, max_output_tokens, limiter,
+                                                         on_item, glossary))
+    return result
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+translation_cache.py
+
+持久化翻译缓存（翻译记忆库）。
+以 (base_url, model, 系统提示词哈希, temperature, 原文) 为键，把译文保存在 SQLite 中，
+重复运行同一个视频或生成同一份字幕的不同版本时无需再次调用 API。
+总大小超过上限时按最近使用时间（LRU）淘汰旧条目。
+
+用法:
+  cache = TranslationCache()
+  zh_list = translate_cached(texts, translate_fn, cache, base_url, model, system_prompt, 0.1)
+  print(cache.summary())
+"""
+import hashlib
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+from translation_journal import is_failed
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'subtitle_tochinese', 'translations.sqlite3')
+DEFAULT_CACHE_MAX_MB = 256
+
+
+class TranslationCache:
+    """基于 SQLite 的翻译缓存，按总字节数做 LRU 淘汰；连接由锁保护，可在多个线程间共享"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_CACHE_MAX_MB * 1024 * 1024):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        import sqlite3
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS translations ('
+            ' key TEXT PRIMARY KEY,'
+            ' zh TEXT NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' last_used REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_last_used ON translations(last_used)')
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(base_url: str, model: str, system_prompt: str, temperature: float, text: str) -> str:
+        """生成缓存键：提示词先单独哈希，避免长提示词拖慢键的计算"""
+        prompt_hash = hashlib.sha256(system_prompt.encode('utf-8')).hexdigest()
+        raw = '\x1f'.join([base_url.rstrip('/'), model, prompt_hash, repr(float(temperature)), text])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, str]:
+        """批量查询，返回命中的 {key: zh}，并刷新命中条目的使用时间"""
+        found: Dict[str, str] = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            # SQLite 单条语句的参数数量有限，分段查询
+            for i in range(0, len(unique), 500):
+                chunk = unique[i:i + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f'SELECT key, zh FROM translations WHERE key IN ({placeholders})', chunk
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    'UPDATE translations SET last_used = ? WHERE key = ?',
+                    [(now, k) for k in found]
+                )
+                self._conn.commit()
+            for k in keys:
+                if k in found:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+        return found
+
+    def get(self, key: str) -> Optional[str]:
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: Sequence[tuple]) -> None:
+        """批量写入 (key, zh)，写入后检查总大小并淘汰最久未使用的条目"""
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO translations (key, zh, size, last_used) VALUES (?, ?, ?, ?)',
+                [(k, zh, len(k) + len(zh.encode('utf-8')), now) for k, zh in items]
+            )
+            self._conn.commit()
+            self.evict()
+
+    def put(self, key: str, zh: str) -> None:
+        self.put_many([(key, zh)])
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM translations').fetchone()[0]
+
+    def evict(self) -> int:
+        """超过 max_bytes 时，从最近使用的条目开始累计大小，删除超出上限的部分"""
+        with self._lock:
+            if self.total_bytes() <= self.max_bytes:
+                return 0
+            cur = self._conn.execute(
+                'DELETE FROM translations WHERE key IN ('
+                ' SELECT key FROM ('
+                '  SELECT key, SUM(size) OVER (ORDER BY last_used DESC, rowid DESC) AS running'
+                '  FROM translations)'
+                ' WHERE running > ?)',
+                (self.max_bytes,)
+            )
+            self._conn.commit()
+            return cur.rowcount
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0.0
+        return f"翻译缓存: 命中 {self.hits}，未命中 {self.misses}（命中率 {rate:.1f}%）"
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def translate_cached(texts: List[str], translate_fn: Callable[[List[str]], List[str]],
+                     cache: Optional[TranslationCache], base_url: str, model: str,
+                     system_prompt: str, temperature: float,
+                     on_result: Optional[Callable[[str, str], None]] = None) -> List[str]:
+    """
+    先查缓存，只把未命中的文本交给 translate_fn，再把翻译成功的译文写回缓存
+    提供 on_result 时，命中缓存的译文在调用 translate_fn 之前就逐条交给 on_result(原文, 译文)
+    """
+    if cache is None or not texts:
+        return translate_fn(texts)
+
+    keys = [cache.make_key(base_url, model, system_prompt, temperature, t) for t in texts]
+    found = cache.get_many(keys)
+    results = [found.get(k, '') for k in keys]
+    missing = [i for i, k in enumerate(keys) if k not in found]
+    if on_result is not None:
+        for text, key in zip(texts, keys):
+            if key in found:
+                on_result(text, found[key])
+
+    if missing:
+        zh_list = translate_fn([texts[i] for i in missing])
+        for i, zh in zip(missing, zh_list):
+            results[i] = zh
+        # 翻译失败的结果不写入缓存，下次运行会重试
+        cache.put_many([(keys[i], zh) for i, zh in zip(missing, zh_list) if not is_failed(zh)])
+
+    return results
+
+
+def add_cache_arguments(parser) -> None:
+    """为命令行添加缓存相关参数"""
+    parser.add_argument('--cache', default=os.environ.get('SUBTITLE_CACHE_PATH', DEFAULT_CACHE_PATH),
+                        help='翻译缓存文件路径 (默认: ~/.cache/subtitle_tochinese/translations.sqlite3)')
+    parser.add_argument('--cache-max-mb', type=int, default=DEFAULT_CACHE_MAX_MB,
+                        help=f'翻译缓存大小上限，单位 MB (默认: {DEFAULT_CACHE_MAX_MB})')
+    parser.add_argument('--no-cache', action='store_true', help='不使用翻译缓存')
+
+
+def open_cache(args) -> Optional[TranslationCache]:
+    """根据命令行参数打开缓存，打开失败时给出警告并继续无缓存运行"""
+    if getattr(args, 'no_cache', False):
+        return None
+    import sqlite3
+    try:
+        return TranslationCache(args.cache, args.cache_max_mb * 1024 * 1024)
+    except (sqlite3.Error, OSError) as e:
+        print(f"警告: 无法打开翻译缓存 {args.cache}: {e}")
+        return None
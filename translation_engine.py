@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+translation_engine.py
+
+并发翻译引擎：使用 asyncio 在有界并发下逐行翻译字幕段落。
+结果始终按输入顺序返回，调用方可以继续用 map_idx 回填到字幕块。
+
+所有请求共用一个长期存在的 Translator，它持有一个 keep-alive 连接池
+（安装了 h2 时使用 HTTP/2），避免每条字幕都重新建立连接和 TLS 握手。
+Translator 同时持有共享的 RateLimiter，负责限流、429 退避重试和 AIMD 并发调整。
+
+用法:
+  from translation_engine import Translator, batch_translate_concurrent
+  with Translator(api_key, pool_size=32) as translator:
+      zh_list = batch_translate_concurrent(texts, translator=translator, concurrency=32)
+
+依赖:
+  pip install openai
+  pip install h2  # 可选，启用 HTTP/2
+
+asyncio 只在真正发起翻译时导入，--help 和不翻译的流程不承担它的导入开销。
+"""
+import importlib.util
+import re
+import threading
+import unicodedata
+from typing import Any, Awaitable, Callable, List, Optional, Sequence
+
+from glossary import Glossary, cache_prompt, prompt_with_glossary, translate_with_glossary
+from rate_limiter import RateLimiter
+from token_batching import estimate_output_tokens, estimate_tokens, single_line_max_tokens
+from translation_cache import TranslationCache, translate_cached
+from translation_journal import FAILED, TranslationJournal, is_failed, translate_journaled
+
+DEFAULT_CONCURRENCY = 8
+
+SINGLE_LINE_PROMPT = """你是一个专业的字幕翻译助手。请将英文文本准确翻译成简体中文。
+只返回翻译后的中文文本，不要添加任何序号、解释或额外文字。"""
+
+
+HTTP2_AVAILABLE = importlib.util.find_spec('h2') is not None
+
+
+class Translator:
+    """
+    长期存在的翻译客户端，持有共享的 HTTP 连接池
+    异步客户端运行在 Translator 自己的后台事件循环中，因此多次同步调用之间连接可以复用
+    重试由 rate_limiter 统一负责，SDK 自带的重试被关闭，避免两层重试叠加
+    提供 glossary 时，各翻译路径先用术语表解析纯术语字幕，并在提示词中附带出现的术语
+    """
+
+    def __init__(self, api_key: str, base_url: str = "https://api.deepseek.com", model: str = "deepseek-chat",
+                 pool_size: int = DEFAULT_CONCURRENCY, timeout: float = 60.0,
+                 rate_limiter: Optional[RateLimiter] = None, glossary: Optional[Glossary] = None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        self.pool_size = max(1, pool_size)
+        self.timeout = timeout
+        self.limiter = rate_limiter or RateLimiter(max_concurrency=self.pool_size)
+        self.glossary = glossary
+        self._client = None
+        self._async_client = None
+        self._loop = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _limits(self):
+        import httpx
+        return httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+
+    @property
+    def client(self):
+        """同步 OpenAI 客户端（首次使用时创建）"""
+        if self._client is None:
+            try:
+                import httpx
+                from openai import OpenAI
+            except ImportError:
+                raise ImportError("请先安装 OpenAI SDK: pip install openai")
+            http_client = httpx.Client(http2=HTTP2_AVAILABLE, limits=self._limits(), timeout=self.timeout)
+            self._client = OpenAI(api_key=self.api_key, base_url=self.base_url, http_client=http_client, max_retries=0)
+        return self._client
+
+    @property
+    def async_client(self):
+        """异步 OpenAI 客户端，只能在 run() 提交的协程中使用"""
+        if self._async_client is None:
+            try:
+                import httpx
+                from openai import AsyncOpenAI
+            except ImportError:
+                raise ImportError("请先安装 OpenAI SDK: pip install openai")
+            http_client = httpx.AsyncClient(http2=HTTP2_AVAILABLE, limits=self._limits(), timeout=self.timeout)
+            self._async_client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, http_client=http_client,
+                                             max_retries=0)
+        return self._async_client
+
+    def run(self, coro):
+        """在后台事件循环中执行协程并等待结果"""
+        import asyncio
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name='translator-loop', daemon=True)
+                self._thread.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def close(self) -> None:
+        """关闭连接池和后台事件循环"""
+        if self._async_client is not None:
+            self.run(self._async_client.close())
+            self._async_client = None
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+            self._thread = None
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class DedupStats:
+    """记录去重前后的文本数量，以及重试耗尽仍翻译失败的唯一文本数"""
+
+    def __init__(self):
+        self.total = 0
+        self.unique = 0
+        self.failed = 0
+
+    @property
+    def ratio(self) -> float:
+        return 1 - self.unique / self.total if self.total else 0.0
+
+    def summary(self) -> str:
+        failed = f"，{self.failed} 个翻译失败" if self.failed else ''
+        return f"文本去重: {self.total} 段 → {self.unique} 个唯一文本（去重率 {self.ratio * 100:.1f}%）{failed}"
+
+
+def normalize_text(text: str) -> str:
+    """去重用的规范化：Unicode NFC、合并空白；保留大小写，避免改变含义"""
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def deduplicated(translate_fn: Callable[[List[str]], List[str]],
+                 stats: Optional[DedupStats] = None) -> Callable[[List[str]], List[str]]:
+    """
+    包装 translate_fn：规范化后相同的文本只翻译一次，再把结果分发回每个出现位置
+    """
+    def wrapper(texts: List[str]) -> List[str]:
+        slots: List[int] = []
+        unique: List[str] = []
+        seen = {}
+        for text in texts:
+            key = normalize_text(text)
+            j = seen.get(key)
+            if j is None:
+                j = seen[key] = len(unique)
+                unique.append(text)
+            slots.append(j)
+        if stats is not None:
+            stats.total += len(texts)
+            stats.unique += len(unique)
+        zh_list = translate_fn(unique) if unique else []
+        if stats is not None:
+            stats.failed += sum(1 for zh in zh_list if is_failed(zh))
+        return [zh_list[j] for j in slots]
+
+    return wrapper
+
+
+def clean_single_line(result: str, text: str) -> str:
+    """清理单行翻译结果：移除序号和引号，与原文相同视为未翻译"""
+    result = re.sub(r'^\d+[\.\s]*', '', result.strip())
+    result = re.sub(r'^[\"\']|[\"\']$', '', result)
+    result = result.strip()
+    if not result or result == text:
+        return ""
+    return result
+
+
+async def map_in_order(items: Sequence[Any], worker: Callable[[Any], Awaitable[Any]],
+                       concurrency: int = DEFAULT_CONCURRENCY, label: str = '翻译进度') -> List[Any]:
+    """
+    以最多 concurrency 个并发任务处理 items，按输入顺序返回结果
+    使用固定数量的工作协程共享一个迭代器，任务数量再大也不会一次性创建全部协程
+    """
+    import asyncio
+    total = len(items)
+    results: List[Any] = [None] * total
+    if not total:
+        return results
+
+    pending = iter(enumerate(items))
+    done = 0
+
+    async def runner():
+        nonlocal done
+        for i, item in pending:
+            results[i] = await worker(item)
+            done += 1
+            if total > 1:
+                print(f"{label}: {done}/{total}", end='\r')
+
+    await asyncio.gather(*(runner() for _ in range(min(max(1, concurrency), total))))
+    if total > 1:
+        print()
+    return results
+
+
+async def translate_single_line_async(client, text: str, model: str = "deepseek-chat",
+                                     limiter: Optional[RateLimiter] = None,
+                                     glossary: Optional[Glossary] = None) -> str:
+    """
+    使用异步客户端翻译单个文本，重试耗尽后返回 FAILED
+    提供 limiter 时经过限流、退避重试和并发控制
+    提供 glossary 时在系统提示词中附带文本里出现的术语
+    """
+    system_prompt = prompt_with_glossary(SINGLE_LINE_PROMPT, glossary, [text])
+
+    def request():
+        return client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": f"请翻译：{text}"}
+            ],
+            temperature=0.1,
+            max_tokens=single_line_max_tokens(text)
+        )
+
+    try:
+        if limiter is None:
+            response = await request()
+        else:
+            tokens = estimate_tokens(system_prompt + text) + estimate_output_tokens(text)
+            response = await limiter.call_async(request, tokens)
+        return clean_single_line(response.choices[0].message.content or '', text)
+
+    except Exception as e:
+        print(f"翻译失败: {text[:50]}... - {e}")
+        return FAILED
+
+
+def batch_translate_concurrent(texts: List[str], api_key: Optional[str] = None, base_url: str = "https://api.deepseek.com",
+                               model: str = "deepseek-chat", concurrency: int = DEFAULT_CONCURRENCY,
+                               cache: Optional[TranslationCache] = None,
+                               translator: Optional[Translator] = None,
+                               journal: Optional[TranslationJournal] = None,
+                               on_result: Optional[Callable[[str, str], None]] = None) -> List[str]:
+    """
+    并发逐行翻译：同时最多 concurrency 个请求在途，结果顺序与 texts 一致
+    提供 cache 时先查缓存，只翻译未命中的文本
+    提供 translator 时复用其连接池，否则为本次调用创建一个临时 Translator
+    提供 journal 时跳过日志中已有的译文，并在每条译文完成时立即写入日志
+    提供 on_result 时每得到一条译文（含缓存和日志命中）就调用 on_result(原文, 译文)
+    translator 带有术语表时，完全由术语组成的文本直接解析，不请求 API
+    """
+    if translator is None:
+        with Translator(api_key, base_url, model, pool_size=concurrency) as own:
+            return batch_translate_concurrent(texts, concurrency=concurrency, cache=cache, translator=own, journal=journal,
+                                              on_result=on_result)
+
+    async def worker(text: str) -> str:
+        zh = await translate_single_line_async(translator.async_client, text, translator.model, translator.limiter,
+                                               translator.glossary)
+        if journal is not None:
+            journal.record(text, zh)
+        if on_result is not None:
+            on_result(text, zh)
+        return zh
+
+    def run(pending: List[str]) -> List[str]:
+        return translator.run(map_in_order(pending, worker, concurrency))
+
+    glossary = translator.glossary
+    return translate_with_glossary(texts, lambda rest: translate_cached(
+        rest, lambda pending: translate_journaled(pending, run, journal, on_result),
+        cache, translator.base_url, translator.model, cache_prompt(SINGLE_LINE_PROMPT, glossary), 0.1, on_result
+    ), glossary, on_result)
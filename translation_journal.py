@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+translation_journal.py
+
+翻译断点日志：在输出文件旁边维护一个只追加的 JSONL 日志（<输出文件>.journal），
+每翻译完一条就写入一行 {"h": 原文哈希, "zh": 译文}。
+写入立即 flush，fsync 按条数或时间间隔批量进行，避免每条都等待磁盘。
+进程中断或网络故障导致部分批次为空后，使用 --resume 重新运行时，
+日志中已有的译文直接复用，只翻译剩下的部分。输出文件写出且没有翻译失败的段落时日志会被删除，
+否则保留日志，下次 --resume 只重试失败的段落。
+重试耗尽的请求以 FAILED 标记结果；术语表解析为原文、模型照抄原文等空译文是正常结果，同样记入日志。
+
+用法:
+  journal = TranslationJournal(output + '.journal', resume=True)
+  zh_list = translate_journaled(texts, translate_fn, journal)
+  ...  # translate_fn 内部每得到一条译文就调用 journal.record(text, zh)
+  close_journal(journal, failed=0)   # 有失败的段落时保留日志
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+JOURNAL_SUFFIX = '.journal'
+DEFAULT_FSYNC_EVERY = 64
+DEFAULT_FSYNC_INTERVAL = 1.0
+
+
+class _Failed(str):
+    """翻译失败的标记：在输出中与空字符串相同，只能用 is_failed 区分"""
+
+
+# 重试耗尽的请求返回 FAILED：不写入日志和缓存，计为翻译失败，下次 --resume 时重试
+FAILED = _Failed()
+
+
+def is_failed(zh: str) -> bool:
+    return isinstance(zh, _Failed)
+
+
+class TranslationJournal:
+    """只追加的翻译日志，可以在多个线程中调用 record"""
+
+    def __init__(self, path: str, resume: bool = False, fsync_every: int = DEFAULT_FSYNC_EVERY,
+                 fsync_interval: float = DEFAULT_FSYNC_INTERVAL):
+        self.path = path
+        self.fsync_every = max(1, fsync_every)
+        self.fsync_interval = fsync_interval
+        # 只保存上次运行留下的译文；本次新记录的只写入文件，内存占用不随翻译条数增长
+        self.entries: Dict[str, str] = {}
+        self.resumed = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+        if resume:
+            self._load()
+        self._file = open(path, 'a' if resume else 'w', encoding='utf-8')
+
+    @staticmethod
+    def make_key(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]
+
+    def _load(self) -> None:
+        """读取已有日志；进程在写入中途被杀时最后一行可能不完整，直接忽略"""
+        try:
+            with open(self.path, 'r', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self.entries[entry['h']] = entry['zh']
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except FileNotFoundError:
+            pass
+
+    def lookup(self, texts: Sequence[str]) -> Dict[int, str]:
+        """返回日志中已有译文的 {下标: 译文}"""
+        found = {}
+        for i, text in enumerate(texts):
+            zh = self.entries.get(self.make_key(text))
+            if zh is not None:
+                found[i] = zh
+        return found
+
+    def record(self, text: str, zh: str) -> None:
+        """追加一条译文；翻译失败（FAILED）的不记录，下次运行会重试"""
+        if is_failed(zh):
+            return
+        key = self.make_key(text)
+        line = json.dumps({'h': key, 'zh': zh}, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self._unsynced += 1
+            if (self._unsynced >= self.fsync_every
+                    or time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync()
+
+    def _sync(self) -> None:
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self, remove: bool = False) -> None:
+        """关闭日志；remove 为 True 时删除日志文件（输出已成功写出）"""
+        with self._lock:
+            if not self._file.closed:
+                if self._unsynced:
+                    self._sync()
+                self._file.close()
+        if remove:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+def translate_journaled(texts: List[str], translate_fn: Callable[[List[str]], List[str]],
+                        journal: Optional['TranslationJournal'],
+                        on_result: Optional[Callable[[str, str], None]] = None) -> List[str]:
+    """
+    先取出日志中已有的译文，只把剩下的文本交给 translate_fn
+    translate_fn 负责在每条译文完成时调用 journal.record
+    提供 on_result 时，日志中已有的译文立即逐条交给 on_result(原文, 译文)
+    """
+    if journal is None or not texts:
+        return translate_fn(texts)
+
+    found = journal.lookup(texts)
+    journal.resumed += len(found)
+    results = [found.get(i, '') for i in range(len(texts))]
+    if on_result is not None:
+        for i, zh in found.items():
+            on_result(texts[i], zh)
+    missing = [i for i in range(len(texts)) if i not in found]
+    if missing:
+        for i, zh in zip(missing, translate_fn([texts[i] for i in missing])):
+            results[i] = zh
+    return results
+
+
+def add_journal_arguments(parser) -> None:
+    """为命令行添加断点续传参数"""
+    parser.add_argument('--resume', action='store_true',
+                        help=f'从输出文件旁的 {JOURNAL_SUFFIX} 日志继续上次中断的翻译，已翻译的段落不再请求 API')
+
+
+def open_journal(output_path: str, resume: bool = False) -> Optional[TranslationJournal]:
+    """在输出文件旁打开翻译日志，打开失败时给出警告并继续无日志运行"""
+    path = output_path + JOURNAL_SUFFIX
+    try:
+        journal = TranslationJournal(path, resume=resume)
+    except OSError as e:
+        print(f"警告: 无法打开翻译日志 {path}: {e}")
+        return None
+    if resume and journal.entries:
+        print(f"断点续传: 日志中已有 {len(journal.entries)} 条译文")
+    return journal
+
+
+def close_journal(journal: Optional[TranslationJournal], failed: int) -> None:
+    """输出写出后关闭断点日志：全部翻译成功时删除，有失败的段落时保留供 --resume 重试"""
+    if journal is None:
+        return
+    if not failed:
+        journal.close(remove=True)
+        return
+    journal.close()
+    print(f"翻译日志: {failed} 段翻译失败，已保留 {journal.path}；使用 --resume 重新运行只会重试这些段落")
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+translation_runner.py
+
+各命令行脚本共用的字幕翻译流程：
+打开缓存、术语表和 Translator → 过滤无需翻译的字幕 → 断点日志、去重、句子合并后翻译
+→ 渐进写出或调整时间轴后写出 → 关闭资源并打印各项统计。
+--window 大于 0 时改用 srt_pipeline 分窗口流式翻译，内存占用与文件大小无关。
+
+各脚本只提供自己的批量翻译函数，run_translation 以关键字参数补上
+cache、translator、journal 和 on_result。
+
+用法:
+  translate_batch = partial(batch_translate_improved, api_key=args.deepseek_key, concurrency=args.concurrency)
+  if not run_translation(args, args.input, args.output, translate_batch):
+      sys.exit(1)
+"""
+from functools import partial
+from typing import Callable, List, Optional, Union
+
+from caption_formats import iter_caption_file, read_captions
+from caption_merge import translate_merged
+from cue_filter import FilterStats, select_translatable
+from glossary import Glossary, open_glossary
+from progressive_srt import open_progressive
+from rate_limiter import make_rate_limiter
+from srt_io import Cue, build_srt, write_file
+from srt_pipeline import translate_srt_stream
+from timeline import adjust_timeline
+from translation_cache import TranslationCache, open_cache
+from translation_engine import DedupStats, Translator, deduplicated
+from translation_journal import close_journal, open_journal
+
+TranslateBatch = Callable[..., List[str]]
+
+
+def make_translator(args, glossary: Optional[Glossary] = None) -> Translator:
+    """按命令行参数创建 Translator：连接池与 --concurrency 一致，带共享限流器和术语表"""
+    options = {}
+    if getattr(args, 'deepseek_url', None):
+        options['base_url'] = args.deepseek_url
+    if getattr(args, 'deepseek_model', None):
+        options['model'] = args.deepseek_model
+    return Translator(args.deepseek_key, pool_size=args.concurrency,
+                      rate_limiter=make_rate_limiter(args, args.concurrency), glossary=glossary, **options)
+
+
+def _translate_cues(args, cues: List[Cue], output: str, translate_batch: TranslateBatch, translator: Translator,
+                    cache: Optional[TranslationCache], description: str, filtered: FilterStats) -> None:
+    texts, positions = select_translatable(cues, filtered)
+    print(filtered.summary())
+    journal = open_journal(output, args.resume) if texts else None
+    writer = open_progressive(output, cues, texts, positions, args.merge_sentences, args.progressive)
+    dedup = DedupStats()
+    try:
+        if texts:
+            print(f"待翻译段落: {len(texts)}{description}")
+            translate_fn = deduplicated(partial(translate_batch, cache=cache, translator=translator, journal=journal,
+                                                on_result=writer.record if writer else None), dedup)
+            zh_list = translate_merged(texts, [(cues[i].start_ms, cues[i].end_ms) for i in positions], translate_fn,
+                                       positions=positions, mode=args.merge_sentences)
+            for i, zh in zip(positions, zh_list):
+                cues[i].zh = zh
+            print(dedup.summary())
+        else:
+            print('没有需要翻译的段落。')
+
+        content = build_srt(adjust_timeline(cues, args))
+        if writer:
+            writer.finish(content)
+        else:
+            write_file(output, content)
+    finally:
+        if journal:
+            journal.close()
+        if writer:
+            writer.close()
+
+    close_journal(journal, dedup.failed)
+    if writer:
+        print(writer.summary())
+
+
+def _translate_windowed(args, path: str, output: str, translate_batch: TranslateBatch, translator: Translator,
+                        cache: Optional[TranslationCache], description: str) -> None:
+    print(f"分窗口翻译: 每个窗口 {args.window} 条字幕{description}")
+    journal = open_journal(output, args.resume)
+    dedup = DedupStats()
+    try:
+        translate_fn = deduplicated(partial(translate_batch, cache=cache, translator=translator, journal=journal),
+                                    dedup)
+        stats = translate_srt_stream(iter_caption_file(path), output, translate_fn, args.window,
+                                     args.merge_sentences, timeline_args=args, atomic=not args.progressive)
+        print(stats.summary())
+        print(stats.filtered.summary())
+        print(dedup.summary())
+    finally:
+        if journal:
+            journal.close()
+
+    close_journal(journal, dedup.failed)
+
+
+def run_translation(args, source: Union[str, List[Cue]], output: str, translate_batch: TranslateBatch,
+                    translator: Optional[Translator] = None, cache: Optional[TranslationCache] = None,
+                    description: str = '', filtered: Optional[FilterStats] = None) -> bool:
+    """
+    翻译字幕并写出双语 SRT，成功时返回 True，出错时打印原因并返回 False
+    source 为字幕文件路径（SRT / json3 / vtt）或已解析的字幕列表；
+    文件路径且 args.window 大于 0 时分窗口流式翻译
+    translate_batch(texts, cache=..., translator=..., journal=..., on_result=...) 为脚本自己的批量翻译函数
+    未提供 translator 时按 args 打开缓存、术语表并创建 Translator，结束时关闭并打印统计；
+    提供时（如批量模式中各视频共享）同时使用调用方的 cache，由调用方负责关闭
+    提供 filtered 时把字幕过滤的分类结果记入其中
+    """
+    glossary = None
+    owned = translator is None
+    if owned:
+        cache = open_cache(args)
+        glossary = open_glossary(args)
+        translator = make_translator(args, glossary)
+    try:
+        if isinstance(source, str) and getattr(args, 'window', 0):
+            _translate_windowed(args, source, output, translate_batch, translator, cache, description)
+        else:
+            cues = read_captions(source) if isinstance(source, str) else source
+            _translate_cues(args, cues, output, translate_batch, translator, cache, description,
+                            filtered if filtered is not None else FilterStats())
+        return True
+    except Exception as e:
+        print(f"翻译失败: {e}")
+        return False
+    finally:
+        if owned:
+            print(translator.limiter.summary())
+            translator.close()
+            if glossary:
+                print(glossary.summary())
+            if cache:
+                print(cache.summary())
+                cache.close()
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+video_mux.py
+
+使用 ffmpeg 把双语字幕合并到视频中，支持两种方式：
+- burn: 把字幕烧录进画面（重新编码视频和音频，任何播放器都能显示，但很慢）
+- soft: 视频和音频直接复制，字幕作为独立轨道封装
+        MP4 使用 mov_text（Apple 设备播放器可以开关字幕），MKV 使用 SRT 或 ASS，
+        不重新编码，通常几秒钟就能完成
+
+ffmpeg 的进度通过 -progress pipe:1 实时解析（见 ffmpeg_progress.py），
+运行结束后输出用时和实时倍率。
+
+烧录时可以分段并行：在关键帧处把视频切成 N 段，每段配上平移后的字幕，
+由 N 个 ffmpeg 进程同时编码，最后无损拼接视频并把原音频编码为 AAC。
+x264 在 1080p 下超过几个线程后扩展性很差，多核机器上分段编码能明显缩短时间。
+
+用法:
+  from video_mux import merge_subtitle_to_video
+  merge_subtitle_to_video('video.mp4', 'video_bilingual.srt', 'output', mode='soft')
+"""
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+from typing import Callable, List, Optional, Tuple
+
+from ffmpeg_progress import FfmpegProgress, FfmpegRun, ProgressAggregator, run_ffmpeg
+from srt_io import Cue, build_srt, parse_srt
+
+ProgressCallback = Optional[Callable[[FfmpegProgress], None]]
+
+MUX_MODES = ('burn', 'soft')
+CONTAINERS = ('mp4', 'mkv')
+
+SUBTITLE_STYLE = ("FontName=Helvetica,FontSize=11,PrimaryColour=&H00FFFFFF,OutlineColour=&H00000000,"
+                  "BackColour=&H80000000,BorderStyle=3,Outline=1,Shadow=0,MarginV=10")
+
+# 字幕轨道的语言和标题
+SUBTITLE_LANGUAGE = 'chi'
+SUBTITLE_TITLE = '中英双语'
+
+# 烧录时的视频编码参数
+BURN_VIDEO_ARGS = [
+    '-c:v', 'libx264',  # 使用H.264编码，Apple设备兼容
+    '-preset', 'medium',  # 编码速度和质量平衡
+    '-crf', '23',  # 视频质量设置
+    '-profile:v', 'high',  # H.264高级配置
+    '-level', '4.0',  # 兼容Apple设备
+]
+# 烧录时的音频编码参数；分段并行烧录的拼接也用它，原音频可能是 Opus 等 MP4 中兼容性差的编码
+BURN_AUDIO_ARGS = [
+    '-c:a', 'aac',  # Apple设备兼容的音频编码
+    '-b:a', '128k',  # 音频比特率
+]
+
+# 每段至少这么长才值得分段并行，过短的视频直接单进程编码
+MIN_CHUNK_SECONDS = 30.0
+
+
+def check_ffmpeg() -> bool:
+    """检查ffmpeg是否可用，不可用时打印安装提示"""
+    try:
+        subprocess.run(['ffmpeg', '-version'], capture_output=True, check=True)
+        return True
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        print("错误: 请先安装ffmpeg")
+        print("macOS: brew install ffmpeg")
+        print("Ubuntu: sudo apt install ffmpeg")
+        print("Windows: 下载ffmpeg并添加到PATH")
+        return False
+
+
+def output_path(video_file: str, output_folder: str, container: str = 'mp4') -> str:
+    """生成输出文件名 <视频名>_with_subtitles.<容器>"""
+    base_name = os.path.splitext(os.path.basename(video_file))[0]
+    # 移除可能存在的扩展名重复
+    if base_name.endswith('.mp4'):
+        base_name = base_name[:-4]
+    return os.path.join(output_folder, f"{base_name}_with_subtitles.{container}")
+
+
+def build_burn_command(video_file: str, subtitle_file: str, output_file: str) -> List[str]:
+    """烧录字幕：重新编码为 H.264 + AAC，兼容 Apple 设备"""
+    return [
+        'ffmpeg',
+        '-i', video_file,
+        '-vf', f"subtitles={subtitle_file}:force_style='{SUBTITLE_STYLE}'",
+        *BURN_VIDEO_ARGS,
+        *BURN_AUDIO_ARGS,
+        '-movflags', '+faststart',  # 优化流媒体播放
+        output_file,
+        '-y'  # 覆盖输出文件
+    ]
+
+
+def build_soft_command(video_file: str, subtitle_file: str, output_file: str,
+                       subtitle_codec: Optional[str] = None) -> List[str]:
+    """
+    封装软字幕：视频、音频流直接复制，字幕作为默认字幕轨道
+    MP4 只支持 mov_text；MKV 默认 srt，也可以指定 subtitle_codec='ass'
+    """
+    is_mp4 = output_file.lower().endswith(('.mp4', '.m4v', '.mov'))
+    if is_mp4:
+        subtitle_codec = 'mov_text'
+    elif subtitle_codec is None:
+        subtitle_codec = 'srt'
+    cmd = [
+        'ffmpeg',
+        '-i', video_file,
+        '-i', subtitle_file,
+        '-map', '0:v', '-map', '0:a?', '-map', '1:0',
+        '-c:v', 'copy',
+        '-c:a', 'copy',
+        '-c:s', subtitle_codec,
+        '-metadata:s:s:0', f'language={SUBTITLE_LANGUAGE}',
+        '-metadata:s:s:0', f'title={SUBTITLE_TITLE}',
+        '-disposition:s:0', 'default',
+    ]
+    if is_mp4:
+        cmd += ['-movflags', '+faststart']
+    return cmd + [output_file, '-y']
+
+
+def default_burn_workers() -> int:
+    """默认分段数：CPU 核数的一半，最多 8 段"""
+    return max(1, min(8, (os.cpu_count() or 1) // 2))
+
+
+def probe_duration(video_file: str) -> Optional[float]:
+    """从 ffmpeg -i 的输出中读取视频时长（秒），不依赖 ffprobe"""
+    result = subprocess.run(['ffmpeg', '-hide_banner', '-i', video_file], capture_output=True, text=True)
+    m = re.search(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)', result.stderr)
+    if not m:
+        return None
+    h, mi, sec = m.groups()
+    return int(h) * 3600 + int(mi) * 60 + float(sec)
+
+
+def split_at_keyframes(video_file: str, workdir: str, segment_seconds: float) -> List[Tuple[str, float, float]]:
+    """
+    用 segment 复用器在关键帧处切分视频流（不重新编码），返回 [(分段文件, 开始秒, 结束秒)]
+    分段只在关键帧处切开，实际长度可能与 segment_seconds 不同
+    """
+    list_file = os.path.join(workdir, 'segments.csv')
+    cmd = [
+        'ffmpeg', '-hide_banner', '-loglevel', 'error',
+        '-i', video_file,
+        '-map', '0:v:0', '-c', 'copy',
+        '-f', 'segment', '-segment_time', f'{segment_seconds:.3f}', '-reset_timestamps', '1',
+        '-segment_list', list_file, '-segment_list_type', 'csv',
+        os.path.join(workdir, 'segment_%03d.mp4'), '-y'
+    ]
+    run = run_ffmpeg(cmd, label='视频分段')
+    if run.returncode != 0:
+        raise RuntimeError(f"视频分段失败: {run.stderr_tail}")
+
+    segments = []
+    with open(list_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            name, start, end = line.strip().rsplit(',', 2)
+            segments.append((os.path.join(workdir, name), float(start), float(end)))
+    return segments
+
+
+def chunk_subtitles(cues: List[Cue], start: float, end: float) -> List[Cue]:
+    """取出与 [start, end) 有交集的字幕，时间轴平移到分段起点；跨越分段边界的字幕在两段中都保留"""
+    start_ms, end_ms = round(start * 1000), round(end * 1000)
+    chunk = []
+    for cue in cues:
+        if cue.start_ms is None or cue.end_ms is None:
+            continue
+        if cue.end_ms <= start_ms or cue.start_ms >= end_ms:
+            continue
+        chunk.append(Cue.from_span('', max(cue.start_ms, start_ms) - start_ms,
+                                   min(cue.end_ms, end_ms) - start_ms, cue.text, cue.zh))
+    return chunk
+
+
+def burn_parallel(video_file: str, subtitle_file: str, output_file: str, workers: int,
+                  duration: Optional[float] = None, on_progress: ProgressCallback = None) -> Optional[FfmpegRun]:
+    """
+    分段并行烧录：关键帧处切分 → 每段烧录平移后的字幕 → concat 无损拼接视频，音频编码为 AAC
+    各分段的进度合并后交给 on_progress
+    成功返回整体的运行统计；分段失败等情况返回 None，由调用方回退到单进程烧录
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    duration = duration or probe_duration(video_file)
+    if not duration:
+        return None
+    chunks = min(workers, int(duration // MIN_CHUNK_SECONDS))
+    if chunks < 2:
+        return None
+
+    with open(subtitle_file, 'r', encoding='utf-8', errors='replace') as f:
+        cues = parse_srt(f)
+
+    workdir = tempfile.mkdtemp(prefix='burn_', dir=os.path.dirname(os.path.abspath(output_file)))
+    started = time.monotonic()
+    aggregator = ProgressAggregator(duration, on_progress, label='分段并行烧录')
+    try:
+        segments = split_at_keyframes(video_file, workdir, duration / chunks)
+        threads = max(1, (os.cpu_count() or 1) // len(segments))
+        print(f"分段并行烧录: {len(segments)} 段，每段 {threads} 个编码线程")
+
+        def encode(index: int) -> str:
+            segment, start, end = segments[index]
+            srt_path = os.path.join(workdir, f'segment_{index:03d}.srt')
+            with open(srt_path, 'w', encoding='utf-8') as f:
+                f.write(build_srt(chunk_subtitles(cues, start, end)))
+            encoded = os.path.join(workdir, f'encoded_{index:03d}.mp4')
+            cmd = [
+                'ffmpeg', '-hide_banner', '-loglevel', 'error',
+                '-i', segment,
+                '-vf', f"subtitles={srt_path}:force_style='{SUBTITLE_STYLE}'",
+                *BURN_VIDEO_ARGS,
+                '-threads', str(threads),
+                '-an', encoded, '-y'
+            ]
+            run = run_ffmpeg(cmd, end - start, aggregator.callback(index), label=f'分段 {index}')
+            if run.returncode != 0:
+                raise RuntimeError(f"分段 {index} 编码失败: {run.stderr_tail}")
+            return encoded
+
+        # 编码工作都在 ffmpeg 子进程中进行，线程池只负责等待
+        with ThreadPoolExecutor(max_workers=len(segments)) as pool:
+            encoded_files = list(pool.map(encode, range(len(segments))))
+        aggregator.finish()
+
+        concat_list = os.path.join(workdir, 'concat.txt')
+        with open(concat_list, 'w', encoding='utf-8') as f:
+            for path in encoded_files:
+                f.write(f"file '{path}'\n")
+        cmd = [
+            'ffmpeg', '-hide_banner', '-loglevel', 'error',
+            '-f', 'concat', '-safe', '0', '-i', concat_list,
+            '-i', video_file,
+            '-map', '0:v', '-map', '1:a?',
+            '-c:v', 'copy',  # 视频已编码，直接拼接
+            *BURN_AUDIO_ARGS,  # 与单进程烧录一致，输出的音频总是 AAC
+            '-movflags', '+faststart',
+            output_file, '-y'
+        ]
+        run = run_ffmpeg(cmd, label='分段拼接')
+        if run.returncode != 0:
+            raise RuntimeError(f"分段拼接失败: {run.stderr_tail}")
+        return FfmpegRun('分段并行烧录', 0, '', time.monotonic() - started, aggregator.total)
+    except (RuntimeError, OSError, ValueError) as e:
+        print(f"分段并行烧录失败，改为单进程烧录: {e}")
+        return None
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def merge_subtitle_to_video(video_file: str, subtitle_file: str, output_folder: str, mode: str = 'burn',
+                            container: str = 'mp4', subtitle_codec: Optional[str] = None,
+                            burn_workers: Optional[int] = None,
+                            on_progress: ProgressCallback = None) -> Optional[str]:
+    """
+    使用ffmpeg将字幕合并到视频中
+    mode: 'burn' 烧录字幕（重新编码），'soft' 封装为可开关的字幕轨道（不重新编码）
+    burn_workers: 烧录时的并行分段数，默认按 CPU 核数选择，1 表示单进程烧录
+    on_progress: 每个进度事件的回调（fps、速度倍率、已输出时长、剩余时间）
+    """
+    if mode not in MUX_MODES:
+        raise ValueError(f"不支持的合并方式: {mode}")
+    if not check_ffmpeg():
+        return None
+
+    duration = probe_duration(video_file)
+    record_run = getattr(on_progress, 'record_run', None)
+    if mode == 'burn':
+        # 烧录后字幕已在画面中，始终输出 MP4
+        output_file = output_path(video_file, output_folder, 'mp4')
+        workers = default_burn_workers() if burn_workers is None else burn_workers
+        if workers > 1:
+            run = burn_parallel(video_file, subtitle_file, output_file, workers, duration, on_progress)
+            if run:
+                print(run.summary())
+                if record_run:
+                    record_run(run)
+                print(f"视频合并成功: {output_file}")
+                return output_file
+        cmd = build_burn_command(video_file, subtitle_file, output_file)
+        label = '烧录字幕'
+    else:
+        output_file = output_path(video_file, output_folder, container)
+        cmd = build_soft_command(video_file, subtitle_file, output_file, subtitle_codec)
+        label = '封装软字幕'
+
+    try:
+        print("正在烧录字幕到视频..." if mode == 'burn' else "正在封装软字幕轨道（不重新编码）...")
+        run = run_ffmpeg(cmd, duration, on_progress, label=label)
+        print(run.summary())
+        if record_run:
+            record_run(run)
+
+        if run.returncode == 0:
+            print(f"视频合并成功: {output_file}")
+            return output_file
+        else:
+            print(f"合并失败: {run.stderr_tail}")
+            return None
+
+    except Exception as e:
+        print(f"合并过程出错: {e}")
+        return None
+
+
+def add_mux_arguments(parser) -> None:
+    """为命令行添加字幕合并方式参数"""
+    parser.add_argument('--mux', choices=MUX_MODES, default='burn',
+                        help='字幕合并方式: burn 烧录进画面（重新编码），soft 封装为可开关的字幕轨道（不重新编码，几秒完成） (默认: burn)')
+    parser.add_argument('--container', choices=CONTAINERS, default='mp4',
+                        help='软字幕输出容器: mp4 使用 mov_text 字幕，mkv 使用 srt/ass 字幕 (默认: mp4)')
+    parser.add_argument('--subtitle-codec', choices=['srt', 'ass'],
+                        help='MKV 软字幕编码 (默认: srt)')
+    parser.add_argument('--burn-workers', type=int,
+                        help=f'烧录时在关键帧处分段并行编码的段数，1 为单进程 (默认: {default_burn_workers()}，按 CPU 核数)')
@@ -13,21 +13,65 @@ youtube_bilingual_srt.py
   pip install yt-dlp openai
 """
 import argparse
-import re
 import sys
 import os
-import time
 import subprocess
-import tempfile
-from typing import List, Optional
+from functools import partial
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from caption_merge import add_merge_arguments
+from caption_formats import CAPTION_FORMATS, parse_captions
+from srt_io import Cue, build_srt
+from timeline import add_timeline_arguments
+from translation_cache import TranslationCache, add_cache_arguments
+from translation_engine import DEFAULT_CONCURRENCY, Translator, batch_translate_concurrent
+from translation_journal import TranslationJournal, add_journal_arguments
+from translation_runner import run_translation
+from rate_limiter import add_rate_limit_arguments
+from progressive_srt import add_progressive_arguments
+from glossary import add_glossary_arguments
+
+# 按顺序选择 YouTube 直接提供的字幕格式，都在本进程内解析，不需要 ffmpeg 转换
+SUBTITLE_FORMATS = CAPTION_FORMATS
+
+
+def select_subtitle_track(info: dict, language: str = 'en',
+                          formats: Sequence[str] = SUBTITLE_FORMATS) -> Optional[Tuple[dict, bool]]:
+    """
+    从 extract_info 的结果中选择字幕轨道：手动字幕优先，其次自动生成字幕
+    语言先精确匹配，再匹配地区变体（en-US、en-GB 等）；同一语言按 formats 的顺序选择格式
+    返回 (轨道, 是否自动生成) 或 None
+    """
+    for key, automatic in (('subtitles', False), ('automatic_captions', True)):
+        tracks = info.get(key) or {}
+        variants = sorted(lang for lang in tracks if lang != language and lang.split('-')[0] == language)
+        for lang in [language] + variants:
+            by_ext = {track.get('ext'): track for track in tracks.get(lang) or [] if track.get('url')}
+            for fmt in formats:
+                if fmt in by_ext:
+                    return by_ext[fmt], automatic
+    return None
 
-CHINESE_RE = re.compile(r'[\u4e00-\u9fff]')
 
+def caption_request(ydl, track: dict):
+    """构造字幕下载请求，与 yt-dlp 自己下载字幕时使用相同的请求头和浏览器伪装设置"""
+    from yt_dlp.networking import Request
 
-def download_youtube_subtitles(url: str, language: str = 'en') -> Optional[str]:
+    extensions = {}
+    if track.get('impersonate') is not None and hasattr(ydl, '_parse_impersonate_targets'):
+        target = ydl._parse_impersonate_targets(track['impersonate'])[0]
+        if target is not None:
+            extensions['impersonate'] = target
+    return Request(track['url'], headers=track.get('http_headers') or {}, extensions=extensions)
+
+
+def fetch_youtube_captions(url: str, language: str = 'en') -> Optional[Tuple[List[Cue], dict]]:
     """
-    使用 yt-dlp 下载 YouTube 字幕
-    返回字幕文件内容或 None
+    使用 yt-dlp 只获取 YouTube 字幕，不下载视频
+    只运行一次 extract_info(download=False)，从结果中选出字幕轨道后直接读入内存并解析，
+    不创建临时目录、不写文件，手动字幕不存在时也不需要再运行一次 yt-dlp；
+    json3 / vtt 由 caption_formats 直接解析，不调用 ffmpeg 转换
+    返回 (字幕列表, 视频信息) 或 None
     """
     try:
         import yt_dlp
@@ -35,155 +79,54 @@ def download_youtube_subtitles(url: str, language: str = 'en') -> Optional[str]:
         print("错误: 请先安装 yt-dlp: pip install yt-dlp")
         return None
     
-    # 创建临时目录
-    with tempfile.TemporaryDirectory() as temp_dir:
-        ydl_opts = {
-            'writesubtitles': True,
-            'writeautomaticsub': True,
-            'subtitleslangs': [language],
-            'subtitlesformat': 'srt',
-            'skip_download': True,
-            'outtmpl': os.path.join(temp_dir, '%(title)s.%(ext)s'),
-            'quiet': True,
-        }
-        
-        try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=True)
-                
-            # 查找下载的字幕文件
-            for file in os.listdir(temp_dir):
-                if file.endswith('.srt'):
-                    srt_path = os.path.join(temp_dir, file)
-                    with open(srt_path, 'r', encoding='utf-8') as f:
-                        return f.read()
-                        
-            # 如果没有找到字幕文件，尝试自动生成的字幕
-            ydl_opts_auto = {
-                'writeautomaticsub': True,
-                'subtitlesformat': 'srt',
-                'skip_download': True,
-                'outtmpl': os.path.join(temp_dir, 'auto_%(title)s.%(ext)s'),
-                'quiet': True,
-            }
-            
-            with yt_dlp.YoutubeDL(ydl_opts_auto) as ydl:
-                ydl.download([url])
-                
-            for file in os.listdir(temp_dir):
-                if file.endswith('.srt'):
-                    srt_path = os.path.join(temp_dir, file)
-                    with open(srt_path, 'r', encoding='utf-8') as f:
-                        return f.read()
-                        
-        except Exception as e:
-            print(f"下载字幕失败: {e}")
-            return None
+    ydl_opts = {
+        'skip_download': True,
+        'writesubtitles': True,
+        'writeautomaticsub': True,
+        'noplaylist': True,
+        'quiet': True,
+    }
     
-    return None
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+            selected = select_subtitle_track(info, language)
+            if not selected:
+                print(f"未找到 {language} 字幕")
+                return None
+            track, automatic = selected
+            with ydl.urlopen(caption_request(ydl, track)) as response:
+                data = response.read()
+        cues = parse_captions(data.decode('utf-8', errors='replace'), track.get('ext', 'srt'))
+        print(f"字幕: {'自动生成' if automatic else '手动'}字幕，{track.get('ext')} 格式，"
+              f"{len(data) / 1024:.1f} KB，{len(cues)} 条")
+        return cues, info
+    except Exception as e:
+        print(f"下载字幕失败: {e}")
+        return None
 
 
-def write_file(path: str, content: str) -> None:
-    with open(path, 'w', encoding='utf-8') as f:
-        f.write(content)
-
-
-def parse_srt(content: str):
-    # 按空行分块，兼容 CRLF/LF
-    raw_blocks = re.split(r"\r?\n\s*\r?\n", content.strip())
-    blocks = []
-    for blk in raw_blocks:
-        lines = blk.splitlines()
-        if not lines:
-            continue
-        # 寻找时间行（通常包含 -->）
-        if len(lines) >= 2 and '-->' in lines[1]:
-            index = lines[0].strip()
-            times = lines[1].strip()
-            text = "\n".join(l.rstrip() for l in lines[2:]).strip()
-        else:
-            # 如果没有序号行，尝试容错解析
-            index = ''
-            times = lines[0].strip() if '-->' in lines[0] else ''
-            text = "\n".join(lines[1:]).strip()
-        blocks.append({'index': index, 'times': times, 'text': text})
-    return blocks
-
-
-def build_srt(blocks) -> str:
-    out_blocks = []
-    for i, b in enumerate(blocks, start=1):
-        idx = b.get('index') or str(i)
-        times = b.get('times', '')
-        zh = b.get('zh', '').strip()
-        en = b.get('text', '').strip()
-        if zh:
-            combined = en + '\n' + zh
-        else:
-            combined = en
-        out_blocks.append(f"{idx}\n{times}\n{combined}")
-    return "\n\n".join(out_blocks) + "\n"
-
-
-def translate_single_line(text: str, api_key: str, base_url: str = "https://api.deepseek.com", model: str = "deepseek-chat") -> str:
+def download_youtube_subtitles(url: str, language: str = 'en') -> Optional[str]:
     """
-    逐行翻译单个文本
+    使用 yt-dlp 下载 YouTube 字幕
+    返回 SRT 格式的字幕内容或 None
     """
-    try:
-        from openai import OpenAI
-    except ImportError:
-        raise ImportError("请先安装 OpenAI SDK: pip install openai")
-
-    client = OpenAI(api_key=api_key, base_url=base_url)
+    fetched = fetch_youtube_captions(url, language)
+    return build_srt(fetched[0]) if fetched else None
 
-    system_prompt = """你是一个专业的字幕翻译助手。请将英文文本准确翻译成简体中文。
-只返回翻译后的中文文本，不要添加任何序号、解释或额外文字。"""
 
-    try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"请翻译：{text}"}
-            ],
-            temperature=0.1,
-            max_tokens=100
-        )
-        
-        result = response.choices[0].message.content.strip()
-        
-        # 清理结果
-        result = re.sub(r'^\d+[\.\s]*', '', result)
-        result = re.sub(r'^[\"\']|[\"\']$', '', result)
-        result = result.strip()
-        
-        if not result or result == text:
-            return ""
-            
-        return result
-        
-    except Exception as e:
-        print(f"翻译失败: {text[:50]}... - {e}")
-        return ""
+def translate_single_line(text: str, api_key: str, base_url: str = "https://api.deepseek.com", model: str = "deepseek-chat", cache: Optional[TranslationCache] = None, translator: Optional[Translator] = None) -> str:
+    """
+    逐行翻译单个文本
+    """
+    return batch_translate_concurrent([text], api_key, base_url, model, 1, cache, translator)[0]
 
 
-def batch_translate_improved(texts: List[str], api_key: str, base_url: str = "https://api.deepseek.com", model: str = "deepseek-chat") -> List[str]:
+def batch_translate_improved(texts: List[str], api_key: str, base_url: str = "https://api.deepseek.com", model: str = "deepseek-chat", concurrency: int = DEFAULT_CONCURRENCY, cache: Optional[TranslationCache] = None, translator: Optional[Translator] = None, journal: Optional[TranslationJournal] = None, on_result: Optional[Callable[[str, str], None]] = None) -> List[str]:
     """
-    改进的批量翻译：逐行翻译
+    改进的批量翻译：并发逐行翻译，结果顺序与输入一致
     """
-    translated = []
-    
-    for i, text in enumerate(texts):
-        print(f"翻译进度: {i+1}/{len(texts)}", end='\r')
-        
-        translation = translate_single_line(text, api_key, base_url, model)
-        translated.append(translation)
-        
-        # 添加延迟避免请求过快
-        time.sleep(0.5)
-    
-    print()
-    return translated
+    return batch_translate_concurrent(texts, api_key, base_url, model, concurrency, cache, translator, journal, on_result)
 
 
 def main():
@@ -194,6 +137,14 @@ def main():
     parser.add_argument('--deepseek-key', help='Deepseek API key')
     parser.add_argument('--deepseek-url', default='https://api.deepseek.com', help='Deepseek API base URL')
     parser.add_argument('--deepseek-model', default='deepseek-chat', help='Deepseek model name')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help=f'并发翻译请求数 (默认: {DEFAULT_CONCURRENCY})')
+    add_merge_arguments(parser)
+    add_cache_arguments(parser)
+    add_journal_arguments(parser)
+    add_rate_limit_arguments(parser)
+    add_timeline_arguments(parser)
+    add_progressive_arguments(parser)
+    add_glossary_arguments(parser)
     
     args = parser.parse_args()
 
@@ -205,48 +156,30 @@ def main():
 
     # 步骤1: 下载YouTube字幕
     print(f"正在下载 YouTube 字幕: {args.youtube_url}")
-    subtitle_content = download_youtube_subtitles(args.youtube_url, args.language)
+    fetched = fetch_youtube_captions(args.youtube_url, args.language)
     
-    if not subtitle_content:
+    if not fetched:
         print("错误: 无法下载字幕，请检查链接和网络连接")
         sys.exit(1)
     
     print("字幕下载成功")
     
-    # 步骤2: 解析字幕
-    blocks = parse_srt(subtitle_content)
+    # 步骤2: 字幕已在获取时解析
+    blocks = fetched[0]
     
     # 步骤3: 翻译字幕
-    texts_to_translate = []
-    map_idx = []
-    for idx, b in enumerate(blocks):
-        text = b.get('text', '')
-        if not text or CHINESE_RE.search(text):
-            b['zh'] = ''
-            continue
-        texts_to_translate.append(text)
-        map_idx.append(idx)
-
-    if texts_to_translate:
-        print(f"待翻译段落: {len(texts_to_translate)}，使用逐行翻译...")
-        try:
-            zh_list = batch_translate_improved(
-                texts_to_translate, 
-                api_key=args.deepseek_key,
-                base_url=args.deepseek_url,
-                model=args.deepseek_model
-            )
-            for i, zh in zip(map_idx, zh_list):
-                blocks[i]['zh'] = zh
-        except Exception as e:
-            print(f"翻译失败: {e}")
-            sys.exit(1)
-    else:
-        print('没有需要翻译的段落。')
+    translate_batch = partial(
+        batch_translate_improved,
+        api_key=args.deepseek_key,
+        base_url=args.deepseek_url,
+        model=args.deepseek_model,
+        concurrency=args.concurrency
+    )
+    if not run_translation(args, blocks, args.output, translate_batch,
+                           description=f"，并发 {args.concurrency} 路逐行翻译..."):
+        sys.exit(1)
 
     # 步骤4: 生成双语字幕
-    out = build_srt(blocks)
-    write_file(args.output, out)
     print(f'双语字幕已生成: {args.output}')
 
 
@@ -7,6 +7,8 @@ YouTube视频下载与双语字幕合并工具
 
 用法:
   python youtube_downloader.py "youtube_url" output_folder
+  python youtube_downloader.py "playlist_url" output_folder      # 批量处理整个播放列表
+  python youtube_downloader.py urls.txt output_folder            # 每行一个链接
 
 依赖:
   pip install yt-dlp openai
@@ -14,16 +16,35 @@ YouTube视频下载与双语字幕合并工具
 import argparse
 import os
 import sys
-import subprocess
 import tempfile
 import shutil
+import time
 from pathlib import Path
+from typing import Optional, Tuple
 
+from caption_merge import add_merge_arguments
+from timeline import add_timeline_arguments
+from translation_cache import add_cache_arguments, open_cache
+from translation_engine import DEFAULT_CONCURRENCY
+from translation_journal import add_journal_arguments
+from rate_limiter import add_rate_limit_arguments
+from video_mux import add_mux_arguments, merge_subtitle_to_video
+from ffmpeg_progress import add_progress_arguments, progress_callback
+from progressive_srt import add_progressive_arguments
+from glossary import add_glossary_arguments, open_glossary
+from srt_pipeline import add_pipeline_arguments
+from batch_pipeline import add_batch_arguments, is_batch_source
+from caption_formats import CAPTION_FORMATS
 
-def download_youtube_video(url: str, output_folder: str) -> dict:
+CAPTION_EXTENSIONS = tuple(f'.{fmt}' for fmt in CAPTION_FORMATS)
+
+
+def download_youtube_video(url: str, output_folder: str, quiet: bool = False, subtitles: bool = True) -> dict:
     """
     下载YouTube视频
     返回包含视频文件信息的字典
+    quiet 为 True 时不显示 yt-dlp 的下载进度（批量模式下多个下载同时进行）
+    subtitles 为 False 时只下载视频，字幕由 fetch_subtitle_file 单独获取
     """
     try:
         import yt_dlp
@@ -38,12 +59,18 @@ def download_youtube_video(url: str, output_folder: str) -> dict:
     ydl_opts = {
         'format': 'bestvideo[height<=1080][ext=mp4]+bestaudio[ext=m4a]/best[height<=1080][ext=mp4]/best[ext=mp4]',
         'outtmpl': os.path.join(output_folder, '%(title)s.%(ext)s'),
-        'writesubtitles': True,
-        'writeautomaticsub': True,
-        'subtitleslangs': ['en'],
-        'subtitlesformat': 'srt',
-        'quiet': False,
+        'quiet': quiet,
+        'noprogress': quiet,
+        'noplaylist': True,  # 观看链接带 list= 时只下载该视频，播放列表由批量模式展开
     }
+    if subtitles:
+        ydl_opts.update({
+            'writesubtitles': True,
+            'writeautomaticsub': True,
+            'subtitleslangs': ['en'],
+            # 直接保存 YouTube 原生格式，由 caption_formats 解析，不再调用 ffmpeg 转换为 SRT
+            'subtitlesformat': '/'.join(CAPTION_FORMATS),
+        })
     
     try:
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
@@ -66,7 +93,7 @@ def download_youtube_video(url: str, output_folder: str) -> dict:
         
         # 查找字幕文件 - 基于下载的文件名
         for file in os.listdir(output_folder):
-            if file.startswith(video_title) and file.endswith('.srt'):
+            if file.startswith(video_title) and file.endswith(CAPTION_EXTENSIONS) and '_bilingual' not in file:
                 result['subtitle_file'] = os.path.join(output_folder, file)
                 break
                 
@@ -77,106 +104,43 @@ def download_youtube_video(url: str, output_folder: str) -> dict:
         return None
 
 
-def translate_subtitles(subtitle_file: str, api_key: str, output_folder: str) -> str:
+def translate_subtitles(subtitle_file: str, args, output_folder: str, cache=None, translator=None) -> Optional[str]:
     """
-    翻译字幕文件
+    翻译字幕文件，返回双语字幕路径，失败时返回 None
+    args 为命令行参数：并发数、句子合并、断点续传、渐进输出、分窗口和时间轴调整均按其设置
+    未提供 translator 时按 args 打开缓存、术语表和 Translator；批量模式中各视频共享调用方提供的
     """
-    try:
-        # 导入翻译模块
-        sys.path.append(os.path.dirname(__file__))
-        from youtube_bilingual_srt import parse_srt, build_srt, batch_translate_improved
-        
-        # 读取原始字幕
-        with open(subtitle_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # 解析字幕
-        blocks = parse_srt(content)
-        
-        # 提取需要翻译的文本
-        texts_to_translate = []
-        map_idx = []
-        for idx, b in enumerate(blocks):
-            text = b.get('text', '')
-            if text and not any(c in '\u4e00-\u9fff' for c in text):
-                texts_to_translate.append(text)
-                map_idx.append(idx)
-        
-        if texts_to_translate:
-            print(f"翻译字幕段落: {len(texts_to_translate)}")
-            zh_list = batch_translate_improved(texts_to_translate, api_key)
-            for i, zh in zip(map_idx, zh_list):
-                blocks[i]['zh'] = zh
-        
-        # 生成双语字幕
-        bilingual_content = build_srt(blocks)
-        
-        # 保存双语字幕
-        base_name = os.path.splitext(os.path.basename(subtitle_file))[0]
-        bilingual_file = os.path.join(output_folder, f"{base_name}_bilingual.srt")
-        
-        with open(bilingual_file, 'w', encoding='utf-8') as f:
-            f.write(bilingual_content)
-        
-        return bilingual_file
-        
-    except Exception as e:
-        print(f"翻译字幕失败: {e}")
+    # 翻译模块只在需要翻译时导入
+    from functools import partial
+    from youtube_bilingual_srt import batch_translate_improved
+    from translation_runner import run_translation
+
+    base_name = os.path.splitext(os.path.basename(subtitle_file))[0]
+    bilingual_file = os.path.join(output_folder, f"{base_name}_bilingual.srt")
+    translate_batch = partial(batch_translate_improved, api_key=args.deepseek_key, concurrency=args.concurrency)
+    if not run_translation(args, subtitle_file, bilingual_file, translate_batch, translator=translator, cache=cache):
         return None
+    return bilingual_file
 
 
-def merge_subtitle_to_video(video_file: str, subtitle_file: str, output_folder: str) -> str:
+def fetch_subtitle_file(url: str, output_folder: str, language: str = 'en') -> Optional[Tuple[str, str]]:
     """
-    使用ffmpeg将字幕合并到视频中
+    只获取字幕（不下载视频），解析后保存为 <视频标题>.<语言>.srt
+    返回 (视频标题, 字幕文件路径) 或 None
     """
-    # 检查ffmpeg是否可用
-    try:
-        subprocess.run(['ffmpeg', '-version'], capture_output=True, check=True)
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        print("错误: 请先安装ffmpeg")
-        print("macOS: brew install ffmpeg")
-        print("Ubuntu: sudo apt install ffmpeg")
-        print("Windows: 下载ffmpeg并添加到PATH")
-        return None
-
-    # 生成输出文件名
-    base_name = os.path.splitext(os.path.basename(video_file))[0]
-    # 移除可能存在的扩展名重复
-    if base_name.endswith('.mp4'):
-        base_name = base_name[:-4]
-    output_file = os.path.join(output_folder, f"{base_name}_with_subtitles.mp4")
-
-    # 构建ffmpeg命令 - 将字幕直接烧录到视频中
-    cmd = [
-        'ffmpeg',
-        '-i', video_file,
-        '-vf', f"subtitles={subtitle_file}:force_style='FontName=Helvetica,FontSize=11,PrimaryColour=&H00FFFFFF,OutlineColour=&H00000000,BackColour=&H80000000,BorderStyle=3,Outline=1,Shadow=0,MarginV=10'",
-        '-c:v', 'libx264',  # 使用H.264编码，Apple设备兼容
-        '-preset', 'medium',  # 编码速度和质量平衡
-        '-crf', '23',  # 视频质量设置
-        '-profile:v', 'high',  # H.264高级配置
-        '-level', '4.0',  # 兼容Apple设备
-        '-c:a', 'aac',  # Apple设备兼容的音频编码
-        '-b:a', '128k',  # 音频比特率
-        '-movflags', '+faststart',  # 优化流媒体播放
-        output_file,
-        '-y'  # 覆盖输出文件
-    ]
+    from youtube_bilingual_srt import build_srt, fetch_youtube_captions
+    from yt_dlp.utils import sanitize_filename
     
-    try:
-        print("正在合并字幕到视频...")
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            print(f"视频合并成功: {output_file}")
-            return output_file
-        else:
-            print(f"合并失败: {result.stderr}")
-            return None
-            
-    except Exception as e:
-        print(f"合并过程出错: {e}")
+    fetched = fetch_youtube_captions(url, language)
+    if not fetched:
         return None
+    cues, info = fetched
+    title = info.get('title', 'unknown')
+    os.makedirs(output_folder, exist_ok=True)
+    subtitle_file = os.path.join(output_folder, f"{sanitize_filename(title)}.{language}.srt")
+    with open(subtitle_file, 'w', encoding='utf-8') as f:
+        f.write(build_srt(cues))
+    return title, subtitle_file
 
 
 def load_env_file():
@@ -194,11 +158,181 @@ def load_env_file():
             print(f"警告: 读取.env文件失败: {e}")
 
 
+def download_and_translate(args):
+    """
+    先只获取字幕并立即开始翻译，视频同时在后台线程下载
+    单个视频的用时从 下载 + 翻译 变为 max(下载, 翻译)
+    返回 (下载结果, 双语字幕路径)；视频下载失败时下载结果为 None
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    started = time.monotonic()
+    timings = {}
+
+    def download_video():
+        result = download_youtube_video(args.youtube_url, args.output_folder, quiet=True, subtitles=False)
+        timings['download'] = time.monotonic() - started
+        return result
+
+    os.makedirs(args.output_folder, exist_ok=True)
+    # 视频下载只等待网络，与字幕获取和翻译放在不同线程即可重叠
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        video_future = pool.submit(download_video)
+        print("视频在后台下载，同时获取字幕并开始翻译")
+        fetched = fetch_subtitle_file(args.youtube_url, args.output_folder)
+        
+        # 步骤2: 翻译字幕
+        print(f"\n步骤2: 翻译字幕")
+        if fetched:
+            title, subtitle_file = fetched
+            print(f"✓ 视频标题: {title}")
+            print(f"✓ 字幕文件: {subtitle_file}")
+            bilingual_subtitle = translate_subtitles(subtitle_file, args, args.output_folder)
+            if bilingual_subtitle:
+                print(f"✓ 双语字幕: {bilingual_subtitle}")
+            else:
+                print("✗ 字幕翻译失败")
+        else:
+            print("✗ 未找到字幕文件")
+            bilingual_subtitle = None
+        translate_seconds = time.monotonic() - started
+        
+        if not video_future.done():
+            print("等待视频下载完成...")
+        download_result = video_future.result()
+
+    if download_result:
+        print(f"✓ 视频文件: {download_result['video_file']}")
+        download_seconds = timings.get('download', 0.0)
+        total = time.monotonic() - started
+        print(f"下载与翻译重叠: 视频下载 {download_seconds:.1f}s，字幕获取与翻译 {translate_seconds:.1f}s，"
+              f"用时 {total:.1f}s（串行约 {download_seconds + translate_seconds:.1f}s）")
+    return download_result, bilingual_subtitle
+
+
+def find_existing_files(output_folder: str):
+    """
+    查找输出文件夹中已有的视频、双语字幕和原始字幕
+    返回 (视频标题, {'video': ..., 'bilingual_subtitle': ..., 'original_subtitle': ...})
+    """
+    video_title = None
+    existing_files = {}
+    
+    if os.path.exists(output_folder):
+        for file in os.listdir(output_folder):
+            if file.endswith('.mp4') and '_with_subtitles' not in file:
+                video_title = file.replace('.mp4', '')
+                existing_files['video'] = os.path.join(output_folder, file)
+            elif file.endswith('_bilingual.srt'):
+                existing_files['bilingual_subtitle'] = os.path.join(output_folder, file)
+            elif file.endswith(tuple(f'.en.{fmt}' for fmt in CAPTION_FORMATS)) and '_bilingual' not in file:
+                existing_files['original_subtitle'] = os.path.join(output_folder, file)
+    return video_title, existing_files
+
+
+def run_batch(args) -> bool:
+    """
+    批量处理播放列表或链接列表文件：下载、翻译、合并三个阶段各用一组工作线程流水线并行
+    所有视频共享同一个翻译缓存、术语表和 Translator（连接池与限流器）
+    全部成功时返回 True
+    """
+    from batch_pipeline import Stage, StagePipeline, expand_sources, make_jobs
+    from translation_runner import make_translator
+
+    try:
+        videos = expand_sources(args.youtube_url, args.batch)
+    except Exception as e:
+        print(f"解析播放列表失败: {e}")
+        return False
+    if not videos:
+        print("✗ 没有找到要处理的视频")
+        return False
+    jobs = make_jobs(videos, args.output_folder)
+    print(f"批量模式: {len(jobs)} 个视频，下载 {args.download_workers} / 翻译 {args.translate_workers} / "
+          f"合并 {args.mux_workers} 个工作线程")
+
+    cache = open_cache(args)
+    glossary = open_glossary(args)
+    on_progress = progress_callback(args)
+
+    def download(job) -> bool:
+        video_title, existing_files = find_existing_files(job.folder)
+        if existing_files.get('video') and existing_files.get('bilingual_subtitle'):
+            job.title = video_title
+            job.video_file = existing_files['video']
+            job.bilingual_file = existing_files['bilingual_subtitle']
+            print(f"✓ {job.label}: 已有视频和双语字幕，跳过下载和翻译")
+            return True
+        result = download_youtube_video(job.url, job.folder, quiet=True)
+        if not result:
+            return False
+        job.title = result['title']
+        job.video_file = result['video_file']
+        job.subtitle_file = result['subtitle_file']
+        if not job.video_file or not job.subtitle_file:
+            print(f"✗ {job.label}: 未找到{'视频' if not job.video_file else '字幕'}文件")
+            return False
+        print(f"✓ {job.label}: 下载完成")
+        return True
+
+    def translate(job) -> bool:
+        if job.bilingual_file:
+            return True
+        job.bilingual_file = translate_subtitles(job.subtitle_file, args, job.folder, cache=cache, translator=translator)
+        if job.bilingual_file:
+            print(f"✓ {job.label}: 翻译完成")
+        return job.bilingual_file is not None
+
+    def merge(job) -> bool:
+        job.merged_file = merge_subtitle_to_video(
+            job.video_file,
+            job.bilingual_file,
+            job.folder,
+            mode=args.mux,
+            container=args.container,
+            subtitle_codec=args.subtitle_codec,
+            burn_workers=args.burn_workers,
+            on_progress=on_progress
+        )
+        if job.merged_file:
+            print(f"✓ {job.label}: {job.merged_file}")
+        return job.merged_file is not None
+
+    with make_translator(args, glossary) as translator:
+        stats = StagePipeline([
+            Stage('下载', download, args.download_workers),
+            Stage('翻译', translate, args.translate_workers),
+            Stage('合并', merge, args.mux_workers),
+        ]).run(jobs)
+        print(translator.limiter.summary())
+    if hasattr(on_progress, 'close'):
+        on_progress.close()
+    if glossary:
+        print(glossary.summary())
+    if cache:
+        print(cache.summary())
+        cache.close()
+    print(stats.summary())
+    return not stats.failed
+
+
 def main():
     parser = argparse.ArgumentParser(description='YouTube视频下载与双语字幕合并')
-    parser.add_argument('youtube_url', help='YouTube视频链接')
+    parser.add_argument('youtube_url', help='YouTube视频链接；播放列表链接或每行一个链接的文本文件时批量处理')
     parser.add_argument('output_folder', help='输出文件夹路径')
     parser.add_argument('--deepseek-key', help='Deepseek API key')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help=f'并发翻译请求数 (默认: {DEFAULT_CONCURRENCY})')
+    add_merge_arguments(parser)
+    add_cache_arguments(parser)
+    add_journal_arguments(parser)
+    add_rate_limit_arguments(parser)
+    add_mux_arguments(parser)
+    add_progress_arguments(parser)
+    add_timeline_arguments(parser)
+    add_progressive_arguments(parser)
+    add_glossary_arguments(parser)
+    add_pipeline_arguments(parser)
+    add_batch_arguments(parser)
     
     args = parser.parse_args()
 
@@ -219,21 +353,13 @@ def main():
     print("YouTube视频下载与双语字幕合并工具")
     print("=" * 50)
     
-    # 检查是否已有完整的视频和双语字幕
-    video_title = None
-    existing_files = {}
+    if is_batch_source(args.youtube_url, args.batch):
+        sys.exit(0 if run_batch(args) else 1)
     
-    if os.path.exists(args.output_folder):
-        for file in os.listdir(args.output_folder):
-            if file.endswith('.mp4') and '_with_subtitles' not in file:
-                video_title = file.replace('.mp4', '')
-                existing_files['video'] = os.path.join(args.output_folder, file)
-            elif file.endswith('_bilingual.srt'):
-                existing_files['bilingual_subtitle'] = os.path.join(args.output_folder, file)
-            elif file.endswith('.en.srt') and '_bilingual' not in file:
-                existing_files['original_subtitle'] = os.path.join(args.output_folder, file)
+    # 检查是否已有完整的视频和双语字幕
+    video_title, existing_files = find_existing_files(args.output_folder)
     
-    # 步骤1: 下载视频和字幕（如果不存在）
+    # 步骤1: 获取字幕，视频在后台同时下载（如果不存在）
     print(f"\n步骤1: 检查并下载视频和字幕")
     print(f"链接: {args.youtube_url}")
     print(f"输出文件夹: {args.output_folder}")
@@ -245,48 +371,37 @@ def main():
             'video_file': existing_files['video'],
             'subtitle_file': existing_files['original_subtitle'] if existing_files.get('original_subtitle') else existing_files['bilingual_subtitle']
         }
-    else:
-        download_result = download_youtube_video(args.youtube_url, args.output_folder)
+        print(f"✓ 视频标题: {download_result['title']}")
+        print(f"✓ 视频文件: {download_result['video_file']}")
+        print(f"✓ 字幕文件: {download_result['subtitle_file']}")
         
-        if not download_result:
-            print("下载失败")
-            sys.exit(1)
-    
-    print(f"✓ 视频标题: {download_result['title']}")
-    print(f"✓ 视频文件: {download_result['video_file']}")
-    print(f"✓ 字幕文件: {download_result['subtitle_file']}")
-    
-    # 步骤2: 翻译字幕（如果跳过下载且已有双语字幕，则跳过翻译）
-    print(f"\n步骤2: 翻译字幕")
-    
-    # 如果跳过下载且已有双语字幕，直接使用现有的双语字幕
-    if existing_files.get('bilingual_subtitle') and existing_files.get('video'):
+        # 步骤2: 已有双语字幕，直接使用
+        print(f"\n步骤2: 翻译字幕")
         print("✓ 使用已存在的双语字幕，跳过翻译")
         bilingual_subtitle = existing_files['bilingual_subtitle']
-    elif download_result['subtitle_file']:
-        bilingual_subtitle = translate_subtitles(
-            download_result['subtitle_file'], 
-            args.deepseek_key, 
-            args.output_folder
-        )
-        
-        if bilingual_subtitle:
-            print(f"✓ 双语字幕: {bilingual_subtitle}")
-        else:
-            print("✗ 字幕翻译失败")
     else:
-        print("✗ 未找到字幕文件")
-        bilingual_subtitle = None
+        download_result, bilingual_subtitle = download_and_translate(args)
+        if not download_result:
+            print("下载失败")
+            sys.exit(1)
     
     # 步骤3: 合并字幕到视频
     print(f"\n步骤3: 合并字幕到视频")
     
     if bilingual_subtitle and download_result['video_file']:
+        on_progress = progress_callback(args)
         merged_video = merge_subtitle_to_video(
             download_result['video_file'], 
             bilingual_subtitle, 
-            args.output_folder
+            args.output_folder,
+            mode=args.mux,
+            container=args.container,
+            subtitle_codec=args.subtitle_codec,
+            burn_workers=args.burn_workers,
+            on_progress=on_progress
         )
+        if hasattr(on_progress, 'close'):
+            on_progress.close()
         
         if merged_video:
             print(f"✓ 合并视频: {merged_video}")